@@ -0,0 +1,88 @@
+import re
+import threading
+from typing import Any, Dict, Tuple
+from urllib.parse import urlsplit
+
+from metrics import Metrics, metrics as default_metrics
+
+# A path segment that names a resource ("schedule", "battlelog") rather than an id or tag
+RESOURCE_SEGMENT = re.compile(r"^[a-z_]{5,}$")
+
+
+def endpoint_key(url: str) -> str:
+    """
+    Group URLs by upstream endpoint: host plus the last path segment when it
+    names a resource, else "*". ".../teams/lal/schedule" -> "site.api.espn.com/schedule",
+    ".../players/%23ABC" -> "api.clashroyale.com/*".
+    """
+    parts = urlsplit(url)
+    segments = [s for s in parts.path.split("/") if s]
+    last = segments[-1] if segments else ""
+    return f"{parts.hostname}/{last if RESOURCE_SEGMENT.match(last) else '*'}"
+
+
+class AdaptiveTimeouts:
+    """
+    (connect, read) timeouts from observed latency: `percentile` of the
+    host's connection setup time and of the endpoint's response time, times
+    `multiplier`, clamped to [minimum, maximum]. Until an endpoint has
+    `min_samples` responses it gets `default`.
+
+    Reads the http.handshake.<host> and http.latency.<endpoint> samples the
+    HTTP client records. Those include timed-out attempts at their timeout
+    value: dropping them would leave only the faster calls, and the estimate
+    would fall exactly when the upstream slows down.
+    """
+
+    def __init__(
+        self,
+        default: Tuple[float, float] = (3.05, 10.0),
+        minimum: Tuple[float, float] = (0.5, 1.0),
+        maximum: Tuple[float, float] = (5.0, 30.0),
+        multiplier: float = 3.0,
+        percentile: float = 99,
+        min_samples: int = 20,
+        metrics: Metrics = default_metrics,
+    ):
+        self.default = default
+        self.minimum = minimum
+        self.maximum = maximum
+        self.multiplier = multiplier
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.metrics = metrics
+        self._endpoints: set = set()
+        self._lock = threading.Lock()
+
+    def _derive(self, name: str, index: int) -> float:
+        if self.metrics.count(name) < self.min_samples:
+            return self.default[index]
+        value = self.metrics.percentile(name, self.percentile) * self.multiplier
+        return round(min(self.maximum[index], max(self.minimum[index], value)), 3)
+
+    def _timeouts(self, endpoint: str) -> Tuple[float, float]:
+        host = endpoint.split("/", 1)[0]
+        return (self._derive(f"http.handshake.{host}", 0), self._derive(f"http.latency.{endpoint}", 1))
+
+    def timeout_for(self, url: str) -> Tuple[float, float]:
+        endpoint = endpoint_key(url)
+        with self._lock:
+            self._endpoints.add(endpoint)
+        return self._timeouts(endpoint)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Timeouts currently in effect per endpoint, with the samples behind them."""
+        with self._lock:
+            endpoints = sorted(self._endpoints)
+        result = {}
+        for endpoint in endpoints:
+            host = endpoint.split("/", 1)[0]
+            connect, read = self._timeouts(endpoint)
+            result[endpoint] = {
+                "connect": connect,
+                "read": read,
+                "samples": self.metrics.count(f"http.latency.{endpoint}"),
+                "p99": self.metrics.percentile(f"http.latency.{endpoint}", 99),
+                "connect_samples": self.metrics.count(f"http.handshake.{host}"),
+            }
+        return result
@@ -0,0 +1,131 @@
+import json
+import logging
+import time
+from typing import Any, AsyncGenerator, AsyncIterable, AsyncIterator, Callable, Dict, List, Optional
+
+from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+def compact_value(value: Any, max_items: int = 3, max_string: int = 80, depth: int = 3) -> Any:
+    """Shrink a tool result for the model: short strings, a few list items, bounded nesting."""
+    if isinstance(value, str):
+        return value if len(value) <= max_string else value[:max_string] + "..."
+    if isinstance(value, list):
+        if depth <= 0:
+            return f"[{len(value)} items]"
+        items = [compact_value(v, max_items, max_string, depth - 1) for v in value[:max_items]]
+        if len(value) > max_items:
+            items.append(f"... {len(value) - max_items} more")
+        return items
+    if isinstance(value, dict):
+        if depth <= 0:
+            return f"{{{len(value)} fields}}"
+        return {k: compact_value(v, max_items, max_string, depth - 1) for k, v in value.items()}
+    return value
+
+
+def summarize_result(outcome: Dict[str, Any], max_chars: int = 800) -> str:
+    """What the model sees of a tool outcome: the error, or a compacted result capped at `max_chars`."""
+    if "error" in outcome:
+        return json.dumps({key: outcome[key] for key in ("error", "invalid") if key in outcome})
+    text = json.dumps(compact_value(outcome["result"]), default=str)
+    return text if len(text) <= max_chars else text[:max_chars] + "...(truncated)"
+
+
+def _signature(call: Dict[str, Any]) -> str:
+    return f"{call['function']}:{json.dumps(call.get('args') or {}, sort_keys=True)}"
+
+
+async def agent_rounds(
+    messages: List[Dict[str, Any]],
+    stream_calls: Callable[[List[Dict[str, Any]]], AsyncIterator[Dict[str, Any]]],
+    run_calls: Callable[[AsyncIterable[Dict[str, Any]]], AsyncIterator[Dict[str, Any]]],
+    initial_calls: Optional[List[Dict[str, Any]]] = None,
+    max_rounds: int = 3,
+    time_budget: float = 12.0,
+    summary_chars: int = 800,
+    clock: Callable[[], float] = time.monotonic,
+) -> AsyncGenerator[Dict[str, Any], None]:
+    """
+    Bounded tool loop. Each round streams the model's tool calls into
+    `run_calls` (run_tools with report_starts), so a round's calls run in
+    parallel, then feeds compact result summaries back as tool messages and
+    asks again. Stops when the model calls no tools, after `max_rounds`, or
+    once `time_budget` seconds have passed (the current round still finishes).
+
+    Yields the executor's events with indexes unique across rounds, plus
+    `{"round": n}` before every round after the first. `initial_calls` run in
+    round one without being shown to the model. Calls repeated from an earlier
+    round aren't re-run; the model is told to use the earlier result.
+    """
+    messages = list(messages)
+    start = clock()
+    executed = {_signature(c) for c in initial_calls or []}
+    offset = 0
+    rounds = 0
+
+    for round_number in range(1, max_rounds + 1):
+        rounds = round_number
+        if round_number > 1:
+            yield {"round": round_number}
+
+        requested: List[Dict[str, Any]] = []
+        repeated: List[Dict[str, Any]] = []
+
+        async def round_calls():
+            if round_number == 1:
+                for call in initial_calls or []:
+                    yield call
+            async for call in stream_calls(messages):
+                call = {**call, "id": call.get("id") or f"call_{round_number}_{len(requested) + len(repeated)}"}
+                if _signature(call) in executed:
+                    repeated.append(call)
+                    continue
+                executed.add(_signature(call))
+                requested.append(call)
+                yield call
+
+        outcomes: Dict[str, Dict[str, Any]] = {}
+        count = 0
+        async for event in run_calls(round_calls()):
+            event = {**event, "index": offset + event["index"]}
+            count = max(count, event["index"] - offset + 1)
+            if "started" not in event and event.get("id"):
+                outcomes[event["id"]] = event
+            yield event
+        offset += count
+
+        if not requested and not repeated:
+            break
+
+        model_calls = requested + repeated
+        messages.append({
+            "role": "assistant",
+            "content": None,
+            "tool_calls": [
+                {
+                    "id": call["id"],
+                    "type": "function",
+                    "function": {"name": call["function"], "arguments": json.dumps(call.get("args") or {})},
+                }
+                for call in model_calls
+            ],
+        })
+        for call in model_calls:
+            if call in repeated:
+                content = json.dumps({"note": "Already fetched in an earlier call; use that result."})
+            else:
+                content = summarize_result(outcomes.get(call["id"], {"error": "No result"}), summary_chars)
+            messages.append({"role": "tool", "tool_call_id": call["id"], "name": call["function"], "content": content})
+
+        if round_number == max_rounds:
+            metrics.incr("agent.round_limit_hits")
+            break
+        if clock() - start >= time_budget:
+            metrics.incr("agent.time_limit_hits")
+            logger.info(f"Agent loop stopped after {round_number} rounds: time budget spent")
+            break
+
+    metrics.observe("agent.rounds", rounds)
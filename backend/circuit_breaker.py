@@ -0,0 +1,131 @@
+import logging
+import threading
+import time
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List, Optional
+
+from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a dependency whose breaker is open."""
+
+
+# Set to a fresh list for each tool call by run_tools. The HTTP client appends the
+# host of every request that failed upstream (transport error, 5xx, 429, open
+# circuit), since fetchers swallow those and return None just like for bad input.
+upstream_failures: ContextVar[Optional[List[str]]] = ContextVar("upstream_failures", default=None)
+
+
+def record_upstream_failure(host: str):
+    failures = upstream_failures.get()
+    if failures is not None:
+        failures.append(host)
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures and rejects calls
+    for `reset_timeout` seconds. After that one probe call is let through
+    (half-open): success closes the breaker, failure opens it again. A probe
+    that never reports back is replaced after another `reset_timeout`.
+    Thread-safe, since HTTP calls happen in tool worker threads.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+        self._probe_started = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Whether a call may go ahead; a True in half-open state reserves the probe."""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            now = self.clock()
+            if self.state == OPEN and now - self.opened_at >= self.reset_timeout:
+                self.state = HALF_OPEN
+                self._probing = False
+            if self.state == HALF_OPEN and (not self._probing or now - self._probe_started >= self.reset_timeout):
+                self._probing = True
+                self._probe_started = now
+                return True
+            metrics.incr("breaker.short_circuited")
+            return False
+
+    def record_success(self):
+        with self._lock:
+            if self.state != CLOSED:
+                logger.info(f"Circuit {self.name} closed")
+            self.state = CLOSED
+            self.failures = 0
+            self._probing = False
+
+    def release(self):
+        """Give back a half-open probe that ended without reaching the dependency (deadline, cancellation)."""
+        with self._lock:
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != OPEN:
+                    logger.warning(f"Circuit {self.name} opened after {self.failures} failures")
+                    metrics.incr("breaker.opened")
+                self.state = OPEN
+                self.opened_at = self.clock()
+                self._probing = False
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            retry_in = max(0.0, self.reset_timeout - (self.clock() - self.opened_at)) if self.state == OPEN else 0.0
+            return {"state": self.state, "failures": self.failures, "retry_in": round(retry_in, 1)}
+
+
+class BreakerRegistry:
+    """Breakers created on first use, keyed like "host:site.api.espn.com" or "tool:sports"."""
+
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def get(self, name: str) -> CircuitBreaker:
+        with self._lock:
+            if name not in self._breakers:
+                self._breakers[name] = CircuitBreaker(
+                    name, self.failure_threshold, self.reset_timeout, self.clock
+                )
+            return self._breakers[name]
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            breakers = dict(self._breakers)
+        return {name: breaker.snapshot() for name, breaker in sorted(breakers.items())}
@@ -1,4 +1,5 @@
 from pydantic_settings import BaseSettings
+from typing import Literal, Optional
 from functools import lru_cache
 
 
@@ -23,6 +24,134 @@ class Settings(BaseSettings):
     # not used currently, using yahoo finance instead
     alpha_vantage_api_key: str = ""
 
+    # shared HTTP client for the integrations (see http_client.py): keep-alive
+    # pool per host, (connect, read) timeouts, HTTP/2 for async calls (httpx[http2])
+    http_connect_timeout: float = 3.05
+    http_read_timeout: float = 10.0
+
+    # adaptive timeouts: p<percentile> of an endpoint's observed latency times the
+    # multiplier, clamped; the fixed timeouts above apply until there are enough samples
+    http_adaptive_timeouts: bool = True
+    http_timeout_percentile: float = 99
+    http_timeout_multiplier: float = 3.0
+    http_timeout_min_samples: int = 20
+    http_connect_timeout_range: tuple[float, float] = (0.5, 5.0)
+    http_read_timeout_range: tuple[float, float] = (1.0, 30.0)
+    http_max_connections_per_host: int = 8
+    http2: bool = True
+
+    # retries for idempotent requests (jittered backoff, Retry-After up to
+    # http_retry_after_max seconds), capped at http_retry_budget of recent
+    # requests; per-host token buckets in requests per second, waiting at most
+    # http_rate_limit_max_wait seconds (and never past the request deadline) for a slot
+    http_retry_attempts: int = 3
+    http_retry_base_delay: float = 0.25
+    http_retry_max_delay: float = 2.0
+    http_retry_after_max: float = 5.0
+    http_retry_budget: float = 0.2
+    http_rate_limit_max_wait: float = 5.0
+    http_rate_limits: dict[str, dict[str, float]] = {
+        "site.api.espn.com": {"rate": 20, "burst": 20},
+        "api.clashroyale.com": {"rate": 10, "burst": 10},
+        # Strava allows 100 requests per 15 minutes
+        "www.strava.com": {"rate": 0.1, "burst": 20},
+    }
+
+    # circuit breakers per upstream host and per fetcher: open after this many
+    # consecutive failures, probe again after breaker_reset_timeout seconds;
+    # open fetchers fall back to stale cache entries or sample data
+    breaker_failure_threshold: int = 5
+    breaker_reset_timeout: float = 30.0
+
+    # /api/generate time-to-first-UI budget in seconds; planning, agent and tools
+    # must finish request_deadline - ui_reserve seconds in, so tools get what's
+    # left as their timeout and ones predicted to run over are skipped. UI generation
+    # that hasn't produced a chunk by request_deadline hands over to the next UI model
+    request_deadline: float = 20.0
+    ui_reserve: float = 5.0
+    # the LLM planner gets at most this long (and never past the data deadline);
+    # after that the query is planned by query_router.fallback_plan
+    plan_timeout: float = 8.0
+
+    # resumable /api/generate streams
+    stream_replay_events: int = 512
+    stream_ttl_seconds: int = 300
+
+    # buffer between the provider stream and the SSE writer
+    llm_buffer_size: int = 64
+    llm_buffer_policy: Literal["coalesce", "spill"] = "coalesce"
+
+    # candidate models per pipeline stage in preference order (see model_router.py);
+    # a candidate is skipped while its EWMA latency is above the stage threshold
+    model_routes: dict[str, list[dict]] = {
+        "plan": [{"model": "anthropic/claude-sonnet-4-5-20250929"}, {"model": "gpt-5-mini"}],
+        "agent": [{"model": "gpt-5-mini"}, {"model": "gpt-5"}],
+        "ui": [{"model": "anthropic/claude-sonnet-4-5-20250929"}, {"model": "gpt-5"}],
+        "query": [{"model": "gpt-5-mini"}, {"model": "gpt-5"}],
+        # merged planning + tool selection (generate_pipeline="merged")
+        "plan_tools": [{"model": "anthropic/claude-sonnet-4-5-20250929"}, {"model": "gpt-5"}],
+    }
+    # seconds; for "ui" this is time to first chunk
+    model_latency_thresholds: dict[str, float] = {"plan": 3.0, "agent": 6.0, "ui": 5.0, "query": 10.0, "plan_tools": 6.0}
+    model_error_threshold: float = 0.5
+    model_probe_interval: float = 60.0
+
+    # planning call, hedged with a second request (the next "plan" candidate) once it
+    # runs past the plan_hedge_percentile latency (plan_hedge_default_delay until there's history)
+    plan_hedging: bool = True
+    plan_hedge_percentile: float = 90
+    plan_hedge_default_delay: float = 2.0
+
+    # plan queries that name a team, ticker or integration without the LLM
+    fastpath_routing: bool = True
+
+    # LLM plans are appended here as training data for intent_classifier
+    plan_log_path: Optional[str] = None
+    # a trained intent_classifier model; its plan is used at or above the threshold
+    intent_model_path: Optional[str] = None
+    intent_confidence_threshold: float = 0.8
+
+    # compile plan sources straight into tool calls; the agent only runs for what doesn't resolve
+    plan_compiler: bool = True
+    # "staged": plan call, then tools (compiled or agent-picked); "merged": one call
+    # returns the plan and its tool calls. Requests can override it.
+    generate_pipeline: Literal["staged", "merged"] = "staged"
+    # agent calls only see the tools for the plan's (or clicked item's) namespaces,
+    # with long enumerations in tool descriptions shortened
+    agent_tool_subsetting: bool = True
+    compact_tool_descriptions: bool = True
+
+    # agent tool loop: results are summarized and fed back for up to agent_max_rounds
+    # rounds; no new round starts after agent_time_budget seconds
+    agent_max_rounds: int = 3
+    agent_time_budget: float = 12.0
+    agent_summary_chars: int = 800
+
+    # tools run concurrently, at most this many at once; async tools run on the
+    # event loop, sync ones in a pool of tool_threads worker threads
+    tool_concurrency: int = 4
+    tool_threads: int = 8
+
+    # seconds to cache tool results, by tool name prefix; unlisted tools aren't cached
+    tool_cache_ttls: dict[str, float] = {
+        "sports_": 60.0,
+        "stocks_": 30.0,
+        "strava_": 300.0,
+        "spotify_": 300.0,
+        "clash_": 120.0,
+    }
+    # start fetches for teams/tickers/integrations named in the query while planning runs
+    speculative_prefetch: bool = True
+
+    # UI generation failover: a stream with no chunk for ui_stall_timeout seconds
+    # continues on the next "ui" candidate
+    ui_stall_timeout: float = 8.0
+    sse_keepalive_seconds: float = 2.0
+
+    # generate /api/generate screens as concurrent per-section streams
+    parallel_sections: bool = False
+    max_parallel_sections: int = 6
+
     class Config:
         env_file = ".env"
 
@@ -0,0 +1,74 @@
+import asyncio
+import time
+from contextvars import ContextVar
+from typing import Any, AsyncGenerator, AsyncIterator, Callable, Optional, Tuple, Union
+
+Timeout = Union[float, Tuple[float, float]]
+
+
+class DeadlineExceeded(Exception):
+    """Raised instead of starting work the request no longer has time for."""
+
+
+class Deadline:
+    """A point in time a request's work has to finish by, `budget` seconds from now."""
+
+    def __init__(self, budget: float, clock: Callable[[], float] = time.monotonic):
+        self.clock = clock
+        self.expires_at = clock() + budget
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - self.clock())
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def clamp(self, timeout: Timeout) -> Timeout:
+        """Cap a timeout (seconds or (connect, read)) at the time left."""
+        remaining = self.remaining()
+        if isinstance(timeout, tuple):
+            return tuple(min(t, remaining) for t in timeout)
+        return min(timeout, remaining)
+
+
+async def first_within(
+    items: AsyncIterator[Any],
+    deadline: "Deadline",
+    is_first: Callable[[Any], bool] = lambda item: True,
+    fallback: Optional[Callable[[], AsyncIterator[Any]]] = None,
+) -> AsyncGenerator[Any, None]:
+    """
+    Pass `items` through until the first item `is_first` accepts; items before
+    it (keepalives) don't count, and after it nothing is timed. If it hasn't
+    arrived by the deadline, `items` is closed and the rest comes, untimed,
+    from `fallback()`; without a fallback DeadlineExceeded is raised.
+    """
+    waiting = True
+    try:
+        while True:
+            try:
+                if waiting:
+                    item = await asyncio.wait_for(anext(items), deadline.remaining())
+                else:
+                    item = await anext(items)
+            except StopAsyncIteration:
+                return
+            except asyncio.TimeoutError:
+                if fallback is None:
+                    raise DeadlineExceeded("Nothing arrived before the deadline") from None
+                if hasattr(items, "aclose"):
+                    await items.aclose()
+                items, fallback, waiting = fallback(), None, False
+                continue
+            waiting = waiting and not is_first(item)
+            yield item
+    finally:
+        if hasattr(items, "aclose"):
+            await items.aclose()
+
+
+# Set for each tool call by run_tools; async tools see it directly and call_tool copies
+# it into the worker thread for sync ones, so the HTTP client can size its timeouts
+# without fetchers passing it along.
+current_deadline: ContextVar[Optional[Deadline]] = ContextVar("current_deadline", default=None)
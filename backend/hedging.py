@@ -0,0 +1,90 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, List, Optional
+
+from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+def hedge_delay(
+    latency_metric: str,
+    percentile: float = 90,
+    default: float = 2.0,
+    min_samples: int = 20,
+    floor: float = 0.1,
+) -> float:
+    """
+    Seconds to wait before hedging: the given percentile of observed latency,
+    or `default` until there are enough samples to trust it.
+    """
+    if metrics.count(latency_metric) < min_samples:
+        return default
+    return max(floor, metrics.percentile(latency_metric, percentile))
+
+
+async def hedged(
+    attempts: List[Callable[[], Awaitable[Any]]],
+    delay: float,
+    validate: Optional[Callable[[Any], bool]] = None,
+    name: str = "llm",
+) -> Any:
+    """
+    Run `attempts[0]`, starting the next attempt if no valid result has come
+    back after `delay` seconds (or right away if the running ones all failed).
+
+    Returns the first valid result and cancels the rest. Only use this for
+    short, idempotent calls. Exceptions and results rejected by `validate` count
+    as failures; if every attempt fails the last error is raised. Hedges issued
+    and won are counted as `<name>.hedges_issued` / `<name>.hedges_won`.
+    """
+    running = {}
+    next_attempt = 0
+    last_error: Optional[BaseException] = None
+
+    def launch():
+        nonlocal next_attempt
+        task = asyncio.ensure_future(attempts[next_attempt]())
+        running[task] = next_attempt
+        if next_attempt > 0:
+            metrics.incr(f"{name}.hedges_issued")
+        next_attempt += 1
+
+    launch()
+    try:
+        while running:
+            can_hedge = next_attempt < len(attempts)
+            done, _ = await asyncio.wait(
+                running.keys(),
+                timeout=delay if can_hedge else None,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+
+            if not done:
+                launch()
+                continue
+
+            for task in done:
+                index = running.pop(task)
+                try:
+                    result = task.result()
+                except Exception as e:
+                    last_error = e
+                    logger.warning(f"{name} attempt {index} failed: {e}")
+                    continue
+
+                if validate and not validate(result):
+                    last_error = ValueError(f"{name} attempt {index} returned an invalid result")
+                    continue
+
+                if index > 0:
+                    metrics.incr(f"{name}.hedges_won")
+                return result
+
+            if not running and next_attempt < len(attempts):
+                launch()
+
+        raise last_error or RuntimeError(f"{name}: no attempts")
+    finally:
+        for task in running:
+            task.cancel()
@@ -0,0 +1,319 @@
+import asyncio
+import logging
+import time
+from typing import Any, Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+from adaptive_timeouts import AdaptiveTimeouts, endpoint_key
+from circuit_breaker import BreakerRegistry, CircuitBreaker, CircuitOpenError, record_upstream_failure
+from deadline import DeadlineExceeded, Timeout, current_deadline
+from metrics import metrics
+from resilience import Resilience
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+try:
+    import h2  # noqa: F401  httpx needs it for http2=True
+except ImportError:
+    h2 = None
+
+logger = logging.getLogger(__name__)
+
+
+def _record_connect(host: str, start: float):
+    elapsed = time.monotonic() - start
+    metrics.incr("http.connections_opened")
+    metrics.observe("http.handshake", elapsed)
+    metrics.observe(f"http.handshake.{host}", elapsed)
+
+
+class _TimedHTTPConnection(HTTPConnection):
+    def connect(self):
+        start = time.monotonic()
+        super().connect()
+        _record_connect(self.host, start)
+
+
+class _TimedHTTPSConnection(HTTPSConnection):
+    def connect(self):
+        start = time.monotonic()
+        super().connect()
+        _record_connect(self.host, start)
+
+
+class _TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+
+class _TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+
+class _PooledAdapter(HTTPAdapter):
+    """HTTPAdapter whose per-host pools time TCP+TLS setup for every new connection."""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _TimedHTTPConnectionPool,
+            "https": _TimedHTTPSConnectionPool,
+        }
+
+
+class HTTPClient:
+    """
+    Shared HTTP layer for the integrations. One requests.Session keeps a
+    keep-alive pool per host (at most `max_connections_per_host` open, callers
+    wait for a free one beyond that), so repeat calls to ESPN, Strava or
+    Supercell skip the TCP+TLS handshake.
+
+    Timeouts are (connect, read) seconds: a call's own `timeout`, else the
+    endpoint's adaptive timeout from `timeouts`, else `timeout`. Inside a tool
+    call with a request deadline (deadline.current_deadline) every attempt's
+    timeout is capped at the time left, and nothing is sent once it's gone.
+
+    Requests go through `resilience` (per-host rate limits, retries for
+    idempotent methods, see resilience.py). With `breakers`, each host has a
+    circuit breaker ("host:<name>"); while it's open requests raise
+    CircuitOpenError immediately instead of waiting out the timeout.
+
+    `arequest` is the async entry point: it uses an httpx.AsyncClient (HTTP/2
+    when `http2` is set and h2 is installed) if httpx is available, otherwise
+    runs the pooled sync request in a thread.
+
+    Metrics: http.requests, http.connections_opened, http.handshake[.<host>],
+    http.latency.<host> and http.latency.<endpoint> (completed responses,
+    plus timed-out attempts at their timeout, see _record_timeout),
+    http.timeouts, and the http.connection_reuse gauge.
+    """
+
+    def __init__(
+        self,
+        timeout: Timeout = (3.05, 10.0),
+        max_hosts: int = 16,
+        max_connections_per_host: int = 8,
+        http2: bool = True,
+        resilience: Optional[Resilience] = None,
+        breakers: Optional[BreakerRegistry] = None,
+        timeouts: Optional[AdaptiveTimeouts] = None,
+    ):
+        self.timeout = timeout
+        self.timeouts = timeouts
+        self.resilience = resilience or Resilience()
+        self.breakers = breakers
+        self.http2 = http2
+        self.max_hosts = max_hosts
+        self.max_connections_per_host = max_connections_per_host
+
+        self.session = requests.Session()
+        adapter = _PooledAdapter(
+            pool_connections=max_hosts,
+            pool_maxsize=max_connections_per_host,
+            pool_block=True,
+        )
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self._async_client: Optional["httpx.AsyncClient"] = None
+
+    def _timeout_for(self, url: str) -> Timeout:
+        return self.timeouts.timeout_for(url) if self.timeouts else self.timeout
+
+    def _record(self, url: str, start: float, completed: bool):
+        metrics.incr("http.requests")
+        if completed:
+            # failures and timeouts would drag the adaptive timeouts towards themselves
+            elapsed = time.monotonic() - start
+            metrics.observe(f"http.latency.{urlsplit(url).hostname}", elapsed)
+            metrics.observe(f"http.latency.{endpoint_key(url)}", elapsed)
+        opened = metrics.counters["http.connections_opened"]
+        requests_made = metrics.counters["http.requests"]
+        metrics.set_gauge("http.connection_reuse", max(0.0, 1 - opened / requests_made))
+
+    @staticmethod
+    def _record_timeout(url: str, phase: str, timeout: Timeout, attempt_timeout: Timeout):
+        """
+        A timed-out attempt took at least its timeout: record it at that value
+        (connect into http.handshake.<host>, read into http.latency.<endpoint>)
+        so slowness pushes the adaptive timeouts up instead of dropping out of
+        their samples. Attempts cut short by the request deadline say less than
+        that and aren't recorded.
+        """
+        index = 0 if phase == "connect" else 1
+        own = timeout[index] if isinstance(timeout, tuple) else timeout
+        used = attempt_timeout[index] if isinstance(attempt_timeout, tuple) else attempt_timeout
+        metrics.incr("http.timeouts")
+        if used < own:
+            return
+        if phase == "connect":
+            metrics.observe(f"http.handshake.{urlsplit(url).hostname}", used)
+        else:
+            metrics.observe(f"http.latency.{endpoint_key(url)}", used)
+
+    def _breaker(self, url: str) -> Optional[CircuitBreaker]:
+        if not self.breakers:
+            return None
+        host = urlsplit(url).hostname
+        breaker = self.breakers.get(f"host:{host}")
+        if not breaker.allow():
+            record_upstream_failure(host)
+            raise CircuitOpenError(f"{host} is unavailable (circuit open)")
+        return breaker
+
+    @staticmethod
+    def _attempt_timeout(timeout: Timeout) -> Timeout:
+        deadline = current_deadline.get()
+        if deadline is None:
+            return timeout
+        if deadline.expired:
+            metrics.incr("http.deadline_exceeded")
+            raise DeadlineExceeded("Request deadline passed")
+        return deadline.clamp(timeout)
+
+    @staticmethod
+    def _settle(url: str, breaker: Optional[CircuitBreaker], status_code: Optional[int]):
+        """Count a finished request (after retries) against its host's breaker; None means it raised."""
+        failed = status_code is None or status_code == 429 or status_code >= 500
+        if failed:
+            record_upstream_failure(urlsplit(url).hostname)
+        if not breaker:
+            return
+        if failed:
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+
+    @staticmethod
+    def _release(breaker: Optional[CircuitBreaker]):
+        """A request that never got an answer from the host (deadline, local rate limit,
+        cancellation) says nothing about it, but must free a half-open probe slot."""
+        if breaker:
+            breaker.release()
+
+    def request(self, method: str, url: str, **kwargs: Any) -> requests.Response:
+        timeout = kwargs.pop("timeout", None) or self._timeout_for(url)
+        breaker = self._breaker(url)
+
+        def send() -> requests.Response:
+            attempt_timeout = self._attempt_timeout(timeout)
+            start = time.monotonic()
+            completed = False
+            try:
+                response = self.session.request(method, url, timeout=attempt_timeout, **kwargs)
+                completed = True
+                return response
+            except requests.ConnectTimeout:
+                self._record_timeout(url, "connect", timeout, attempt_timeout)
+                raise
+            except requests.Timeout:
+                self._record_timeout(url, "read", timeout, attempt_timeout)
+                raise
+            finally:
+                self._record(url, start, completed)
+
+        try:
+            response = self.resilience.send(method, url, send, (requests.ConnectionError, requests.Timeout))
+        except requests.RequestException:
+            self._settle(url, breaker, None)
+            raise
+        except BaseException:
+            self._release(breaker)
+            raise
+        self._settle(url, breaker, response.status_code)
+        return response
+
+    def get(self, url: str, **kwargs: Any) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs: Any) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def _httpx_client(self) -> "httpx.AsyncClient":
+        if self._async_client is None:
+            connect, read = self.timeout if isinstance(self.timeout, tuple) else (self.timeout, self.timeout)
+            self._async_client = httpx.AsyncClient(
+                http2=self.http2 and h2 is not None,
+                timeout=httpx.Timeout(read, connect=connect),
+                # httpx limits are per client, not per host
+                limits=httpx.Limits(max_connections=self.max_hosts * self.max_connections_per_host),
+            )
+        return self._async_client
+
+    async def arequest(self, method: str, url: str, **kwargs: Any) -> Any:
+        """Async request; returns an httpx.Response, or a requests.Response without httpx."""
+        if httpx is None:
+            return await asyncio.to_thread(self.request, method, url, **kwargs)
+
+        timeout = kwargs.pop("timeout", None) or self._timeout_for(url)
+        breaker = self._breaker(url)
+
+        # httpcore reports connection setup through the trace extension
+        connect_start = 0.0
+        handshake_done = "connection.start_tls.complete" if url.startswith("https") else "connection.connect_tcp.complete"
+
+        async def trace(event: str, info: dict):
+            nonlocal connect_start
+            if event == "connection.connect_tcp.started":
+                connect_start = time.monotonic()
+            elif event == handshake_done:
+                _record_connect(urlsplit(url).hostname, connect_start)
+
+        kwargs["extensions"] = {**kwargs.get("extensions", {}), "trace": trace}
+
+        async def send() -> "httpx.Response":
+            attempt_timeout = self._attempt_timeout(timeout)
+            httpx_timeout = attempt_timeout
+            if isinstance(attempt_timeout, tuple):
+                httpx_timeout = httpx.Timeout(attempt_timeout[1], connect=attempt_timeout[0])
+            start = time.monotonic()
+            completed = False
+            try:
+                response = await self._httpx_client().request(method, url, timeout=httpx_timeout, **kwargs)
+                completed = True
+                return response
+            except httpx.ConnectTimeout:
+                self._record_timeout(url, "connect", timeout, attempt_timeout)
+                raise
+            except httpx.ReadTimeout:
+                self._record_timeout(url, "read", timeout, attempt_timeout)
+                raise
+            finally:
+                self._record(url, start, completed)
+
+        try:
+            response = await self.resilience.asend(method, url, send, (httpx.TransportError,))
+        except httpx.TransportError:
+            self._settle(url, breaker, None)
+            raise
+        except BaseException:
+            self._release(breaker)
+            raise
+        self._settle(url, breaker, response.status_code)
+        return response
+
+    async def aget(self, url: str, **kwargs: Any) -> Any:
+        return await self.arequest("GET", url, **kwargs)
+
+    async def aclose(self):
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
+        self.session.close()
+
+
+_default_client: Optional[HTTPClient] = None
+
+
+def default_client() -> HTTPClient:
+    """Process-wide client for fetchers constructed without one."""
+    global _default_client
+    if _default_client is None:
+        _default_client = HTTPClient()
+    return _default_client
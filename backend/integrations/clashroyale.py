@@ -1,15 +1,17 @@
-import requests
+import asyncio
 import logging
 from typing import Optional, Dict, Any, List
 from datetime import datetime
 
+from http_client import HTTPClient, default_client
 from tool_generator import tool_function
 
 logger = logging.getLogger(__name__)
 
 
 class ClashRoyaleDataFetcher:
-    def __init__(self, api_key: str = ""):
+    def __init__(self, api_key: str = "", http: Optional[HTTPClient] = None):
+        self.http = http or default_client()
         self.api_key = api_key
         self.base_url = "https://api.clashroyale.com/v1"
         self.headers = {
@@ -31,13 +33,12 @@ class ClashRoyaleDataFetcher:
             }
         }
     )
-    def get_player(self, player_tag: str) -> Optional[Dict[str, Any]]:
+    async def get_player(self, player_tag: str) -> Optional[Dict[str, Any]]:
         try:
             encoded_tag = self._encode_tag(player_tag)
-            r = requests.get(
+            r = await self.http.aget(
                 f"{self.base_url}/players/{encoded_tag}",
                 headers=self.headers,
-                timeout=10,
             )
             r.raise_for_status()
             data = r.json()
@@ -62,15 +63,14 @@ class ClashRoyaleDataFetcher:
             logger.error(f"Failed to fetch Clash Royale player {player_tag}: {e}")
             return None
 
-    def get_player_battle_log(
+    async def get_player_battle_log(
         self, player_tag: str, limit: int = 10
     ) -> Optional[List[Dict[str, Any]]]:
         try:
             encoded_tag = self._encode_tag(player_tag)
-            r = requests.get(
+            r = await self.http.aget(
                 f"{self.base_url}/players/{encoded_tag}/battlelog",
                 headers=self.headers,
-                timeout=10,
             )
             
             if r.status_code == 403:
@@ -107,28 +107,18 @@ class ClashRoyaleDataFetcher:
                 )
 
             return battles
-        except requests.exceptions.HTTPError as e:
-            if e.response and e.response.status_code == 403:
-                logger.warning(
-                    f"Battle log access forbidden for {player_tag}. "
-                    "This endpoint requires IP whitelisting in your Clash Royale API key settings."
-                )
-            else:
-                logger.error(f"Failed to fetch Clash Royale battle log: {e}")
-            return None
         except Exception as e:
             logger.error(f"Failed to fetch Clash Royale battle log: {e}")
             return None
 
-    def get_player_upcoming_chests(
+    async def get_player_upcoming_chests(
         self, player_tag: str
     ) -> Optional[List[Dict[str, Any]]]:
         try:
             encoded_tag = self._encode_tag(player_tag)
-            r = requests.get(
+            r = await self.http.aget(
                 f"{self.base_url}/players/{encoded_tag}/upcomingchests",
                 headers=self.headers,
-                timeout=10,
             )
             r.raise_for_status()
             return r.json().get("items", [])
@@ -136,13 +126,12 @@ class ClashRoyaleDataFetcher:
             logger.error(f"Failed to fetch Clash Royale chests: {e}")
             return None
 
-    def get_current_deck(self, player_tag: str) -> Optional[List[Dict[str, Any]]]:
+    async def get_current_deck(self, player_tag: str) -> Optional[List[Dict[str, Any]]]:
         try:
             encoded_tag = self._encode_tag(player_tag)
-            r = requests.get(
+            r = await self.http.aget(
                 f"{self.base_url}/players/{encoded_tag}",
                 headers=self.headers,
-                timeout=10,
             )
             r.raise_for_status()
             data = r.json()
@@ -171,16 +160,24 @@ class ClashRoyaleDataFetcher:
                 "type": "string",
                 "description": "Player tag with # prefix (e.g., '#JYJQC88', '#89U82VQ0R'). Must be uppercase alphanumeric."
             }
-        }
+        },
+        # a deck is 8 cards; chests carry ids and icon URLs the UI doesn't use
+        max_items=8,
+        fields=[
+            "player", "recent_battles", "current_deck", "upcoming_chests.index", "upcoming_chests.name",
+            "battle_log_available", "battle_log_note", "last_updated",
+        ],
     )
-    def fetch_user_summary(self, player_tag: str) -> Optional[Dict[str, Any]]:
-        player = self.get_player(player_tag)
+    async def fetch_user_summary(self, player_tag: str) -> Optional[Dict[str, Any]]:
+        player = await self.get_player(player_tag)
         if not player:
             return None
 
-        battles = self.get_player_battle_log(player_tag, limit=5)
-        deck = self.get_current_deck(player_tag)
-        chests = self.get_player_upcoming_chests(player_tag)
+        battles, deck, chests = await asyncio.gather(
+            self.get_player_battle_log(player_tag, limit=5),
+            self.get_current_deck(player_tag),
+            self.get_player_upcoming_chests(player_tag),
+        )
 
         summary = {
             "player": player,
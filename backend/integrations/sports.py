@@ -1,8 +1,8 @@
-import requests
 import logging
 from typing import Optional, Dict, Any, List
 from datetime import datetime
 
+from http_client import HTTPClient, default_client
 from tool_generator import tool_function
 
 logger = logging.getLogger(__name__)
@@ -68,7 +68,8 @@ LEAGUE_CONFIG = {
 
 
 class SportsDataFetcher:
-    def __init__(self, api_key: str = ""):
+    def __init__(self, api_key: str = "", http: Optional[HTTPClient] = None):
+        self.http = http or default_client()
         self.base_url = "https://site.api.espn.com/apis/site/v2/sports"
 
     def _get_team_abbr(self, team_name: str, league: str) -> Optional[str]:
@@ -86,9 +87,8 @@ class SportsDataFetcher:
     def _fetch_team_schedule(self, abbr: str, league: str, limit: int = 5) -> List[Dict[str, Any]]:
         config = LEAGUE_CONFIG[league]
         try:
-            r = requests.get(
-                f"{self.base_url}/{config['sport']}/{league}/teams/{abbr}/schedule",
-                timeout=10
+            r = self.http.get(
+                f"{self.base_url}/{config['sport']}/{league}/teams/{abbr}/schedule"
             )
             r.raise_for_status()
             data = r.json()
@@ -150,9 +150,8 @@ class SportsDataFetcher:
         config = LEAGUE_CONFIG[league]
 
         try:
-            r = requests.get(
-                f"{self.base_url}/{config['sport']}/{league}/teams/{abbr}",
-                timeout=10
+            r = self.http.get(
+                f"{self.base_url}/{config['sport']}/{league}/teams/{abbr}"
             )
             r.raise_for_status()
             data = r.json()
@@ -222,7 +221,9 @@ class SportsDataFetcher:
                 "items": {"type": "string"},
                 "description": "List of NBA team names (e.g., ['lakers', 'warriors', 'celtics'])"
             }
-        }
+        },
+        max_items=10,
+        round_digits=1,
     )
     def fetch_nba_summary(self, team_names: List[str]) -> Optional[Dict[str, Any]]:
         try:
@@ -248,7 +249,9 @@ class SportsDataFetcher:
                 "items": {"type": "string"},
                 "description": "List of NFL team names (e.g., ['cowboys', 'patriots', 'chiefs'])"
             }
-        }
+        },
+        max_items=10,
+        round_digits=1,
     )
     def fetch_nfl_summary(self, team_names: List[str]) -> Optional[Dict[str, Any]]:
         try:
@@ -274,7 +277,9 @@ class SportsDataFetcher:
                 "items": {"type": "string"},
                 "description": "List of MLB team names (e.g., ['yankees', 'dodgers', 'red sox'])"
             }
-        }
+        },
+        max_items=10,
+        round_digits=1,
     )
     def fetch_mlb_summary(self, team_names: List[str]) -> Optional[Dict[str, Any]]:
         try:
@@ -300,7 +305,9 @@ class SportsDataFetcher:
                 "items": {"type": "string"},
                 "description": "List of NHL team names (e.g., ['bruins', 'penguins', 'maple leafs'])"
             }
-        }
+        },
+        max_items=10,
+        round_digits=1,
     )
     def fetch_nhl_summary(self, team_names: List[str]) -> Optional[Dict[str, Any]]:
         try:
@@ -5,13 +5,17 @@ from datetime import datetime
 import spotipy
 from spotipy.oauth2 import SpotifyOAuth
 
+from http_client import HTTPClient, default_client
 from tool_generator import tool_function
 
 logger = logging.getLogger(__name__)
 
 
 class SpotifyDataFetcher:
-    def __init__(self, client_id: str, client_secret: str, redirect_uri: str):
+    def __init__(
+        self, client_id: str, client_secret: str, redirect_uri: str, http: Optional[HTTPClient] = None
+    ):
+        self.http = http or default_client()
         self.auth = SpotifyOAuth(
             client_id=client_id,
             client_secret=client_secret,
@@ -19,6 +23,7 @@ class SpotifyDataFetcher:
             scope="user-top-read user-read-recently-played user-library-read",
             cache_path=".spotify_token_cache",
             show_dialog=True,
+            requests_session=self.http.session,
         )
 
     def get_authorization_url(self) -> str:
@@ -34,14 +39,15 @@ class SpotifyDataFetcher:
                 return None
             if self.auth.is_token_expired(token):
                 self.auth.refresh_access_token(token["refresh_token"])
-            return spotipy.Spotify(auth_manager=self.auth)
+            return spotipy.Spotify(auth_manager=self.auth, requests_session=self.http.session)
         except Exception as e:
             logger.error(f"Spotify auth error: {e}")
             return None
 
     @tool_function(
         description="Get user's Spotify listening stats including top songs, artists, genres, and total listening time",
-        params={}
+        params={},
+        max_items=10,
     )
     def fetch_user_data(self) -> Optional[Dict[str, Any]]:
         sp = self.get_spotify_client()
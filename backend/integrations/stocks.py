@@ -1,17 +1,37 @@
 import yfinance as yf
 import logging
 import math
+import time
 from typing import Optional, Dict, Any, List
 from datetime import datetime
 
+from adaptive_timeouts import AdaptiveTimeouts, endpoint_key
+from metrics import metrics
 from tool_generator import tool_function
 
 logger = logging.getLogger(__name__)
 
+# what yfinance's Ticker.history() requests
+HISTORY_URL = "https://query2.finance.yahoo.com/v8/finance/chart"
+
 
 class StocksDataFetcher:
-    def __init__(self, alpha_vantage_key: str = ""):
+    def __init__(self, alpha_vantage_key: str = "", timeouts: Optional[AdaptiveTimeouts] = None):
         self.alpha_vantage_key = alpha_vantage_key
+        self.timeouts = timeouts
+
+    def _history(self, ticker: yf.Ticker, period: str):
+        """
+        ticker.history() with an adaptive read timeout. yfinance keeps its own
+        session, so its latency is recorded here under the same endpoint key
+        the HTTP client would use.
+        """
+        timeout = self.timeouts.timeout_for(HISTORY_URL)[1] if self.timeouts else 10
+        start = time.monotonic()
+        hist = ticker.history(period=period, timeout=timeout)
+        if not hist.empty:
+            metrics.observe(f"http.latency.{endpoint_key(HISTORY_URL)}", time.monotonic() - start)
+        return hist
 
     @tool_function(
         description="Get portfolio performance data for multiple stock symbols including current price, position value, and gain/loss percentage",
@@ -21,7 +41,9 @@ class StocksDataFetcher:
                 "items": {"type": "string"},
                 "description": "List of stock ticker symbols (e.g., ['AAPL', 'GOOGL', 'MSFT', 'TSLA', 'NVDA'])"
             }
-        }
+        },
+        max_items=10,
+        round_digits=2,
     )
     def fetch_portfolio_data(self, symbols: List[str]) -> Optional[Dict[str, Any]]:
         try:
@@ -30,7 +52,7 @@ class StocksDataFetcher:
 
             for symbol in symbols:
                 ticker = yf.Ticker(symbol)
-                hist = ticker.history(period="1mo")
+                hist = self._history(ticker, "1mo")
 
                 if hist.empty:
                     continue
@@ -67,7 +89,8 @@ class StocksDataFetcher:
 
     @tool_function(
         description="Get current market overview including major indices (S&P 500, NASDAQ, DOW) and top gaining/losing stocks",
-        params={}
+        params={},
+        round_digits=2,
     )
     def fetch_market_trends(self) -> Optional[Dict[str, Any]]:
         try:
@@ -121,7 +144,9 @@ class StocksDataFetcher:
                 "items": {"type": "string"},
                 "description": "List of stock ticker symbols (e.g., ['AAPL', 'TSLA', 'GOOGL', 'MSFT', 'AMZN', 'NVDA', 'META'])"
             }
-        }
+        },
+        max_items=10,
+        round_digits=2,
     )
     def fetch_stock_info(self, symbols: List[str]) -> Optional[Dict[str, Any]]:
         try:
@@ -129,7 +154,7 @@ class StocksDataFetcher:
             for symbol in symbols:
                 ticker = yf.Ticker(symbol)
                 info = ticker.info
-                hist = ticker.history(period="1y")
+                hist = self._history(ticker, "1y")
 
                 year_perf = 0
                 if not hist.empty and len(hist) > 0:
@@ -1,8 +1,8 @@
-import requests
 import logging
 from typing import Optional, Dict, Any, List
 from datetime import datetime
 
+from http_client import HTTPClient, default_client
 from tool_generator import tool_function
 
 logger = logging.getLogger(__name__)
@@ -10,8 +10,13 @@ logger = logging.getLogger(__name__)
 
 class StravaDataFetcher:
     def __init__(
-        self, client_id: str = "", client_secret: str = "", refresh_token: str = ""
+        self,
+        client_id: str = "",
+        client_secret: str = "",
+        refresh_token: str = "",
+        http: Optional[HTTPClient] = None,
     ):
+        self.http = http or default_client()
         self.client_id = client_id
         self.client_secret = client_secret
         self.refresh_token = refresh_token
@@ -24,7 +29,7 @@ class StravaDataFetcher:
             return True
 
         try:
-            r = requests.post(
+            r = self.http.post(
                 "https://www.strava.com/oauth/token",
                 data={
                     "client_id": self.client_id,
@@ -32,7 +37,6 @@ class StravaDataFetcher:
                     "refresh_token": self.refresh_token,
                     "grant_type": "refresh_token",
                 },
-                timeout=10,
             )
             r.raise_for_status()
 
@@ -55,8 +59,8 @@ class StravaDataFetcher:
             return None
 
         try:
-            r = requests.get(
-                f"{self.base_url}/athlete", headers=self._get_headers(), timeout=10
+            r = self.http.get(
+                f"{self.base_url}/athlete", headers=self._get_headers()
             )
             r.raise_for_status()
             data = r.json()
@@ -83,10 +87,9 @@ class StravaDataFetcher:
             return None
 
         try:
-            r = requests.get(
+            r = self.http.get(
                 f"{self.base_url}/athletes/{athlete_id}/stats",
                 headers=self._get_headers(),
-                timeout=10,
             )
             r.raise_for_status()
             data = r.json()
@@ -126,20 +129,22 @@ class StravaDataFetcher:
         params={
             "limit": {
                 "type": "integer",
-                "description": "Number of activities to return (1-200, default: 10)"
+                "minimum": 1,
+                "maximum": 20,
+                "description": "Number of activities to return (1-20, default: 10)"
             }
-        }
+        },
+        max_items=20,
     )
     def get_activities(self, limit: int = 10) -> Optional[List[Dict[str, Any]]]:
         if not self._ensure_token():
             return None
 
         try:
-            r = requests.get(
+            r = self.http.get(
                 f"{self.base_url}/athlete/activities",
                 headers=self._get_headers(),
                 params={"per_page": limit},
-                timeout=10,
             )
             r.raise_for_status()
 
@@ -185,7 +190,9 @@ class StravaDataFetcher:
 
     @tool_function(
         description="Get user's complete Strava fitness summary including athlete profile, all-time stats for running/cycling/swimming, and recent activities",
-        params={}
+        params={},
+        max_items=10,
+        round_digits=1,
     )
     def fetch_user_summary(self) -> Optional[Dict[str, Any]]:
         athlete = self.get_athlete()
@@ -0,0 +1,297 @@
+"""
+Local intent classifier trained from logged (query, plan) pairs.
+
+Queries are hashed into sparse word/bigram/char-trigram features and scored by
+a softmax linear model whose classes are the distinct source sets seen in the
+log. A prediction returns the sources for that class with its most common
+entity-free intent and approach, so the LLM planner is only needed when the
+classifier isn't confident.
+
+    python -m intent_classifier train --log plans.jsonl --out intent_model.json
+    python -m intent_classifier report --log plans.jsonl --model intent_model.json
+"""
+import argparse
+import json
+import logging
+import math
+import random
+import re
+import time
+import zlib
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DIM = 2 ** 18
+WORD_PATTERN = re.compile(r"[a-z0-9#$&']+")
+
+Example = Tuple[str, Dict[str, Any]]
+
+
+def _bucket(feature: str, dim: int) -> int:
+    # crc32, unlike hash(), is stable across processes
+    return zlib.crc32(feature.encode("utf-8")) % dim
+
+
+def featurize(query: str, dim: int = DEFAULT_DIM) -> Dict[int, float]:
+    """L2-normalized hashed features: words, word bigrams and character trigrams."""
+    words = WORD_PATTERN.findall(query.lower())
+    counts: Counter = Counter()
+
+    for word in words:
+        counts[_bucket(f"w:{word}", dim)] += 1
+        padded = f"<{word}>"
+        for i in range(len(padded) - 2):
+            counts[_bucket(f"c:{padded[i:i + 3]}", dim)] += 0.5
+    for first, second in zip(words, words[1:]):
+        counts[_bucket(f"b:{first} {second}", dim)] += 1
+
+    norm = math.sqrt(sum(v * v for v in counts.values())) or 1.0
+    return {index: value / norm for index, value in counts.items()}
+
+
+def plan_label(plan: Dict[str, Any]) -> str:
+    return "|".join(sorted(plan.get("sources", [])))
+
+
+def _entity_free(text: str) -> bool:
+    """False if the text names something: a capitalized word, ticker or tag past each sentence's first word."""
+    for sentence in re.split(r"(?<=[.!?])\s+", text.strip()):
+        if any(word[0].isupper() or word[0] in "#$" for word in sentence.split()[1:]):
+            return False
+    return True
+
+
+def _template_text(texts: List[str], fallback: str) -> str:
+    """The most common text that names no entity ("See how the Lakers..." fits one query only)."""
+    usable = [text for text in texts if text and _entity_free(text)]
+    return Counter(usable).most_common(1)[0][0] if usable else fallback
+
+
+def _softmax(scores: List[float]) -> List[float]:
+    top = max(scores)
+    exps = [math.exp(s - top) for s in scores]
+    total = sum(exps)
+    return [e / total for e in exps]
+
+
+class IntentClassifier:
+    def __init__(
+        self,
+        labels: List[str],
+        templates: Dict[str, Dict[str, Any]],
+        weights: Optional[Dict[int, List[float]]] = None,
+        bias: Optional[List[float]] = None,
+        dim: int = DEFAULT_DIM,
+    ):
+        self.labels = labels
+        self.templates = templates
+        self.weights = weights or {}
+        self.bias = bias or [0.0] * len(labels)
+        self.dim = dim
+
+    @classmethod
+    def train(
+        cls,
+        examples: List[Example],
+        epochs: int = 15,
+        learning_rate: float = 0.5,
+        min_examples: int = 2,
+        dim: int = DEFAULT_DIM,
+        seed: int = 0,
+    ) -> "IntentClassifier":
+        """
+        Fit with plain SGD on softmax cross-entropy. Source sets seen fewer than
+        `min_examples` times are left out, so queries like them stay with the LLM.
+        """
+        by_label: Dict[str, List[Example]] = {}
+        for query, plan in examples:
+            if plan.get("sources"):
+                by_label.setdefault(plan_label(plan), []).append((query, plan))
+
+        labels = sorted(label for label, rows in by_label.items() if len(rows) >= min_examples)
+        if not labels:
+            raise ValueError(f"No source set has at least {min_examples} logged plans")
+
+        templates = {}
+        for label in labels:
+            rows = by_label[label]
+            sources = rows[0][1]["sources"]
+            namespaces = ", ".join(dict.fromkeys(source.split("::", 1)[0] for source in sources))
+            intent = _template_text([plan.get("intent", "") for _, plan in rows], f"Explore their {namespaces} data.")
+            approach = _template_text(
+                [plan.get("approach", "") for _, plan in rows], "Lead with the headline numbers, then the details."
+            )
+            templates[label] = {"sources": sources, "intent": intent, "approach": approach}
+
+        model = cls(labels, templates, dim=dim)
+        index = {label: i for i, label in enumerate(labels)}
+        data = [(featurize(query, dim), index[label]) for label in labels for query, _ in by_label[label]]
+
+        rng = random.Random(seed)
+        for epoch in range(epochs):
+            rng.shuffle(data)
+            rate = learning_rate / (1 + 0.2 * epoch)
+            for features, target in data:
+                probs = model._probabilities(features)
+                grads = [p - (1.0 if c == target else 0.0) for c, p in enumerate(probs)]
+                for c, g in enumerate(grads):
+                    model.bias[c] -= rate * g
+                for feature, value in features.items():
+                    row = model.weights.setdefault(feature, [0.0] * len(labels))
+                    for c, g in enumerate(grads):
+                        row[c] -= rate * g * value
+
+        return model
+
+    def _probabilities(self, features: Dict[int, float]) -> List[float]:
+        scores = list(self.bias)
+        for feature, value in features.items():
+            row = self.weights.get(feature)
+            if row:
+                for c, w in enumerate(row):
+                    scores[c] += w * value
+        return _softmax(scores)
+
+    def predict(self, query: str) -> Tuple[Dict[str, Any], float]:
+        """The plan for the most likely source set, and its probability."""
+        probs = self._probabilities(featurize(query, self.dim))
+        best = max(range(len(probs)), key=probs.__getitem__)
+        plan = dict(self.templates[self.labels[best]])
+        plan["route"] = "classifier"
+        plan["confidence"] = round(probs[best], 4)
+        return plan, probs[best]
+
+    def save(self, path: str):
+        payload = {
+            "version": 1,
+            "dim": self.dim,
+            "labels": self.labels,
+            "templates": self.templates,
+            "bias": self.bias,
+            # tiny weights don't move predictions and bloat the file
+            "weights": {
+                str(f): [round(w, 5) for w in row]
+                for f, row in self.weights.items()
+                if any(abs(w) > 1e-4 for w in row)
+            },
+        }
+        with open(path, "w") as f:
+            json.dump(payload, f)
+
+    @classmethod
+    def load(cls, path: str) -> "IntentClassifier":
+        with open(path) as f:
+            payload = json.load(f)
+        return cls(
+            labels=payload["labels"],
+            templates=payload["templates"],
+            weights={int(f): row for f, row in payload["weights"].items()},
+            bias=payload["bias"],
+            dim=payload["dim"],
+        )
+
+
+def log_plan(path: str, query: str, plan: Dict[str, Any]):
+    """Append a planner result to the JSONL training log."""
+    record = {
+        "query": query,
+        "plan": {k: plan[k] for k in ("sources", "intent", "approach") if k in plan},
+        "ts": time.time(),
+    }
+    with open(path, "a") as f:
+        f.write(json.dumps(record) + "\n")
+
+
+def load_examples(path: str) -> List[Example]:
+    examples = []
+    with open(path) as f:
+        for line_no, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+                examples.append((record["query"], record["plan"]))
+            except (ValueError, KeyError) as e:
+                logger.warning(f"Skipping plan log line {line_no}: {e}")
+    return examples
+
+
+def split_examples(examples: List[Example], holdout: float, seed: int = 0) -> Tuple[List[Example], List[Example]]:
+    shuffled = list(examples)
+    random.Random(seed).shuffle(shuffled)
+    cut = int(len(shuffled) * (1 - holdout))
+    return shuffled[:cut], shuffled[cut:]
+
+
+def evaluate(model: IntentClassifier, examples: List[Example], threshold: float = 0.8) -> Dict[str, Any]:
+    """
+    Offline report: exact source-set accuracy overall and above `threshold`,
+    coverage (share of queries that would skip the LLM) and prediction latency.
+    """
+    latencies = []
+    correct = confident = confident_correct = 0
+
+    for query, plan in examples:
+        start = time.perf_counter()
+        predicted, confidence = model.predict(query)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+        hit = plan_label(predicted) == plan_label(plan)
+        correct += hit
+        if confidence >= threshold:
+            confident += 1
+            confident_correct += hit
+
+    latencies.sort()
+    total = len(examples) or 1
+
+    def pct(p: float) -> float:
+        return round(latencies[min(len(latencies) - 1, int(p / 100 * len(latencies)))], 4) if latencies else 0.0
+
+    return {
+        "examples": len(examples),
+        "classes": len(model.labels),
+        "accuracy": round(correct / total, 4),
+        "threshold": threshold,
+        "coverage": round(confident / total, 4),
+        "confident_accuracy": round(confident_correct / confident, 4) if confident else None,
+        "latency_ms": {"p50": pct(50), "p99": pct(99), "max": round(latencies[-1], 4) if latencies else 0.0},
+    }
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(prog="intent_classifier", description=__doc__.strip().splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    train_cmd = commands.add_parser("train", help="train a model from a plan log")
+    train_cmd.add_argument("--log", required=True, help="JSONL plan log (PLAN_LOG_PATH)")
+    train_cmd.add_argument("--out", required=True, help="model file to write (INTENT_MODEL_PATH)")
+    train_cmd.add_argument("--epochs", type=int, default=15)
+    train_cmd.add_argument("--min-examples", type=int, default=2)
+    train_cmd.add_argument("--holdout", type=float, default=0.2, help="share held out for the report")
+    train_cmd.add_argument("--threshold", type=float, default=0.8)
+
+    report_cmd = commands.add_parser("report", help="accuracy/latency report for a trained model")
+    report_cmd.add_argument("--log", required=True)
+    report_cmd.add_argument("--model", required=True)
+    report_cmd.add_argument("--threshold", type=float, default=0.8)
+
+    args = parser.parse_args(argv)
+    examples = load_examples(args.log)
+
+    if args.command == "train":
+        train, test = split_examples(examples, args.holdout) if args.holdout else (examples, [])
+        model = IntentClassifier.train(train, epochs=args.epochs, min_examples=args.min_examples)
+        model.save(args.out)
+        print(f"Trained on {len(train)} plans, {len(model.labels)} classes -> {args.out}")
+        if test:
+            print(json.dumps(evaluate(model, test, args.threshold), indent=2))
+    else:
+        model = IntentClassifier.load(args.model)
+        print(json.dumps(evaluate(model, examples, args.threshold), indent=2))
+
+
+if __name__ == "__main__":
+    main()
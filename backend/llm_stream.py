@@ -0,0 +1,290 @@
+import asyncio
+import json
+import logging
+import time
+from collections import deque
+from typing import Any, AsyncGenerator, AsyncIterator, Awaitable, Callable, Dict, List, Literal, Optional
+
+from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+OverflowPolicy = Literal["coalesce", "spill"]
+
+
+def chunk_text(chunk: Any) -> str:
+    """Pull the text delta out of a litellm streaming chunk, or "" if there is none."""
+    if not chunk.choices:
+        return ""
+    delta = chunk.choices[0].delta
+    return getattr(delta, "content", None) or ""
+
+
+class ToolCallAssembler:
+    """
+    Rebuilds tool calls from streamed deltas. Each call is released as
+    {"function", "args"} as soon as its arguments are complete JSON (or a later
+    call starts), not when the whole response has finished.
+    """
+
+    def __init__(self):
+        self._calls: Dict[int, Dict[str, Any]] = {}
+
+    def _release(self, call: Dict[str, Any], final: bool) -> Optional[Dict[str, Any]]:
+        if call["released"] or not call["name"]:
+            return None
+        text = call["arguments"].strip()
+        try:
+            args = json.loads(text) if text else {}
+        except ValueError:
+            if final:
+                logger.warning(f"Dropping tool call {call['name']} with invalid arguments: {text[:200]}")
+                call["released"] = True
+            return None
+        if not isinstance(args, dict) or (not text and not final):
+            return None
+        call["released"] = True
+        released = {"function": call["name"], "args": args}
+        if call["id"]:
+            released["id"] = call["id"]
+        return released
+
+    def feed(self, chunk: Any) -> List[Dict[str, Any]]:
+        """Take one streaming chunk; returns the calls it completed."""
+        if not chunk.choices:
+            return []
+        deltas = getattr(chunk.choices[0].delta, "tool_calls", None) or []
+
+        ready = []
+        for delta in deltas:
+            index = delta.index if getattr(delta, "index", None) is not None else len(self._calls)
+            if index not in self._calls:
+                # a new call means every earlier one has all its arguments
+                for earlier in sorted(i for i in self._calls if i < index):
+                    released = self._release(self._calls[earlier], final=True)
+                    if released:
+                        ready.append(released)
+                self._calls[index] = {"id": None, "name": "", "arguments": "", "released": False}
+
+            call = self._calls[index]
+            if getattr(delta, "id", None):
+                call["id"] = delta.id
+            function = getattr(delta, "function", None)
+            if function is not None:
+                if getattr(function, "name", None):
+                    call["name"] = function.name
+                if getattr(function, "arguments", None):
+                    call["arguments"] += function.arguments
+
+            released = self._release(call, final=False)
+            if released:
+                ready.append(released)
+        return ready
+
+    def finish(self) -> List[Dict[str, Any]]:
+        """Calls still pending when the stream ends."""
+        ready = []
+        for index in sorted(self._calls):
+            released = self._release(self._calls[index], final=True)
+            if released:
+                ready.append(released)
+        return ready
+
+
+async def streamed_tool_calls(response: AsyncIterator[Any]) -> AsyncGenerator[Dict[str, Any], None]:
+    """Yield tool calls from a streaming completion as each one's arguments complete."""
+    assembler = ToolCallAssembler()
+    async for chunk in response:
+        for call in assembler.feed(chunk):
+            yield call
+    for call in assembler.finish():
+        yield call
+
+
+class ChunkBuffer:
+    """
+    Bounded queue between the provider reader and the SSE writer.
+
+    The reader never blocks. Once `maxsize` chunks are waiting:
+    - coalesce: new text is appended to the newest queued chunk, so a slow
+      client gets fewer, larger ui frames
+    - spill: new chunks go to an overflow list that is drained in order once
+      the queue has room, keeping chunk boundaries intact. Past `max_spill`
+      overflow chunks (default 4 * maxsize) it coalesces too, so a stalled
+      client can't grow it without bound
+
+    `max_depth` is this buffer's high-water mark; buffered_content records it
+    per stream as the llm_buffer.max_depth histogram.
+    """
+
+    def __init__(self, maxsize: int = 64, policy: OverflowPolicy = "coalesce", max_spill: Optional[int] = None):
+        if policy not in ("coalesce", "spill"):
+            raise ValueError(f"Unknown overflow policy: {policy}")
+        self.maxsize = max(1, maxsize)
+        self.policy = policy
+        self.max_spill = max(1, max_spill if max_spill is not None else 4 * self.maxsize)
+        self._items: deque[str] = deque()
+        self._spill: deque[str] = deque()
+        self._closed = False
+        self._error: Optional[BaseException] = None
+        self._wakeup = asyncio.Event()
+        self.max_depth = 0
+
+    @property
+    def depth(self) -> int:
+        return len(self._items) + len(self._spill)
+
+    def put_nowait(self, text: str):
+        if self._closed:
+            raise RuntimeError("ChunkBuffer is closed")
+
+        if len(self._items) < self.maxsize and not self._spill:
+            self._items.append(text)
+        elif self.policy == "coalesce":
+            self._items[-1] += text
+            metrics.incr("llm_buffer.coalesced")
+        elif len(self._spill) < self.max_spill:
+            self._spill.append(text)
+            metrics.incr("llm_buffer.spilled")
+        else:
+            self._spill[-1] += text
+            metrics.incr("llm_buffer.coalesced")
+
+        self.max_depth = max(self.max_depth, self.depth)
+        self._wakeup.set()
+
+    def close(self, error: Optional[BaseException] = None):
+        self._closed = True
+        self._error = error
+        self._wakeup.set()
+
+    async def get(self) -> Optional[str]:
+        """Next chunk in order; None once closed and drained. Re-raises the reader's error."""
+        while not self._items:
+            if self._spill:
+                while self._spill and len(self._items) < self.maxsize:
+                    self._items.append(self._spill.popleft())
+                break
+            if self._closed:
+                if self._error:
+                    raise self._error
+                return None
+            self._wakeup.clear()
+            await self._wakeup.wait()
+
+        return self._items.popleft()
+
+
+async def buffered_content(
+    response: AsyncIterator[Any],
+    maxsize: int = 64,
+    policy: OverflowPolicy = "coalesce",
+) -> AsyncGenerator[str, None]:
+    """
+    Read a litellm stream in its own task and yield text through a ChunkBuffer,
+    so the provider connection drains at provider speed regardless of the client.
+    """
+    buffer = ChunkBuffer(maxsize, policy)
+
+    async def read():
+        try:
+            async for chunk in response:
+                text = chunk_text(chunk)
+                if text:
+                    buffer.put_nowait(text)
+        except Exception as e:
+            buffer.close(e)
+            return
+        buffer.close()
+
+    reader = asyncio.create_task(read())
+    try:
+        while (text := await buffer.get()) is not None:
+            yield text
+    finally:
+        metrics.observe("llm_buffer.max_depth", buffer.max_depth)
+        if not reader.done():
+            reader.cancel()
+
+
+class StreamStalled(Exception):
+    pass
+
+
+# Yielded by failover_content while waiting on a chunk; callers turn it into an SSE comment
+KEEPALIVE = object()
+
+
+async def failover_content(
+    open_stream: Callable[[str, str], Awaitable[AsyncIterator[Any]]],
+    models: List[str],
+    stall_timeout: float = 8.0,
+    keepalive_interval: float = 2.0,
+    maxsize: int = 64,
+    policy: OverflowPolicy = "coalesce",
+    report: Optional[Callable[[str, Optional[float], bool], None]] = None,
+) -> AsyncGenerator[Any, None]:
+    """
+    Stream UI text, failing over to the next model when one stalls or errors.
+
+    `open_stream(model, partial)` starts a completion; `partial` is the text
+    already streamed, so a fallback model can continue from it rather than
+    starting over. Going `stall_timeout` seconds without a chunk (including
+    the wait for the first one) counts as a stall. KEEPALIVE is yielded every
+    `keepalive_interval` seconds of silence. `report(model, latency, ok)` is
+    called with each model's time to first chunk, or with ok=False when it fails.
+    """
+    partial = ""
+
+    for attempt, model in enumerate(models):
+        async def attempt_stream():
+            response = await open_stream(model, partial)
+            async for text in buffered_content(response, maxsize, policy):
+                yield text
+
+        stream = attempt_stream()
+        pending = None
+        tick = min(keepalive_interval, stall_timeout)
+        started = time.monotonic()
+        first_chunk = True
+        try:
+            idle = 0.0
+            pending = asyncio.ensure_future(stream.__anext__())
+            while True:
+                done, _ = await asyncio.wait({pending}, timeout=tick)
+                if not done:
+                    idle += tick
+                    if idle >= stall_timeout:
+                        raise StreamStalled(f"{model} sent nothing for {idle:.0f}s")
+                    yield KEEPALIVE
+                    continue
+
+                try:
+                    text = pending.result()
+                except StopAsyncIteration:
+                    pending = None
+                    return
+
+                if first_chunk and report:
+                    report(model, time.monotonic() - started, True)
+                first_chunk = False
+
+                idle = 0.0
+                partial += text
+                yield text
+                pending = asyncio.ensure_future(stream.__anext__())
+        except Exception as e:
+            if report:
+                report(model, None, False)
+            if attempt == len(models) - 1:
+                raise
+            metrics.incr("ui.failovers")
+            logger.warning(f"UI stream from {model} failed after {len(partial)} chars, failing over: {e}")
+        finally:
+            if pending and not pending.done():
+                pending.cancel()
+                try:
+                    await pending
+                except BaseException:
+                    pass
+            await stream.aclose()
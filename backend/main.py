@@ -1,24 +1,29 @@
-from fastapi import FastAPI, Query
+from fastapi import FastAPI, Query, Header
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import StreamingResponse, JSONResponse, HTMLResponse
 from pydantic import BaseModel
 from litellm import acompletion
+import asyncio
 import json
-from typing import AsyncGenerator, Optional, Literal
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncGenerator, AsyncIterator, Callable, Optional, Literal
 
 import logging
 from config import get_settings
 from data import MOCK_DATA
-from utils import get_data, sanitize_prompt
+from utils import get_data, sanitize_prompt, StreamingJSONField
 from prompts import (
     build_planning_prompt,
+    build_merged_planning_prompt,
     build_ui_system_prompt,
     build_ui_user_prompt,
+    build_section_system_prompt,
+    build_continuation_prompt,
     build_refine_system_prompt,
     build_interact_system_prompt,
     describe_data,
 )
-from litellm import completion
 from integrations import (
     SpotifyDataFetcher,
     StocksDataFetcher,
@@ -26,29 +31,91 @@ from integrations import (
     StravaDataFetcher,
     ClashRoyaleDataFetcher,
 )
-from tool_generator import generate_tools_from_fetchers
+from integrations.sports import LEAGUE_CONFIG
+from tool_generator import generate_tools_from_fetchers, compact_tools, estimate_tokens, limit_result, tool_limits
+from streams import StreamRegistry
+from llm_stream import failover_content, chunk_text, streamed_tool_calls, KEEPALIVE
+from metrics import metrics
+from skeleton import build_skeleton
+from sections import split_sections, stitch_in_order
+from hedging import hedged, hedge_delay
+from model_router import ModelRouter
+from query_router import QueryRouter, NAMESPACE_SOURCES, entity_namespaces, unrouted_words
+from intent_classifier import IntentClassifier, log_plan
+from plan_compiler import compile_plan, needs_agent, required_params
+from agent_loop import agent_rounds
+from tool_executor import (
+    call_tool,
+    run_tools,
+    merge_result,
+    prefetch_tools,
+    select_tools,
+    stale_fallback,
+    source_priority,
+    ToolLatency,
+)
+from deadline import Deadline, first_within
+from tool_cache import ToolCache
+from tool_validation import compile_validators, domain_validators
+from http_client import HTTPClient
+from resilience import Resilience, RetryBudget
+from circuit_breaker import BreakerRegistry
+from adaptive_timeouts import AdaptiveTimeouts
 
 logger = logging.getLogger(__name__)
 
 app = FastAPI()
 settings = get_settings()
 
+breakers = BreakerRegistry(settings.breaker_failure_threshold, settings.breaker_reset_timeout)
+
+http_timeouts = AdaptiveTimeouts(
+    default=(settings.http_connect_timeout, settings.http_read_timeout),
+    minimum=(settings.http_connect_timeout_range[0], settings.http_read_timeout_range[0]),
+    maximum=(settings.http_connect_timeout_range[1], settings.http_read_timeout_range[1]),
+    multiplier=settings.http_timeout_multiplier,
+    percentile=settings.http_timeout_percentile,
+    min_samples=settings.http_timeout_min_samples,
+)
+
+http_client = HTTPClient(
+    timeout=(settings.http_connect_timeout, settings.http_read_timeout),
+    max_connections_per_host=settings.http_max_connections_per_host,
+    http2=settings.http2,
+    resilience=Resilience(
+        max_attempts=settings.http_retry_attempts,
+        base_delay=settings.http_retry_base_delay,
+        max_delay=settings.http_retry_max_delay,
+        max_retry_after=settings.http_retry_after_max,
+        max_rate_limit_wait=settings.http_rate_limit_max_wait,
+        rate_limits=settings.http_rate_limits,
+        budget=RetryBudget(ratio=settings.http_retry_budget),
+    ),
+    breakers=breakers,
+    timeouts=http_timeouts if settings.http_adaptive_timeouts else None,
+)
+
 spotify_fetcher = SpotifyDataFetcher(
     client_id=settings.spotify_client_id,
     client_secret=settings.spotify_client_secret,
-    redirect_uri=settings.spotify_redirect_uri
+    redirect_uri=settings.spotify_redirect_uri,
+    http=http_client,
 )
 
-stocks_fetcher = StocksDataFetcher(alpha_vantage_key=settings.alpha_vantage_api_key)
+stocks_fetcher = StocksDataFetcher(
+    alpha_vantage_key=settings.alpha_vantage_api_key,
+    timeouts=http_timeouts if settings.http_adaptive_timeouts else None,
+)
 
-sports_fetcher = SportsDataFetcher(api_key=settings.sports_api_key)
+sports_fetcher = SportsDataFetcher(api_key=settings.sports_api_key, http=http_client)
 
 strava_fetcher = StravaDataFetcher(
     client_id=settings.strava_client_id,
     client_secret=settings.strava_client_secret,
     refresh_token=settings.strava_refresh_token,
+    http=http_client,
 )
-clash_fetcher = ClashRoyaleDataFetcher(api_key=settings.clashroyale_api_key)
+clash_fetcher = ClashRoyaleDataFetcher(api_key=settings.clashroyale_api_key, http=http_client)
 
 fetchers = {
     "spotify": spotify_fetcher,
@@ -59,6 +126,39 @@ fetchers = {
 }
 
 tools, available_functions = generate_tools_from_fetchers(fetchers)
+tool_requirements = required_params(tools)
+# argument checks run before any call goes out; bad args come back as structured errors
+tool_validators = compile_validators(tools, domain_validators(LEAGUE_CONFIG))
+llm_tools = compact_tools(tools) if settings.compact_tool_descriptions else tools
+full_tool_tokens = estimate_tokens(tools)
+tool_cache = ToolCache(settings.tool_cache_ttls)
+# sync (not yet async) tools run here, off the event loop
+tool_threads = ThreadPoolExecutor(settings.tool_threads, thread_name_prefix="tool")
+# EWMA run time per tool: calls waiting for a slot go shortest-expected first, and
+# ones expected to outlast the request deadline are skipped
+tool_latency = ToolLatency()
+
+model_router = ModelRouter(
+    settings.model_routes,
+    latency_thresholds=settings.model_latency_thresholds,
+    error_threshold=settings.model_error_threshold,
+    probe_interval=settings.model_probe_interval,
+)
+
+query_router = QueryRouter(LEAGUE_CONFIG, unrouted_words(MOCK_DATA, set(NAMESPACE_SOURCES)))
+
+intent_classifier: Optional[IntentClassifier] = None
+if settings.intent_model_path:
+    try:
+        intent_classifier = IntentClassifier.load(settings.intent_model_path)
+        logger.info(f"Loaded intent classifier with {len(intent_classifier.labels)} classes")
+    except (OSError, ValueError, KeyError) as e:
+        logger.warning(f"Could not load intent classifier from {settings.intent_model_path}: {e}")
+
+stream_registry = StreamRegistry(
+    max_events=settings.stream_replay_events,
+    ttl_seconds=settings.stream_ttl_seconds,
+)
 
 app.add_middleware(
     CORSMiddleware,
@@ -71,6 +171,10 @@ app.add_middleware(
 
 class GenerateRequest(BaseModel):
     query: str
+    # generate the screen as concurrent sections; defaults to settings.parallel_sections
+    parallel: Optional[bool] = None
+    # defaults to settings.generate_pipeline
+    pipeline: Optional[Literal["staged", "merged"]] = None
 
 
 ModelType = Literal[
@@ -82,7 +186,8 @@ ModelType = Literal[
 
 class QueryRequest(BaseModel):
     prompt: str
-    model: ModelType = "gpt-5-mini"
+    # picked by the model router when omitted
+    model: Optional[ModelType] = None
 
 
 @app.post("/api/query")
@@ -90,23 +195,25 @@ async def intelligent_query(request: QueryRequest):
     """Use LiteLLM function calling to dynamically fetch data based on user prompt"""
     prompt = sanitize_prompt(request.prompt)
 
-    if request.model.startswith("anthropic/"):
-        api_key = settings.anthropic_api_key
-    else:
-        api_key = settings.openai_api_key
-
     messages = [
         {"role": "system", "content": "You are a helpful assistant that retrieves user data from various sources. Use the available functions to fetch the requested data."},
         {"role": "user", "content": prompt}
     ]
 
-    response = completion(
-        model=request.model,
-        messages=messages,
-        tools=tools,
-        tool_choice="auto",
-        api_key=api_key
-    )
+    async def ask(model: str):
+        response = await acompletion(
+            model=model,
+            messages=messages,
+            tools=llm_tools,
+            tool_choice="auto",
+            api_key=api_key_for(model)
+        )
+        return model, response
+
+    if request.model:
+        model, response = await ask(request.model)
+    else:
+        model, response = await model_router.call("query", ask)
 
     response_message = response.choices[0].message
     tool_calls = response_message.tool_calls
@@ -127,17 +234,18 @@ async def intelligent_query(request: QueryRequest):
             data[function_name] = {"error": f"Unknown function: {function_name}"}
             continue
 
-        try:
-            if function_args:
-                result = function_to_call(**function_args)
-            else:
-                result = function_to_call()
+        function_args, invalid = tool_validators[function_name](function_args or {})
+        if invalid:
+            data[function_name] = {"error": "Invalid arguments", "invalid": invalid}
+            continue
 
-            data[function_name] = result
+        try:
+            result = await call_tool(function_to_call, function_args, tool_threads)
+            data[function_name] = limit_result(result, tool_limits(function_to_call))
         except Exception as e:
             data[function_name] = {"error": str(e)}
 
-    return {"prompt": prompt, "model": request.model, "functions_called": functions_called, "data": data}
+    return {"prompt": prompt, "model": model, "functions_called": functions_called, "data": data}
 
 
 class RefineRequest(BaseModel):
@@ -152,6 +260,14 @@ class InteractRequest(BaseModel):
     currentHtml: str
     dataContext: dict
     componentType: str
+    # data-source of the clicked component, e.g. "music::top_songs"
+    dataSource: Optional[str] = None
+
+
+@app.on_event("shutdown")
+async def close_http_client():
+    await http_client.aclose()
+    tool_threads.shutdown(wait=False, cancel_futures=True)
 
 
 @app.get("/health")
@@ -159,6 +275,20 @@ async def health():
     return {"status": "ok"}
 
 
+@app.get("/api/status")
+async def upstream_status():
+    return {
+        "breakers": breakers.snapshot(),
+        "timeouts": http_timeouts.snapshot(),
+        "tool_latency": tool_latency.snapshot(),
+    }
+
+
+@app.get("/api/metrics")
+async def get_metrics():
+    return {**metrics.snapshot(), "models": model_router.snapshot()}
+
+
 @app.get("/api/spotify/auth")
 async def spotify_auth():
     if not spotify_fetcher:
@@ -356,7 +486,7 @@ async def clash_player(player_tag: str):
         return JSONResponse(
             status_code=401, content={"error": "API key not configured"}
         )
-    data = clash_fetcher.get_player(player_tag)
+    data = await clash_fetcher.get_player(player_tag)
     if not data:
         return JSONResponse(status_code=404, content={"error": "Player not found"})
     return data
@@ -368,7 +498,7 @@ async def clash_summary(player_tag: str):
         return JSONResponse(
             status_code=401, content={"error": "API key not configured"}
         )
-    data = clash_fetcher.fetch_user_summary(player_tag)
+    data = await clash_fetcher.fetch_user_summary(player_tag)
     if not data:
         return JSONResponse(status_code=404, content={"error": "Player not found"})
     return data
@@ -379,7 +509,7 @@ async def generate_ui_legacy(request: GenerateRequest):
     """Legacy endpoint using mock data. Use /api/generate for agent-based fetching."""
     async def event_stream() -> AsyncGenerator[str, None]:
         try:
-            plan = await plan_and_classify(request.query)
+            plan = await plan_query(request.query)
             data_context = get_data(plan["sources"], MOCK_DATA)
 
             intent = plan.get("intent", "")
@@ -387,30 +517,19 @@ async def generate_ui_legacy(request: GenerateRequest):
 
             yield f"event: data\ndata: {json.dumps(data_context)}\n\n"
 
-            response = await acompletion(
-                model="anthropic/claude-sonnet-4-5-20250929",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": build_ui_system_prompt(intent, approach),
-                    },
-                    {
-                        "role": "user",
-                        "content": build_ui_user_prompt(request.query, data_context),
-                    },
-                ],
-                stream=True,
-                max_tokens=4000,
-                api_key=settings.anthropic_api_key,
-            )
+            messages = [
+                {
+                    "role": "system",
+                    "content": build_ui_system_prompt(intent, approach),
+                },
+                {
+                    "role": "user",
+                    "content": build_ui_user_prompt(request.query, data_context),
+                },
+            ]
 
-            async for chunk in response:
-                if (
-                    hasattr(chunk.choices[0].delta, "content")
-                    and chunk.choices[0].delta.content
-                ):
-                    content = chunk.choices[0].delta.content
-                    yield f"event: ui\ndata: {json.dumps({'content': content})}\n\n"
+            async for frame in stream_ui_events(messages, request_features("generate", data_context)):
+                yield frame
 
             yield f"event: done\ndata: {{}}\n\n"
 
@@ -427,133 +546,187 @@ async def generate_ui_legacy(request: GenerateRequest):
     )
 
 
-# Namespace mapping: tool function prefixes → data context keys
-TOOL_TO_NAMESPACE = {
-    "spotify": "music",
-    "stocks": "stocks",
-    "sports": "sports",
-    "strava": "fitness",
-    "clash": "gaming",
-}
-
-
 @app.post("/api/generate")
-async def generate_ui(request: GenerateRequest):
-    async def event_stream() -> AsyncGenerator[str, None]:
-        try:
-            yield f"event: thinking\ndata: {json.dumps({'message': 'Planning query...'})}\n\n"
-            plan = await plan_and_classify(request.query)
-
-            intent = plan.get("intent", "")
-            approach = plan.get("approach", "")
-
-            yield f"event: thinking\ndata: {json.dumps({'message': f'Intent: {intent}'})}\n\n"
-
-            agent_prompt = f"""Based on this user query, fetch the relevant data.
+async def generate_ui(
+    request: GenerateRequest, last_event_id: Optional[str] = Header(None)
+):
+    """
+    Runs generation in the background and streams it to the client.
+    Reconnecting with Last-Event-ID replays from the buffer instead of starting over.
+    """
+    resumed = stream_registry.resume(last_event_id)
+    if resumed:
+        session, after_seq = resumed
+    else:
+        session = stream_registry.start(generate_events(request))
+        after_seq = -1
 
-Query: {request.query}
-Intent: {intent}
-Suggested sources: {', '.join(plan.get('sources', []))}
+    return StreamingResponse(
+        session.subscribe(after_seq, settings.sse_keepalive_seconds),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+            "X-Stream-Id": session.stream_id,
+        },
+    )
 
-Call the appropriate functions to get the data needed."""
 
-            agent_messages = [
-                {
-                    "role": "system",
-                    "content": "You are a data fetching agent. Use the available functions to retrieve user data. Call multiple functions if needed."
-                },
-                {"role": "user", "content": agent_prompt}
-            ]
+async def generate_events(request: GenerateRequest) -> AsyncGenerator[str, None]:
+    parallel = request.parallel if request.parallel is not None else settings.parallel_sections
+    pipeline = request.pipeline or settings.generate_pipeline
+    start = time.monotonic()
+    prefetched = []
+    # everything before UI generation has to fit in this, leaving ui_reserve for the first UI chunk
+    data_deadline = Deadline(settings.request_deadline - settings.ui_reserve)
+    request_deadline = Deadline(settings.request_deadline)
+    # speculative fetches get the checks run_tools applies to real calls
+    prefetch_guards = {"validators": tool_validators, "breakers": breakers, "deadline": data_deadline, "latency": tool_latency}
+    first_ui = True
+
+    def mark_first_ui():
+        nonlocal first_ui
+        if first_ui:
+            first_ui = False
+            elapsed = time.monotonic() - start
+            metrics.observe("generate.first_ui", elapsed)
+            if elapsed > settings.request_deadline:
+                metrics.incr("deadline.missed")
 
-            agent_response = completion(
-                model="gpt-5-mini",
-                messages=agent_messages,
-                tools=tools,
-                tool_choice="auto",
-                api_key=settings.openai_api_key
+    try:
+        if settings.speculative_prefetch:
+            # overlap fetches for anything the query names with planning; results land in tool_cache
+            likely, likely_entities = query_router.likely_sources(request.query)
+            speculative = compile_plan(likely, likely_entities, tool_requirements)["calls"]
+            prefetched = prefetch_tools(speculative, available_functions, tool_cache, tool_threads, **prefetch_guards)
+
+        def start_planned_fetches(sources: list):
+            # the plan's sources arrive before its intent; their tools can start now
+            compiled = compile_plan(sources, query_router.extract_entities(request.query), tool_requirements)
+            prefetched.extend(prefetch_tools(compiled["calls"], available_functions, tool_cache, tool_threads, **prefetch_guards))
+
+        yield f"event: thinking\ndata: {json.dumps({'message': 'Planning query...'})}\n\n"
+        try:
+            plan = await asyncio.wait_for(
+                plan_query(
+                    request.query,
+                    with_sections=parallel,
+                    with_tools=pipeline == "merged",
+                    on_sources=start_planned_fetches if settings.plan_compiler else None,
+                ),
+                min(settings.plan_timeout, data_deadline.remaining()),
             )
+        except asyncio.TimeoutError:
+            metrics.incr("deadline.plan_timeouts")
+            yield f"event: thinking\ndata: {json.dumps({'message': 'Planning is taking too long, using a quick plan'})}\n\n"
+            plan = query_router.fallback_plan(request.query, MOCK_DATA)
+        merged_calls = plan.pop("tool_calls", None)
+
+        intent = plan.get("intent", "")
+        approach = plan.get("approach", "")
+
+        yield f"event: thinking\ndata: {json.dumps({'message': f'Intent: {intent}'})}\n\n"
+        yield f"event: skeleton\ndata: {json.dumps({'html': build_skeleton(plan)})}\n\n"
+
+        data_context = {}
+        sources = plan.get("sources", [])
+        entities = plan.get("entities") or query_router.extract_entities(request.query)
+
+        if merged_calls is not None:
+            # the planner already picked the tools; compile only to find mock-only sources
+            compiled = {**compile_plan(sources, entities, tool_requirements), "calls": merged_calls}
+            use_agent = False
+        elif settings.plan_compiler:
+            compiled = compile_plan(sources, entities, tool_requirements)
+            use_agent = needs_agent(compiled, entities)
+        else:
+            compiled = {"calls": [], "unresolved": sources, "static": []}
+            use_agent = True
+
+        if use_agent:
+            metrics.incr("agent.calls")
+        elif merged_calls is None:
+            metrics.incr("agent.skipped")
+
+        # compiled calls keep the plan sources they serve, for scheduling priority
+        calls = [{"function": c["function"], "args": c["args"], "sources": c.get("sources", [])} for c in compiled["calls"]]
+
+        if use_agent:
+            # the agent only has to cover what didn't compile; compiled calls run in its first round
+            agent_sources = compiled["unresolved"] if calls else sources
+            namespaces = {source.split("::", 1)[0] for source in agent_sources} | entity_namespaces(entities)
+            events = agent_events(
+                build_agent_messages(request.query, intent, agent_sources),
+                agent_tools(namespaces),
+                request_features("generate"),
+                initial_calls=calls,
+                deadline=data_deadline,
+                sources=sources,
+            )
+        else:
+            events = tool_events(calls, data_deadline, sources)
 
-            data_context = {}
-            tool_calls = agent_response.choices[0].message.tool_calls
-
-            if tool_calls:
-                for tool_call in tool_calls:
-                    function_name = tool_call.function.name
-                    function_args = json.loads(tool_call.function.arguments)
-
-                    yield f"event: tool_call\ndata: {json.dumps({'function': function_name, 'args': function_args})}\n\n"
-
-                    prefix = function_name.split("_")[0]
-                    namespace = TOOL_TO_NAMESPACE.get(prefix, prefix)
-
-                    function_to_call = available_functions.get(function_name)
-                    if function_to_call:
-                        try:
-                            if function_args:
-                                result = function_to_call(**function_args)
-                            else:
-                                result = function_to_call()
-
-                            if namespace not in data_context:
-                                data_context[namespace] = {}
+        async for frame in tool_frames(events, data_context, data_deadline):
+            yield frame
 
-                            if isinstance(result, dict):
-                                data_context[namespace].update(result)
-                            else:
-                                key = function_name.replace(f"{prefix}_", "")
-                                data_context[namespace][key] = result
+        if not data_context:
+            yield f"event: thinking\ndata: {json.dumps({'message': 'No tools called, using sample data'})}\n\n"
+            data_context = get_data(plan["sources"], MOCK_DATA)
+        elif compiled["static"]:
+            # sample data for mock-only sources planned alongside live ones
+            for namespace, values in get_data(compiled["static"], MOCK_DATA).items():
+                data_context.setdefault(namespace, {}).update(values)
 
-                            yield f"event: tool_result\ndata: {json.dumps({'function': function_name, 'success': True})}\n\n"
+        path = "merged" if merged_calls is not None else "staged" if use_agent else "compiled"
+        metrics.observe(f"pipeline.{path}.data_ready", time.monotonic() - start)
 
-                        except Exception as e:
-                            logger.error(f"Tool {function_name} failed: {e}")
-                            yield f"event: tool_error\ndata: {json.dumps({'function': function_name, 'error': str(e)})}\n\n"
+        yield f"event: data\ndata: {json.dumps(data_context)}\n\n"
+        yield f"event: thinking\ndata: {json.dumps({'message': 'Generating UI...'})}\n\n"
 
-            if not data_context:
-                yield f"event: thinking\ndata: {json.dumps({'message': 'No tools called, using sample data'})}\n\n"
-                data_context = get_data(plan["sources"], MOCK_DATA)
+        sections = split_sections(plan, data_context, settings.max_parallel_sections) if parallel else []
 
-            yield f"event: data\ndata: {json.dumps(data_context)}\n\n"
-            yield f"event: thinking\ndata: {json.dumps({'message': 'Generating UI...'})}\n\n"
+        features = request_features("generate", data_context)
+        if len(sections) > 1:
+            metrics.observe("ui.sections", len(sections))
 
-            response = await acompletion(
-                model="anthropic/claude-sonnet-4-5-20250929",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": build_ui_system_prompt(intent, approach),
-                    },
-                    {
-                        "role": "user",
-                        "content": build_ui_user_prompt(request.query, data_context),
-                    },
-                ],
-                stream=True,
-                max_tokens=4000,
-                api_key=settings.anthropic_api_key,
-            )
+            def ui_frames(skip_models: int = 0) -> AsyncGenerator[str, None]:
+                streams = [
+                    stream_section(request.query, intent, approach, section, index, len(sections), skip_models)
+                    for index, section in enumerate(sections)
+                ]
+                return section_frames(stitch_in_order(streams, settings.llm_buffer_size))
+        else:
+            messages = [
+                {
+                    "role": "system",
+                    "content": build_ui_system_prompt(intent, approach),
+                },
+                {
+                    "role": "user",
+                    "content": build_ui_user_prompt(request.query, data_context),
+                },
+            ]
 
-            async for chunk in response:
-                if (
-                    hasattr(chunk.choices[0].delta, "content")
-                    and chunk.choices[0].delta.content
-                ):
-                    content = chunk.choices[0].delta.content
-                    yield f"event: ui\ndata: {json.dumps({'content': content})}\n\n"
+            def ui_frames(skip_models: int = 0) -> AsyncGenerator[str, None]:
+                return stream_ui_events(messages, features, skip_models=skip_models)
 
-            yield f"event: done\ndata: {{}}\n\n"
+        # the first UI chunk has whatever is left of the request budget; past it
+        # the next UI model takes over, and with none left the skeleton stays up
+        backup = len(model_router.candidates("ui", features)) > 1
+        frames = first_within(
+            ui_frames(), request_deadline, is_ui_frame, lambda: after_ui_deadline(ui_frames(1), backup)
+        )
+        async for frame in frames:
+            if is_ui_frame(frame):
+                mark_first_ui()
+            yield frame
 
-        except Exception as e:
-            yield f"event: error\ndata: {json.dumps({'message': str(e)})}\n\n"
+        yield f"event: done\ndata: {{}}\n\n"
 
-    return StreamingResponse(
-        event_stream(),
-        media_type="text/event-stream",
-        headers={
-            "Cache-Control": "no-cache",
-            "Connection": "keep-alive",
-        },
-    )
+    except Exception as e:
+        yield f"event: error\ndata: {json.dumps({'message': str(e)})}\n\n"
+    finally:
+        tool_cache.settle(prefetched)
 
 
 @app.post("/api/refine")
@@ -568,24 +741,16 @@ async def refine_ui(request: RefineRequest):
 
             system_prompt = build_refine_system_prompt(request.currentHtml)
 
-            response = await acompletion(
-                model="anthropic/claude-sonnet-4-5-20250929",
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": request.query},
-                ],
-                stream=True,
-                max_tokens=4000,
-                api_key=settings.anthropic_api_key,
-            )
+            messages = [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": request.query},
+            ]
 
-            async for chunk in response:
-                if (
-                    hasattr(chunk.choices[0].delta, "content")
-                    and chunk.choices[0].delta.content
-                ):
-                    content = chunk.choices[0].delta.content
-                    yield f"event: ui\ndata: {json.dumps({'content': content})}\n\n"
+            async for frame in stream_ui_events(
+                messages,
+                request_features("refine", request.dataContext, len(request.currentHtml)),
+            ):
+                yield frame
 
             yield f"event: done\ndata: {{}}\n\n"
 
@@ -632,54 +797,27 @@ Call the appropriate functions to get detailed data for this drill-down view."""
             agent_messages = [
                 {
                     "role": "system",
-                    "content": "You are a data fetching agent. Fetch detailed data for a drill-down view based on the clicked item. Use available functions to get relevant details."
+                    "content": "You are a data fetching agent. Fetch detailed data for a drill-down view based on the clicked item. Use available functions to get relevant details. "
+                    + AGENT_ROUNDS_HINT,
                 },
                 {"role": "user", "content": agent_prompt}
             ]
 
-            agent_response = completion(
-                model="gpt-5-mini",
-                messages=agent_messages,
-                tools=tools,
-                tool_choice="auto",
-                api_key=settings.openai_api_key
+            # the clicked component's namespace, else whatever is on screen
+            if request.dataSource and "::" in request.dataSource:
+                namespaces = {request.dataSource.split("::", 1)[0]}
+            else:
+                namespaces = set(request.dataContext) - {"clicked_item"}
+            events = agent_events(
+                agent_messages,
+                agent_tools(namespaces),
+                request_features("interact", request.dataContext),
+                sources=[request.dataSource] if request.dataSource else None,
             )
 
             detail_data = {}
-            tool_calls = agent_response.choices[0].message.tool_calls
-
-            if tool_calls:
-                for tool_call in tool_calls:
-                    function_name = tool_call.function.name
-                    function_args = json.loads(tool_call.function.arguments)
-
-                    yield f"event: tool_call\ndata: {json.dumps({'function': function_name, 'args': function_args})}\n\n"
-
-                    prefix = function_name.split("_")[0]
-                    namespace = TOOL_TO_NAMESPACE.get(prefix, prefix)
-
-                    function_to_call = available_functions.get(function_name)
-                    if function_to_call:
-                        try:
-                            if function_args:
-                                result = function_to_call(**function_args)
-                            else:
-                                result = function_to_call()
-
-                            if namespace not in detail_data:
-                                detail_data[namespace] = {}
-
-                            if isinstance(result, dict):
-                                detail_data[namespace].update(result)
-                            else:
-                                key = function_name.replace(f"{prefix}_", "")
-                                detail_data[namespace][key] = result
-
-                            yield f"event: tool_result\ndata: {json.dumps({'function': function_name, 'success': True})}\n\n"
-
-                        except Exception as e:
-                            logger.error(f"Tool {function_name} failed: {e}")
-                            yield f"event: tool_error\ndata: {json.dumps({'function': function_name, 'error': str(e)})}\n\n"
+            async for frame in tool_frames(events, detail_data):
+                yield frame
 
             combined_context = {**request.dataContext}
             for namespace, data in detail_data.items():
@@ -706,24 +844,13 @@ Data Available:
 
 Generate the detail view HTML now."""
 
-            response = await acompletion(
-                model="anthropic/claude-sonnet-4-5-20250929",
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt},
-                ],
-                stream=True,
-                max_tokens=4000,
-                api_key=settings.anthropic_api_key,
-            )
+            messages = [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt},
+            ]
 
-            async for chunk in response:
-                if (
-                    hasattr(chunk.choices[0].delta, "content")
-                    and chunk.choices[0].delta.content
-                ):
-                    content = chunk.choices[0].delta.content
-                    yield f"event: ui\ndata: {json.dumps({'content': content})}\n\n"
+            async for frame in stream_ui_events(messages, request_features("interact", combined_context)):
+                yield frame
 
             yield f"event: done\ndata: {{}}\n\n"
 
@@ -740,18 +867,432 @@ Generate the detail view HTML now."""
     )
 
 
-async def plan_and_classify(query: str) -> dict:
-    response = await acompletion(
-        model="anthropic/claude-sonnet-4-5-20250929",
-        messages=[{"role": "user", "content": build_planning_prompt(query)}],
-        max_tokens=300,
-        api_key=settings.anthropic_api_key,
+SECTIONS_OPEN = '<div class="min-h-screen bg-background text-foreground p-4 space-y-6">'
+SECTIONS_CLOSE = "</div>"
+
+
+def api_key_for(model: str) -> str:
+    if model.startswith("anthropic/"):
+        return settings.anthropic_api_key
+    return settings.openai_api_key
+
+
+def request_features(kind: str, data: Optional[dict] = None, extra_chars: int = 0) -> dict:
+    """Request features the model router uses to filter candidates."""
+    data_chars = len(json.dumps(data)) if data else 0
+    return {"kind": kind, "data_chars": data_chars + extra_chars}
+
+
+def ui_content(messages: list, features: dict, max_tokens: int = 4000, skip_models: int = 0) -> AsyncGenerator:
+    """
+    UI text from the routed model, failing over to the next "ui" candidate on a
+    stall or error. `skip_models` leaves out the best candidates (nothing is
+    streamed if that's all of them).
+    """
+    async def open_stream(model: str, partial: str):
+        attempt_messages = messages
+        if partial:
+            attempt_messages = messages + [
+                {"role": "user", "content": build_continuation_prompt(partial)}
+            ]
+        return await acompletion(
+            model=model,
+            messages=attempt_messages,
+            stream=True,
+            max_tokens=max_tokens,
+            api_key=api_key_for(model),
+        )
+
+    return failover_content(
+        open_stream,
+        model_router.candidates("ui", features)[skip_models:],
+        stall_timeout=settings.ui_stall_timeout,
+        keepalive_interval=settings.sse_keepalive_seconds,
+        maxsize=settings.llm_buffer_size,
+        policy=settings.llm_buffer_policy,
+        report=lambda model, latency, ok: model_router.record("ui", model, latency, ok),
+    )
+
+
+async def stream_ui_events(
+    messages: list, features: dict, max_tokens: int = 4000, skip_models: int = 0
+) -> AsyncGenerator[str, None]:
+    async for content in ui_content(messages, features, max_tokens, skip_models):
+        if content is KEEPALIVE:
+            yield ": keepalive\n\n"
+        else:
+            yield f"event: ui\ndata: {json.dumps({'content': content})}\n\n"
+
+
+def is_ui_frame(frame: str) -> bool:
+    return frame.startswith("event: ui")
+
+
+async def section_frames(contents: AsyncIterator[str]) -> AsyncGenerator[str, None]:
+    """Stitched section text as ui events, wrapped in the sections container once there is any."""
+    opened = False
+    async for content in contents:
+        if not opened:
+            opened = True
+            yield f"event: ui\ndata: {json.dumps({'content': SECTIONS_OPEN})}\n\n"
+        yield f"event: ui\ndata: {json.dumps({'content': content})}\n\n"
+    if opened:
+        yield f"event: ui\ndata: {json.dumps({'content': SECTIONS_CLOSE})}\n\n"
+
+
+async def after_ui_deadline(frames: AsyncIterator[str], backup: bool) -> AsyncGenerator[str, None]:
+    """UI frames from the backup model once the primary has missed the request deadline."""
+    metrics.incr("deadline.ui_timeouts")
+    message = "UI is slow, switching models..." if backup else "UI is taking too long, showing the layout"
+    yield f"event: thinking\ndata: {json.dumps({'message': message})}\n\n"
+    async for frame in frames:
+        yield frame
+
+
+async def stream_section(
+    query: str, intent: str, approach: str, section: dict, index: int, total: int, skip_models: int = 0
+) -> AsyncGenerator[str, None]:
+    """Generate one section of a parallel screen, yielding its text as it arrives."""
+    messages = [
+        {
+            "role": "system",
+            "content": build_section_system_prompt(intent, approach, section["title"], index, total),
+        },
+        {
+            "role": "user",
+            "content": build_ui_user_prompt(query, section["data"]),
+        },
+    ]
+
+    features = request_features("section", section["data"])
+    async for content in ui_content(messages, features, max_tokens=1500, skip_models=skip_models):
+        if content is not KEEPALIVE:
+            yield content
+
+
+def agent_tools(namespaces: set) -> list:
+    """Tool schemas for an agent call, narrowed to `namespaces`, with the prompt-size saving recorded."""
+    subset = select_tools(llm_tools, namespaces) if settings.agent_tool_subsetting else llm_tools
+    subset_tokens = estimate_tokens(subset)
+    metrics.observe("agent.tool_tokens", subset_tokens)
+    metrics.observe("agent.tool_tokens_saved", full_tool_tokens - subset_tokens)
+    return subset
+
+
+def build_agent_messages(query: str, intent: str, sources: list) -> list:
+    agent_prompt = f"""Based on this user query, fetch the relevant data.
+
+Query: {query}
+Intent: {intent}
+Suggested sources: {', '.join(sources)}
+
+Call the appropriate functions to get the data needed."""
+
+    return [
+        {
+            "role": "system",
+            "content": "You are a data fetching agent. Use the available functions to retrieve user data. Call multiple functions if needed. "
+            + AGENT_ROUNDS_HINT,
+        },
+        {"role": "user", "content": agent_prompt}
+    ]
+
+
+async def stream_agent_calls(messages: list, selected_tools: list, features: dict) -> AsyncGenerator[dict, None]:
+    """
+    Stream the agent's response, yielding each tool call as soon as its
+    arguments are complete so it can start while later calls are still being
+    generated. Router latency for the agent stage is time to open the stream.
+    """
+    response = await model_router.call(
+        "agent",
+        lambda model: acompletion(
+            model=model,
+            messages=messages,
+            tools=selected_tools,
+            tool_choice="auto",
+            api_key=api_key_for(model),
+            stream=True,
+        ),
+        features,
+    )
+    async for call in streamed_tool_calls(response):
+        yield call
+
+
+AGENT_ROUNDS_HINT = (
+    "You will see summarized results of your calls and can call more functions "
+    "(e.g. a lookup, then a detail fetch); stop calling functions once you have what's needed."
+)
+
+
+def tool_events(
+    calls, deadline: Optional[Deadline] = None, sources: Optional[list] = None
+) -> AsyncGenerator[dict, None]:
+    """Executor events for a list (or async stream) of tool calls, prioritized by the plan's `sources`."""
+    return run_tools(
+        calls,
+        available_functions,
+        settings.tool_concurrency,
+        tool_cache,
+        report_starts=True,
+        breakers=breakers,
+        fallback=stale_fallback(tool_cache, MOCK_DATA),
+        deadline=deadline,
+        latency=tool_latency,
+        priority=(lambda call: source_priority(call, sources)) if sources else None,
+        executor=tool_threads,
+        validators=tool_validators,
+    )
+
+
+def agent_events(
+    messages: list,
+    selected_tools: list,
+    features: dict,
+    initial_calls: Optional[list] = None,
+    deadline: Optional[Deadline] = None,
+    sources: Optional[list] = None,
+) -> AsyncGenerator[dict, None]:
+    """Executor events for the multi-round agent loop."""
+    time_budget = settings.agent_time_budget
+    if deadline is not None:
+        time_budget = min(time_budget, deadline.remaining())
+    return agent_rounds(
+        messages,
+        lambda current: stream_agent_calls(current, selected_tools, features),
+        lambda calls: tool_events(calls, deadline, sources),
+        initial_calls=initial_calls,
+        max_rounds=settings.agent_max_rounds,
+        time_budget=time_budget,
+        summary_chars=settings.agent_summary_chars,
     )
 
-    text = response.choices[0].message.content
-    text = text.replace("```json", "").replace("```", "").strip()
-    return json.loads(text)
 
+async def tool_frames(events, data_context: dict, deadline: Optional[Deadline] = None) -> AsyncGenerator[str, None]:
+    """
+    Turn executor events into tool_call/tool_result/tool_error SSE events.
+    Results are merged into `data_context` in call order once all have finished.
+
+    With a `deadline`, fetching stops when it passes; whatever arrived by then
+    is merged and a notice says the data is partial.
+    """
+    outcomes = []
+    partial = False
+    while True:
+        try:
+            if deadline is None:
+                event = await anext(events)
+            else:
+                event = await asyncio.wait_for(anext(events), deadline.remaining())
+        except StopAsyncIteration:
+            break
+        except asyncio.TimeoutError:
+            # closing the generator cancels the calls still running
+            await events.aclose()
+            partial = True
+            break
+
+        if "round" in event:
+            message = f"Fetching more data (round {event['round']})..."
+            yield f"event: thinking\ndata: {json.dumps({'message': message})}\n\n"
+            continue
+        if event.get("started"):
+            yield f"event: tool_call\ndata: {json.dumps({'function': event['function'], 'args': event['args']})}\n\n"
+            continue
+        if "error" in event:
+            yield f"event: tool_error\ndata: {json.dumps({'function': event['function'], 'error': event['error']})}\n\n"
+        elif event.get("stale"):
+            source = "cached" if event["stale"] == "cache" else "sample"
+            message = f"{event['function']} is unavailable, using {source} data"
+            yield f"event: thinking\ndata: {json.dumps({'message': message})}\n\n"
+            yield f"event: tool_result\ndata: {json.dumps({'function': event['function'], 'success': True, 'stale': event['stale']})}\n\n"
+        else:
+            yield f"event: tool_result\ndata: {json.dumps({'function': event['function'], 'success': True})}\n\n"
+        outcomes.append(event)
+        partial = partial or event.get("skipped", False)
+
+    if partial:
+        metrics.incr("deadline.partial_data")
+        message = "Some data took too long and was left out"
+        yield f"event: thinking\ndata: {json.dumps({'message': message})}\n\n"
+
+    for outcome in sorted(outcomes, key=lambda o: o["index"]):
+        if "result" in outcome:
+            merge_result(data_context, outcome["function"], outcome["result"])
+
+
+async def plan_query(
+    query: str,
+    with_sections: bool = False,
+    with_tools: bool = False,
+    on_sources: Optional[Callable[[list], None]] = None,
+) -> dict:
+    """
+    Plan from the rule-based router when the query is recognizable, then the
+    local classifier when it's confident enough, otherwise ask the LLM.
+    With `with_tools` the LLM also picks tool calls, returned as `tool_calls`.
+    `on_sources` is passed on to plan_and_classify.
+    """
+    if settings.fastpath_routing:
+        start = time.monotonic()
+        plan = query_router.route(query)
+        if plan:
+            metrics.incr("plan.fastpath_hits")
+            metrics.observe("plan.fastpath_latency", time.monotonic() - start)
+            # credit what the LLM planner typically costs
+            if metrics.count("plan.latency"):
+                metrics.incr("plan.fastpath_saved_seconds", metrics.percentile("plan.latency", 50))
+            logger.info(f"Fast-path plan for '{query}': {plan['sources']}")
+        else:
+            metrics.incr("plan.fastpath_misses")
+
+        hits = metrics.counters["plan.fastpath_hits"]
+        metrics.set_gauge("plan.fastpath_hit_rate", hits / (hits + metrics.counters["plan.fastpath_misses"]))
+        if plan:
+            return plan
+
+    if intent_classifier:
+        start = time.monotonic()
+        plan, confidence = intent_classifier.predict(query)
+        metrics.observe("plan.classifier_latency", time.monotonic() - start)
+        metrics.observe("plan.classifier_confidence", confidence)
+        if confidence >= settings.intent_confidence_threshold:
+            metrics.incr("plan.classifier_hits")
+            # the class template is generic; name this query's teams or tickers instead
+            plan.update(query_router.describe(query) or {})
+            logger.info(f"Classifier plan for '{query}' ({confidence:.2f}): {plan['sources']}")
+            return plan
+        metrics.incr("plan.classifier_misses")
+
+    plan = None
+    if with_tools:
+        try:
+            plan = await plan_with_tools(query, with_sections)
+        except Exception as e:
+            logger.warning(f"Merged planning failed, planning in stages: {e}")
+            metrics.incr("plan.merged_fallbacks")
+    if plan is None:
+        plan = await plan_and_classify(query, with_sections, on_sources)
+
+    # only LLM plans are logged, so the classifier never trains on its own output
+    if settings.plan_log_path:
+        try:
+            log_plan(settings.plan_log_path, query, plan)
+        except OSError as e:
+            logger.warning(f"Could not log plan: {e}")
+
+    return plan
+
+
+async def plan_with_tools(query: str, with_sections: bool = False) -> dict:
+    """
+    Plan and pick tools in one call instead of a planning call followed by an
+    agent call. The tool calls come back on the plan as `tool_calls`.
+    """
+    prompt = build_merged_planning_prompt(query, with_sections)
+
+    async def ask(model: str) -> dict:
+        response = await acompletion(
+            model=model,
+            messages=[{"role": "user", "content": prompt}],
+            tools=llm_tools,
+            tool_choice="auto",
+            max_tokens=900 if with_sections else 600,
+            api_key=api_key_for(model),
+        )
+
+        message = response.choices[0].message
+        text = (message.content or "").replace("```json", "").replace("```", "").strip()
+        plan = json.loads(text)
+        if not isinstance(plan, dict) or not isinstance(plan.get("sources"), list):
+            raise ValueError("Merged plan has no sources list")
+
+        plan["tool_calls"] = [
+            {"function": tc.function.name, "args": json.loads(tc.function.arguments)}
+            for tc in message.tool_calls or []
+        ]
+        return plan
+
+    start = time.monotonic()
+    plan = await model_router.call("plan_tools", ask, request_features("plan"))
+    metrics.observe("plan.merged_latency", time.monotonic() - start)
+    return plan
+
+
+async def plan_and_classify(
+    query: str,
+    with_sections: bool = False,
+    on_sources: Optional[Callable[[list], None]] = None,
+) -> dict:
+    """
+    Plan the screen. Hedged: if the call is slower than the usual tail, a second
+    request races it and whichever returns valid JSON first wins.
+
+    The response is streamed, and `on_sources` is called with the sources list
+    as soon as it has been generated (once, whichever attempt gets there first),
+    while the intent and approach are still streaming.
+    """
+    prompt = build_planning_prompt(query, with_sections)
+    sources_seen = False
+
+    def surface(sources: list, elapsed: float):
+        nonlocal sources_seen
+        if sources_seen:
+            return
+        sources_seen = True
+        metrics.observe("plan.sources_latency", elapsed)
+        if on_sources:
+            try:
+                on_sources(sources)
+            except Exception as e:
+                logger.warning(f"on_sources callback failed: {e}")
+
+    async def attempt(model: str) -> dict:
+        start = time.monotonic()
+        sources_field = StreamingJSONField("sources")
+        text = ""
+        try:
+            response = await acompletion(
+                model=model,
+                messages=[{"role": "user", "content": prompt}],
+                # sections roughly double the plan's length
+                max_tokens=600 if with_sections else 300,
+                api_key=api_key_for(model),
+                stream=True,
+            )
+
+            async for chunk in response:
+                delta = chunk_text(chunk)
+                text += delta
+                sources = sources_field.feed(delta)
+                if isinstance(sources, list):
+                    surface(sources, time.monotonic() - start)
+
+            text = text.replace("```json", "").replace("```", "").strip()
+            plan = json.loads(text)
+        except Exception:
+            model_router.record("plan", model, None, ok=False)
+            raise
+
+        latency = time.monotonic() - start
+        model_router.record("plan", model, latency, ok=True)
+        metrics.observe("plan.latency", latency)
+        return plan
+
+    candidates = model_router.candidates("plan", request_features("plan"))
+    models = candidates[:1]
+    if settings.plan_hedging:
+        # hedge on the alternate model when there is one
+        models.append(candidates[1] if len(candidates) > 1 else candidates[0])
+
+    delay = hedge_delay("plan.latency", settings.plan_hedge_percentile, settings.plan_hedge_default_delay)
+    return await hedged(
+        [lambda model=model: attempt(model) for model in models],
+        delay,
+        validate=lambda plan: isinstance(plan, dict) and isinstance(plan.get("sources"), list),
+        name="plan",
+    )
 
 if __name__ == "__main__":
     import uvicorn
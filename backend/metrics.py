@@ -0,0 +1,77 @@
+import threading
+from collections import defaultdict, deque
+from typing import Any, Dict, Optional
+
+
+class Metrics:
+    """
+    In-process counters, gauges and rolling latency samples.
+    Thread-safe since tools run in worker threads. Exposed at /api/metrics.
+    """
+
+    def __init__(self, window: int = 500):
+        self._lock = threading.Lock()
+        self._window = window
+        self.counters: Dict[str, float] = defaultdict(float)
+        self.gauges: Dict[str, float] = {}
+        self._samples: Dict[str, deque] = {}
+
+    def incr(self, name: str, value: float = 1):
+        with self._lock:
+            self.counters[name] += value
+
+    def set_gauge(self, name: str, value: float):
+        with self._lock:
+            self.gauges[name] = value
+
+    def observe(self, name: str, value: float):
+        with self._lock:
+            if name not in self._samples:
+                self._samples[name] = deque(maxlen=self._window)
+            self._samples[name].append(value)
+
+    def percentile(self, name: str, pct: float) -> Optional[float]:
+        with self._lock:
+            samples = sorted(self._samples.get(name, ()))
+        if not samples:
+            return None
+        index = min(len(samples) - 1, int(round(pct / 100 * (len(samples) - 1))))
+        return samples[index]
+
+    def count(self, name: str) -> int:
+        with self._lock:
+            return len(self._samples.get(name, ()))
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            summaries = {}
+            for name, values in self._samples.items():
+                ordered = sorted(values)
+                if not ordered:
+                    continue
+
+                def pick(pct: float) -> float:
+                    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+                summaries[name] = {
+                    "count": len(ordered),
+                    "p50": round(pick(50), 4),
+                    "p90": round(pick(90), 4),
+                    "p99": round(pick(99), 4),
+                    "max": round(ordered[-1], 4),
+                }
+
+            return {
+                "counters": dict(self.counters),
+                "gauges": dict(self.gauges),
+                "summaries": summaries,
+            }
+
+    def reset(self):
+        with self._lock:
+            self.counters.clear()
+            self.gauges.clear()
+            self._samples.clear()
+
+
+metrics = Metrics()
@@ -0,0 +1,147 @@
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class ModelStats:
+    def __init__(self):
+        self.ewma_latency: Optional[float] = None
+        self.ewma_error = 0.0
+        self.calls = 0
+        self.last_call = 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "ewma_latency": round(self.ewma_latency, 3) if self.ewma_latency is not None else None,
+            "ewma_error": round(self.ewma_error, 3),
+            "calls": self.calls,
+        }
+
+
+class ModelRouter:
+    """
+    Picks the model for each pipeline stage from configured candidates.
+
+    `routes` maps stage -> candidates in preference order (cheapest/best first):
+        {"ui": [{"model": "anthropic/...", "max_data_chars": 60000, "kinds": ["generate"]}, ...]}
+    `max_data_chars` and `kinds` are optional and filter candidates by request
+    features. A candidate whose EWMA latency is above the stage threshold, or
+    whose EWMA error rate is above `error_threshold`, is skipped until it has
+    been idle for `probe_interval` seconds, then gets one probe call.
+    """
+
+    def __init__(
+        self,
+        routes: Dict[str, List[Dict[str, Any]]],
+        latency_thresholds: Optional[Dict[str, float]] = None,
+        error_threshold: float = 0.5,
+        alpha: float = 0.2,
+        probe_interval: float = 60.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.routes = routes
+        self.latency_thresholds = latency_thresholds or {}
+        self.error_threshold = error_threshold
+        self.alpha = alpha
+        self.probe_interval = probe_interval
+        self.clock = clock
+        self._stats: Dict[tuple, ModelStats] = {}
+
+    def _stat(self, stage: str, model: str) -> ModelStats:
+        key = (stage, model)
+        if key not in self._stats:
+            self._stats[key] = ModelStats()
+        return self._stats[key]
+
+    def _eligible(self, candidate: Dict[str, Any], features: Dict[str, Any]) -> bool:
+        max_chars = candidate.get("max_data_chars")
+        if max_chars is not None and features.get("data_chars", 0) > max_chars:
+            return False
+        kinds = candidate.get("kinds")
+        if kinds and features.get("kind") not in kinds:
+            return False
+        return True
+
+    def is_degraded(self, stage: str, model: str) -> bool:
+        stat = self._stat(stage, model)
+        if stat.calls == 0:
+            return False
+        if self.clock() - stat.last_call >= self.probe_interval:
+            return False
+
+        threshold = self.latency_thresholds.get(stage)
+        too_slow = threshold is not None and stat.ewma_latency is not None and stat.ewma_latency > threshold
+        return too_slow or stat.ewma_error > self.error_threshold
+
+    def candidates(self, stage: str, features: Optional[Dict[str, Any]] = None) -> List[str]:
+        """All usable models for a stage, best first: healthy in preference order, then degraded by latency."""
+        features = features or {}
+        if stage not in self.routes:
+            raise KeyError(f"No model route for stage '{stage}'")
+
+        eligible = [c["model"] for c in self.routes[stage] if self._eligible(c, features)]
+        if not eligible:
+            eligible = [self.routes[stage][0]["model"]]
+
+        healthy = [m for m in eligible if not self.is_degraded(stage, m)]
+        degraded = sorted(
+            (m for m in eligible if m not in healthy),
+            key=lambda m: self._stat(stage, m).ewma_latency or 0,
+        )
+        return healthy + degraded
+
+    def pick(self, stage: str, features: Optional[Dict[str, Any]] = None) -> str:
+        return self.candidates(stage, features)[0]
+
+    def record(self, stage: str, model: str, latency: Optional[float], ok: bool):
+        stat = self._stat(stage, model)
+        stat.calls += 1
+        stat.last_call = self.clock()
+        stat.ewma_error = self.alpha * (0.0 if ok else 1.0) + (1 - self.alpha) * stat.ewma_error
+
+        if ok and latency is not None:
+            if stat.ewma_latency is None:
+                stat.ewma_latency = latency
+            else:
+                stat.ewma_latency = self.alpha * latency + (1 - self.alpha) * stat.ewma_latency
+            metrics.observe(f"model.{stage}.latency", latency)
+
+        if not ok:
+            metrics.incr(f"model.{stage}.errors")
+
+    async def call(
+        self,
+        stage: str,
+        fn: Callable[[str], Awaitable[Any]],
+        features: Optional[Dict[str, Any]] = None,
+    ) -> Any:
+        """Call `fn(model)` with the best candidate, recording the outcome and falling back on errors."""
+        models = self.candidates(stage, features)
+        last_error: Optional[Exception] = None
+
+        for model in models:
+            start = self.clock()
+            try:
+                result = await fn(model)
+            except Exception as e:
+                self.record(stage, model, None, ok=False)
+                logger.warning(f"{stage} call to {model} failed: {e}")
+                last_error = e
+                continue
+            self.record(stage, model, self.clock() - start, ok=True)
+            return result
+
+        raise last_error
+
+    def snapshot(self) -> Dict[str, Any]:
+        stages = {}
+        for (stage, model), stat in self._stats.items():
+            stages.setdefault(stage, {})[model] = {
+                **stat.as_dict(),
+                "degraded": self.is_degraded(stage, model),
+            }
+        return stages
@@ -0,0 +1,102 @@
+from fnmatch import fnmatch
+from typing import Any, Callable, Dict, List, Optional
+
+# (source, entities) -> argument value, or None when the query doesn't supply it
+ArgExtractor = Callable[[str, Dict[str, Any]], Any]
+
+
+def _tickers(source: str, entities: Dict[str, Any]) -> Optional[List[str]]:
+    return entities.get("tickers") or None
+
+
+def _league_teams(source: str, entities: Dict[str, Any]) -> Optional[List[str]]:
+    # sports::nba_teams -> teams the query named for the nba
+    league = source.split("::", 1)[1].split("_")[0]
+    return entities.get("teams", {}).get(league) or None
+
+
+def _player_tag(source: str, entities: Dict[str, Any]) -> Optional[str]:
+    tags = entities.get("player_tags")
+    return tags[0] if tags else None
+
+
+EXTRACTORS: Dict[str, ArgExtractor] = {
+    "tickers": _tickers,
+    "league_teams": _league_teams,
+    "player_tag": _player_tag,
+}
+
+# source pattern -> tool, and the extractor for each argument. First match wins.
+SOURCE_TOOLS = [
+    ("music::*", "spotify_fetch_user_data", {}),
+    ("fitness::*", "strava_fetch_user_summary", {}),
+    ("stocks::market_*", "stocks_fetch_market_trends", {}),
+    ("stocks::portfolio_*", "stocks_fetch_portfolio_data", {"symbols": "tickers"}),
+    ("stocks::stock_*", "stocks_fetch_stock_info", {"symbols": "tickers"}),
+    ("sports::nba_*", "sports_fetch_nba_summary", {"team_names": "league_teams"}),
+    ("sports::nfl_*", "sports_fetch_nfl_summary", {"team_names": "league_teams"}),
+    ("sports::mlb_*", "sports_fetch_mlb_summary", {"team_names": "league_teams"}),
+    ("sports::nhl_*", "sports_fetch_nhl_summary", {"team_names": "league_teams"}),
+    ("gaming::*", "clash_fetch_user_summary", {"player_tag": "player_tag"}),
+]
+
+
+def required_params(tools: List[Dict[str, Any]]) -> Dict[str, List[str]]:
+    """Tool name -> required parameter names, from the generated tool schemas."""
+    return {
+        tool["function"]["name"]: tool["function"].get("parameters", {}).get("required", [])
+        for tool in tools
+    }
+
+
+def compile_plan(
+    sources: List[str],
+    entities: Dict[str, Any],
+    required: Dict[str, List[str]],
+) -> Dict[str, Any]:
+    """
+    Turn plan sources into tool calls without asking the agent.
+
+    Returns `calls` (deduplicated, with the sources each one covers),
+    `unresolved` sources whose tool is missing a required argument, and
+    `static` sources no tool serves (mock-only namespaces).
+    """
+    calls: List[Dict[str, Any]] = []
+    unresolved: List[str] = []
+    static: List[str] = []
+
+    for source in sources:
+        rule = next((r for r in SOURCE_TOOLS if fnmatch(source, r[0])), None)
+        if not rule or rule[1] not in required:
+            static.append(source)
+            continue
+
+        _, function, arg_extractors = rule
+        args = {}
+        for param, extractor in arg_extractors.items():
+            value = EXTRACTORS[extractor](source, entities)
+            if value is not None:
+                args[param] = value
+
+        if any(param not in args for param in required[function]):
+            unresolved.append(source)
+            continue
+
+        existing = next((c for c in calls if c["function"] == function and c["args"] == args), None)
+        if existing:
+            existing["sources"].append(source)
+        else:
+            calls.append({"function": function, "args": args, "sources": [source]})
+
+    return {"calls": calls, "unresolved": unresolved, "static": static}
+
+
+def needs_agent(compiled: Dict[str, Any], entities: Dict[str, Any]) -> bool:
+    """
+    The agent is still needed for unresolved sources, and when nothing compiled
+    even though the query mentions an integration (the plan may have missed it).
+    """
+    if compiled["unresolved"]:
+        return True
+    mentions_integration = any(entities.get(k) for k in ("teams", "tickers", "player_tags", "keywords"))
+    return not compiled["calls"] and mentions_integration
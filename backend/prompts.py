@@ -272,16 +272,31 @@ This will FAIL because the data doesn't have the fields you're trying to map.
 - Sharp edges: rounded or rounded-sm only (never rounded-xl/2xl/3xl)"""
 
 
-def build_planning_prompt(query: str) -> str:
+def build_planning_prompt(query: str, with_sections: bool = False) -> str:
     sources = get_available_sources()
-    return f"""Analyze this query and plan the UI experience.
+    sections = ""
+    if with_sections:
+        sections = ', "sections": [{"title": "short section title", "sources": ["namespace::key", ...]}, ...]'
+
+    prompt = f"""Analyze this query and plan the UI experience.
 
 Query: "{query}"
 
 Available data sources: {json.dumps(sources)}
 
 Return JSON:
-{{"sources": ["namespace::key", ...], "intent": "what the user wants to see/feel (1-2 sentences)", "approach": "how to present it memorably (1-2 sentences)"}}"""
+{{"sources": ["namespace::key", ...], "intent": "what the user wants to see/feel (1-2 sentences)", "approach": "how to present it memorably (1-2 sentences)"{sections}}}"""
+
+    if with_sections:
+        prompt += "\n\nSplit the screen into 2-6 independent sections, one per data domain or facet of the intent, in display order."
+    return prompt
+
+
+def build_merged_planning_prompt(query: str, with_sections: bool = False) -> str:
+    """Planning prompt for a single call that also picks the tools to fetch the data."""
+    return build_planning_prompt(query, with_sections) + """
+
+In the same response, call the available functions that fetch the live data this screen needs (teams, tickers, Strava, Spotify, Clash Royale). Put the plan JSON in your message content; call no functions if the sources above cover the query."""
 
 
 def build_ui_system_prompt(intent: str, approach: str) -> str:
@@ -460,6 +475,20 @@ Note: Featured item uses gradient background for visual emphasis while maintaini
 Output raw HTML now."""
 
 
+def build_section_system_prompt(
+    intent: str, approach: str, title: str, index: int, total: int
+) -> str:
+    """System prompt for one section of a screen generated in parallel"""
+    position = "the first section, so it may open with the screen's header" if index == 0 else "not the first section, so do not add a page header"
+
+    return f"""{build_ui_system_prompt(intent, approach)}
+
+## Section Mode
+You are generating section {index + 1} of {total} of this screen, titled "{title}". Other sections are generated separately and placed around yours.
+This is {position}.
+Output a single <section> element containing only this section's content. Use only the data sources listed for it."""
+
+
 def build_ui_user_prompt(query: str, data_context: dict) -> str:
     data_description = describe_data(data_context)
 
@@ -473,6 +502,15 @@ Use data-source="namespace::key" to reference this data. The components will ren
 Generate the HTML now."""
 
 
+def build_continuation_prompt(partial_html: str) -> str:
+    """Asks a fallback model to pick up a UI stream that was cut off mid-response"""
+    return f"""The previous response was cut off. This HTML has already been sent to the user:
+
+{partial_html}
+
+Continue from exactly where it stops, even mid-tag or mid-attribute. Output ONLY the remaining HTML. Do not repeat anything above. No markdown. No code fences."""
+
+
 def build_refine_system_prompt(current_html: str) -> str:
     """System prompt for refining existing UI"""
     return f"""You're editing a live app screen. Make the requested changes while preserving data bindings.
@@ -0,0 +1,298 @@
+import re
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+# Well-known tickers and the company names people type instead of them
+COMPANY_TICKERS = {
+    "apple": "AAPL", "microsoft": "MSFT", "google": "GOOGL", "alphabet": "GOOGL",
+    "amazon": "AMZN", "tesla": "TSLA", "nvidia": "NVDA", "meta": "META",
+    "facebook": "META", "netflix": "NFLX", "amd": "AMD", "intel": "INTC",
+    "disney": "DIS", "coca-cola": "KO", "walmart": "WMT", "nike": "NKE",
+    "uber": "UBER", "spotify": "SPOT", "palantir": "PLTR", "berkshire": "BRK-B",
+}
+KNOWN_TICKERS = set(COMPANY_TICKERS.values()) | {"SPY", "QQQ", "JPM", "V", "MA", "COIN", "PYPL"}
+
+# Words that point at one integration without naming an entity
+INTEGRATION_KEYWORDS = {
+    "music": ["spotify", "songs", "song", "music", "listening", "artists", "tracks", "genres", "playlist"],
+    "fitness": ["strava", "workout", "workouts", "runs", "running", "rides", "cycling", "fitness", "exercise", "training"],
+    "gaming": ["clash royale", "clash", "trophies", "battle log", "deck"],
+    "stocks": ["stocks", "stock", "shares", "stock market", "market", "s&p", "nasdaq", "dow", "portfolio"],
+}
+
+# Team names that are also everyday words ("jazz artists", "heat map"), with
+# their cities. They only count as teams next to their city or in a query with
+# sports context; otherwise the query goes to the LLM planner.
+AMBIGUOUS_TEAMS = {
+    "heat": ["miami"], "magic": ["orlando"], "jazz": ["utah"], "thunder": ["oklahoma city", "okc"],
+    "suns": ["phoenix"], "rockets": ["houston"], "kings": ["sacramento", "los angeles", "la"],
+    "nets": ["brooklyn"], "spurs": ["san antonio"], "bulls": ["chicago"], "hawks": ["atlanta"],
+    "wizards": ["washington"], "stars": ["dallas"], "wild": ["minnesota"], "blues": ["st. louis", "st louis"],
+    "lightning": ["tampa bay", "tampa"], "sharks": ["san jose"], "ducks": ["anaheim"], "flames": ["calgary"],
+    "avalanche": ["colorado"], "hurricanes": ["carolina"], "predators": ["nashville"],
+    "devils": ["new jersey"], "capitals": ["washington"], "senators": ["ottawa"], "penguins": ["pittsburgh"],
+    "lions": ["detroit"], "bears": ["chicago"], "eagles": ["philadelphia"], "saints": ["new orleans"],
+    "titans": ["tennessee"], "chiefs": ["kansas city"], "giants": ["new york", "ny", "san francisco", "sf"],
+    "jets": ["new york", "ny", "winnipeg"], "rams": ["los angeles", "la"], "bills": ["buffalo"],
+    "cardinals": ["arizona", "st. louis", "st louis"], "panthers": ["carolina", "florida"],
+    "tigers": ["detroit"], "twins": ["minnesota"], "rangers": ["texas", "new york", "ny"],
+    "reds": ["cincinnati"], "royals": ["kansas city"], "angels": ["los angeles", "la"],
+    "pirates": ["pittsburgh"], "guardians": ["cleveland"], "athletics": ["oakland"],
+}
+SPORTS_CONTEXT_PATTERN = re.compile(
+    r"\b(games?|score[sd]?|record|season|playoffs?|standings|schedule|won|lost|beat|vs\.?|team)\b", re.IGNORECASE
+)
+
+# Clash Royale tags only use these characters
+PLAYER_TAG_PATTERN = re.compile(r"#[0289PYLQGRJCUV]{3,}\b", re.IGNORECASE)
+CASHTAG_PATTERN = re.compile(r"\$([A-Za-z]{1,5}(?:-[A-Za-z])?)\b")
+UPPER_TOKEN_PATTERN = re.compile(r"\b[A-Z]{1,5}(?:-[A-Z])?\b")
+
+# Plan sources per namespace. music/fitness/gaming use the planner's MOCK_DATA
+# vocabulary; sports and stocks have no mock data, so they name the keys the
+# tools return.
+NAMESPACE_SOURCES = {
+    "music": ["music::top_songs", "music::top_artists", "music::top_genres", "music::total_minutes"],
+    "fitness": ["fitness::workouts", "fitness::total_minutes", "fitness::by_type", "fitness::weekly_activity"],
+    "gaming": ["gaming::total_hours", "gaming::top_games", "gaming::achievements"],
+}
+
+# Headline stats for a fallback plan when the query names nothing we recognize
+OVERVIEW_SOURCES = ["music::total_minutes", "music::top_songs", "fitness::total_minutes", "gaming::total_hours"]
+
+INTENTS = {
+    "music": ("Relive their recent listening: top songs, artists and genres.",
+              "Feature the #1 song big, then a ranked list and genre breakdown."),
+    "fitness": ("See their recent training at a glance: volume, activity mix and streaks.",
+                "Lead with headline totals as bold stat cards, then a weekly activity chart."),
+    "gaming": ("Check their Clash Royale progress: trophies, record and current deck.",
+               "Open with trophies and arena as a hero stat, then battles and deck."),
+    "market": ("Get a quick read on today's market: major indices and top movers.",
+               "Show the indices as colored stat cards, then gainers and losers side by side."),
+}
+
+
+def _keyword_pattern(words: List[str]) -> re.Pattern:
+    alternatives = sorted((re.escape(w) for w in words), key=len, reverse=True)
+    return re.compile(r"(?<![\w&])(" + "|".join(alternatives) + r")(?![\w&])", re.IGNORECASE)
+
+
+class QueryRouter:
+    """
+    Deterministic planner for queries that name what they want: a team,
+    a ticker, "my strava", "my top songs".
+
+    Indexes are compiled once from LEAGUE_CONFIG and the keyword tables above.
+    `route()` returns a plan in the same shape plan_and_classify produces, or
+    None for open-ended queries, which go to the LLM planner. Queries that
+    mention a domain this router can't plan for (travel, reading, ...) also
+    return None.
+    """
+
+    def __init__(self, league_config: Dict[str, Any], unrouted_words: Optional[Set[str]] = None):
+        self.team_leagues: Dict[str, List[str]] = {}
+        self.league_hints: Dict[str, List[str]] = {}
+
+        for league, config in league_config.items():
+            for team in config["teams"]:
+                self.team_leagues.setdefault(team, []).append(league)
+            self.league_hints[league] = [league, config["name"].lower(), config["sport"]]
+
+        self.team_pattern = _keyword_pattern(list(self.team_leagues))
+        self.team_city_patterns = {
+            team: re.compile(rf"\b({'|'.join(re.escape(city) for city in cities)})\s+{re.escape(team)}\b", re.IGNORECASE)
+            for team, cities in AMBIGUOUS_TEAMS.items()
+            if team in self.team_leagues
+        }
+        self.league_hint_patterns = {
+            league: _keyword_pattern(hints) for league, hints in self.league_hints.items()
+        }
+        self.company_pattern = _keyword_pattern(list(COMPANY_TICKERS))
+        self.keyword_patterns = {
+            namespace: _keyword_pattern(words) for namespace, words in INTEGRATION_KEYWORDS.items()
+        }
+        self.unrouted_pattern = _keyword_pattern(sorted(unrouted_words)) if unrouted_words else None
+
+    def _team_matches(self, query: str) -> Tuple[List[str], List[str], List[str]]:
+        """
+        Team names in the query that count as teams, ambiguous ones left out
+        for lack of sports context, and the leagues the query hints at.
+        """
+        hinted = [league for league, pattern in self.league_hint_patterns.items() if pattern.search(query)]
+        found = list(dict.fromkeys(match.group(1).lower() for match in self.team_pattern.finditer(query)))
+        # a league or sport word, a sports word, or a second team makes "kings" a team
+        context = bool(hinted) or bool(SPORTS_CONTEXT_PATTERN.search(query)) or len(found) > 1
+        teams, unconfirmed = [], []
+        for team in found:
+            city = self.team_city_patterns.get(team)
+            if city is None or context or city.search(query):
+                teams.append(team)
+            else:
+                unconfirmed.append(team)
+        return teams, unconfirmed, hinted
+
+    def extract_entities(self, query: str) -> Dict[str, Any]:
+        """Teams per league, tickers, player tags and integration keywords found in the query."""
+        teams: Dict[str, List[str]] = {}
+        found, _, hinted = self._team_matches(query)
+
+        for team in found:
+            leagues = self.team_leagues[team]
+            # "giants" is NFL and MLB; a league or sport word in the query settles it
+            if len(leagues) > 1 and hinted:
+                leagues = [league for league in leagues if league in hinted] or leagues
+            for league in leagues:
+                if team not in teams.setdefault(league, []):
+                    teams[league].append(team)
+
+        tickers = []
+        for match in self.company_pattern.finditer(query):
+            tickers.append(COMPANY_TICKERS[match.group(1).lower()])
+        for match in CASHTAG_PATTERN.finditer(query):
+            tickers.append(match.group(1).upper())
+        for token in UPPER_TOKEN_PATTERN.findall(query):
+            if token in KNOWN_TICKERS:
+                tickers.append(token)
+
+        player_tags = [tag.upper() for tag in PLAYER_TAG_PATTERN.findall(query)]
+
+        keywords = {
+            namespace for namespace, pattern in self.keyword_patterns.items() if pattern.search(query)
+        }
+        # "spotify" is also a ticker: with a market word it's the stock, otherwise the integration
+        if "SPOT" in tickers and "stocks" not in keywords and not CASHTAG_PATTERN.search(query):
+            tickers = [t for t in tickers if t != "SPOT"]
+        elif "SPOT" in tickers and "music" in keywords:
+            if not self.keyword_patterns["music"].search(re.sub(r"(?i)spotify", "", query)):
+                keywords.discard("music")
+        if player_tags:
+            keywords.add("gaming")
+
+        return {
+            "teams": teams,
+            "tickers": list(dict.fromkeys(tickers)),
+            "player_tags": player_tags,
+            "keywords": sorted(keywords),
+        }
+
+    def route(self, query: str) -> Optional[Dict[str, Any]]:
+        if self.unrouted_pattern and self.unrouted_pattern.search(query):
+            return None
+        # "my top jazz artists": could be the Utah Jazz, let the LLM decide
+        if self._team_matches(query)[1]:
+            return None
+
+        entities = self.extract_entities(query)
+        sources, intents, approaches = self._plan(entities)
+        if not sources:
+            return None
+
+        return {
+            "sources": sources,
+            "intent": " ".join(intents),
+            "approach": " ".join(approaches),
+            "entities": entities,
+            "route": "fastpath",
+        }
+
+    def likely_sources(self, query: str) -> Tuple[List[str], Dict[str, Any]]:
+        """
+        Sources the entities in the query point to, and the entities. Unlike
+        route() this also answers for queries it can't fully plan, for prefetching.
+        """
+        entities = self.extract_entities(query)
+        return self._plan(entities)[0], entities
+
+    def describe(self, query: str) -> Optional[Dict[str, Any]]:
+        """Intent and approach for the entities the query names, or None if it names none."""
+        entities = self.extract_entities(query)
+        _, intents, approaches = self._plan(entities)
+        if not intents:
+            return None
+        return {"intent": " ".join(intents), "approach": " ".join(approaches), "entities": entities}
+
+    def fallback_plan(self, query: str, sample_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Plan for when the LLM planner runs out of time: the sources the query's
+        entities point to, else sample data for the namespaces it names
+        ("my reading"), else an overview.
+        """
+        entities = self.extract_entities(query)
+        sources, intents, approaches = self._plan(entities)
+        if not sources:
+            named = [ns for ns in sample_data if re.search(rf"\b{re.escape(ns)}\b", query, re.IGNORECASE)]
+            sources = [f"{ns}::{key}" for ns in named for key in list(sample_data[ns])[:4]] or OVERVIEW_SOURCES
+            intents = ["Get a quick overview of their data."]
+            approaches = ["Show the headline numbers as stat cards, then the top lists."]
+
+        return {
+            "sources": sources,
+            "intent": " ".join(intents),
+            "approach": " ".join(approaches),
+            "entities": entities,
+            "route": "fallback",
+        }
+
+    def _plan(self, entities: Dict[str, Any]) -> Tuple[List[str], List[str], List[str]]:
+        sources: List[str] = []
+        intents: List[str] = []
+        approaches: List[str] = []
+
+        def add(intent: str, approach: str, new_sources: List[str]):
+            intents.append(intent)
+            approaches.append(approach)
+            sources.extend(s for s in new_sources if s not in sources)
+
+        if entities["teams"]:
+            # "giants" can be in two leagues; name it once
+            names = list(dict.fromkeys(team.title() for league_teams in entities["teams"].values() for team in league_teams))
+            add(
+                f"See how the {', '.join(names)} are doing: record, streak and recent or upcoming games.",
+                "Lead with each team's win-loss record as a bold scoreboard, then games as a timeline.",
+                [f"sports::{league}_teams" for league in entities["teams"]],
+            )
+
+        if entities["tickers"]:
+            add(
+                f"Check on {', '.join(entities['tickers'])}: current price, today's move and the year's performance.",
+                "Show each ticker as a stat card colored by direction, then compare them in a table.",
+                ["stocks::stock_data"],
+            )
+        elif "stocks" in entities["keywords"]:
+            add(*INTENTS["market"], ["stocks::market_indices", "stocks::market_top_gainers", "stocks::market_top_losers"])
+
+        for namespace in ("music", "fitness", "gaming"):
+            if namespace in entities["keywords"]:
+                add(*INTENTS[namespace], NAMESPACE_SOURCES[namespace])
+
+        return sources, intents, approaches
+
+
+def entity_namespaces(entities: Dict[str, Any]) -> Set[str]:
+    """Data namespaces the extracted entities point to."""
+    namespaces = set(entities.get("keywords", []))
+    if entities.get("teams"):
+        namespaces.add("sports")
+    if entities.get("tickers"):
+        namespaces.add("stocks")
+    if entities.get("player_tags"):
+        namespaces.add("gaming")
+    return namespaces
+
+
+# Too generic to signal a domain on their own
+_GENERIC_WORDS = {"total", "time", "days", "hours", "trend", "category", "genre", "completed", "recent", "monthly",
+                  "active", "value", "read", "this", "week", "month", "year"}
+
+
+def unrouted_words(mock_data: Dict[str, Any], routed_namespaces: Set[str]) -> Set[str]:
+    """
+    Words naming mock-only namespaces and their keys, e.g. travel, cities,
+    books, budget. Words that also appear in a routed namespace are dropped.
+    """
+    words, routed = set(), set()
+    for namespace, data in mock_data.items():
+        target = routed if namespace in routed_namespaces else words
+        target.add(namespace)
+        for key in data:
+            target.update(part for part in key.split("_") if len(part) > 3)
+    return words - routed - _GENERIC_WORDS
@@ -0,0 +1,271 @@
+import asyncio
+import logging
+import random
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable, Dict, Optional, Tuple, Type
+from urllib.parse import urlsplit
+
+from deadline import current_deadline
+from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS"}
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+def parse_retry_after(value: Optional[str], now: Optional[datetime] = None) -> Optional[float]:
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date), or None."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - (now or datetime.now(timezone.utc))).total_seconds())
+
+
+class RateLimitExceeded(Exception):
+    """Raised instead of waiting longer for a rate-limit slot than the caller can afford."""
+
+
+class TokenBucket:
+    """
+    `rate` requests per second with bursts of up to `burst`. `reserve()` takes
+    a token and returns how long the caller must wait before using it, so
+    callers queue fairly instead of polling. With `max_wait`, a token that
+    would take longer than that to come free isn't taken and None is returned.
+    """
+
+    def __init__(self, rate: float, burst: float, clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.burst = burst
+        self.clock = clock
+        self._tokens = burst
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def reserve(self, max_wait: Optional[float] = None) -> Optional[float]:
+        with self._lock:
+            now = self.clock()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            wait = 0.0 if self._tokens >= 1 else (1 - self._tokens) / self.rate
+            if max_wait is not None and wait > max_wait:
+                return None
+            self._tokens -= 1
+            return wait
+
+
+class RetryBudget:
+    """
+    Retries allowed per window: `ratio` of the requests seen in the last
+    `window` seconds, but at least `min_retries`. Once upstream is failing
+    everything, retries stop instead of multiplying the load.
+    """
+
+    def __init__(
+        self,
+        ratio: float = 0.2,
+        min_retries: int = 3,
+        window: float = 10.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.ratio = ratio
+        self.min_retries = min_retries
+        self.window = window
+        self.clock = clock
+        self._requests: deque = deque()
+        self._retries: deque = deque()
+        self._lock = threading.Lock()
+
+    def _trim(self, now: float):
+        for times in (self._requests, self._retries):
+            while times and times[0] <= now - self.window:
+                times.popleft()
+
+    def record_request(self):
+        with self._lock:
+            now = self.clock()
+            self._trim(now)
+            self._requests.append(now)
+
+    def try_retry(self) -> bool:
+        with self._lock:
+            now = self.clock()
+            self._trim(now)
+            if len(self._retries) >= max(self.min_retries, self.ratio * len(self._requests)):
+                return False
+            self._retries.append(now)
+            return True
+
+
+class Resilience:
+    """
+    Retry and rate-limit policy for the shared HTTP client.
+
+    Every request waits for a token from its host's bucket (`rate_limits`
+    maps host to {"rate": per second, "burst": n}; unlisted hosts aren't
+    limited), but at most `max_rate_limit_wait` seconds and never past the
+    request deadline: past that it raises RateLimitExceeded without taking
+    the token. Idempotent requests that fail with a connection error, timeout
+    or a status in RETRY_STATUSES are retried up to `max_attempts` in total
+    with full-jitter exponential backoff, or after `Retry-After` when the
+    response sends one (no retry if it asks for more than `max_retry_after`
+    seconds), or if the wait would run past the request deadline. Retries
+    draw from a shared RetryBudget.
+    """
+
+    def __init__(
+        self,
+        max_attempts: int = 3,
+        base_delay: float = 0.25,
+        max_delay: float = 2.0,
+        max_retry_after: float = 5.0,
+        max_rate_limit_wait: float = 5.0,
+        rate_limits: Optional[Dict[str, Dict[str, float]]] = None,
+        budget: Optional[RetryBudget] = None,
+        clock: Callable[[], float] = time.monotonic,
+        rng: Optional[random.Random] = None,
+    ):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_retry_after = max_retry_after
+        self.max_rate_limit_wait = max_rate_limit_wait
+        self.budget = budget or RetryBudget(clock=clock)
+        self.rng = rng or random.Random()
+        self._buckets = {
+            host: TokenBucket(limit["rate"], limit.get("burst", max(1.0, limit["rate"])), clock)
+            for host, limit in (rate_limits or {}).items()
+        }
+
+    def backoff(self, attempt: int) -> float:
+        """Full jitter: uniform in [0, min(max_delay, base_delay * 2**attempt)]."""
+        return self.rng.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def rate_limit_wait(self, url: str) -> float:
+        host = urlsplit(url).hostname
+        bucket = self._buckets.get(host)
+        if bucket is None:
+            return 0.0
+        max_wait = self.max_rate_limit_wait
+        deadline = current_deadline.get()
+        if deadline is not None:
+            max_wait = min(max_wait, deadline.remaining())
+        wait = bucket.reserve(max_wait)
+        if wait is None:
+            metrics.incr("http.rate_limit_rejected")
+            raise RateLimitExceeded(f"{host} rate limit: no request slot within {max_wait:.1f}s")
+        if wait > 0:
+            metrics.incr("http.rate_limited")
+            metrics.observe(f"http.rate_limit_wait.{host}", wait)
+        return wait
+
+    def retry_delay(
+        self, method: str, attempt: int, response: Any = None, error: Optional[BaseException] = None
+    ) -> Optional[float]:
+        """Seconds to wait before attempt `attempt + 1`, or None to give up and return/raise."""
+        if method.upper() not in IDEMPOTENT_METHODS or attempt + 1 >= self.max_attempts:
+            return None
+        if error is None and response.status_code not in RETRY_STATUSES:
+            return None
+
+        delay = self.backoff(attempt)
+        if response is not None:
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            if retry_after is not None:
+                if retry_after > self.max_retry_after:
+                    metrics.incr("http.retry_after_too_long")
+                    return None
+                delay = retry_after
+
+        deadline = current_deadline.get()
+        if deadline is not None and delay >= deadline.remaining():
+            metrics.incr("http.retry_past_deadline")
+            return None
+
+        if not self.budget.try_retry():
+            metrics.incr("http.retry_budget_exhausted")
+            return None
+        return delay
+
+    def send(
+        self,
+        method: str,
+        url: str,
+        send: Callable[[], Any],
+        retryable: Tuple[Type[BaseException], ...],
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> Any:
+        """Run `send()` under the host's rate limit, retrying as described above."""
+        attempt = 0
+        while True:
+            wait = self.rate_limit_wait(url)
+            if wait:
+                sleep(wait)
+            self.budget.record_request()
+
+            response, error = None, None
+            try:
+                response = send()
+            except retryable as e:
+                error = e
+
+            delay = self.retry_delay(method, attempt, response, error)
+            if delay is None:
+                if error is not None:
+                    raise error
+                return response
+
+            metrics.incr("http.retries")
+            logger.info(f"Retrying {method} {url} in {delay:.2f}s ({error or response.status_code})")
+            if response is not None:
+                # release the pooled connection before waiting
+                response.close()
+            sleep(delay)
+            attempt += 1
+
+    async def asend(
+        self,
+        method: str,
+        url: str,
+        send: Callable[[], Any],
+        retryable: Tuple[Type[BaseException], ...],
+    ) -> Any:
+        """`send` for an async `send()`."""
+        attempt = 0
+        while True:
+            wait = self.rate_limit_wait(url)
+            if wait:
+                await asyncio.sleep(wait)
+            self.budget.record_request()
+
+            response, error = None, None
+            try:
+                response = await send()
+            except retryable as e:
+                error = e
+
+            delay = self.retry_delay(method, attempt, response, error)
+            if delay is None:
+                if error is not None:
+                    raise error
+                return response
+
+            metrics.incr("http.retries")
+            logger.info(f"Retrying {method} {url} in {delay:.2f}s ({error or response.status_code})")
+            if response is not None:
+                # release the pooled connection before waiting
+                response.close()
+            await asyncio.sleep(delay)
+            attempt += 1
@@ -0,0 +1,91 @@
+import asyncio
+import logging
+from typing import Any, AsyncGenerator, AsyncIterator, Dict, List
+
+from llm_stream import ChunkBuffer
+from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+def _namespaces(sources: List[str]) -> List[str]:
+    seen = []
+    for source in sources:
+        namespace = source.split("::", 1)[0]
+        if namespace not in seen:
+            seen.append(namespace)
+    return seen
+
+
+def split_sections(
+    plan: Dict[str, Any], data_context: Dict[str, Any], max_sections: int = 6
+) -> List[Dict[str, Any]]:
+    """
+    Split the screen into independently generated sections.
+
+    Uses the planner's "sections" when present, otherwise one section per
+    namespace. Each section gets the slice of data_context its sources point at;
+    namespaces no section claimed are appended so no fetched data is dropped.
+    Sections past `max_sections` are folded into the last one.
+    """
+    sections = []
+    claimed = set()
+
+    for planned in plan.get("sections") or []:
+        namespaces = [ns for ns in _namespaces(planned.get("sources", [])) if ns in data_context]
+        namespaces = [ns for ns in namespaces if ns not in claimed]
+        if not namespaces:
+            continue
+        claimed.update(namespaces)
+        sections.append({"title": planned.get("title") or namespaces[0].title(), "namespaces": namespaces})
+
+    for namespace in data_context:
+        if namespace not in claimed and namespace != "clicked_item":
+            sections.append({"title": namespace.title(), "namespaces": [namespace]})
+
+    if len(sections) > max_sections:
+        tail = sections[max_sections - 1:]
+        merged = [ns for section in tail for ns in section["namespaces"]]
+        sections = sections[:max_sections - 1] + [{"title": tail[0]["title"], "namespaces": merged}]
+
+    for section in sections:
+        section["data"] = {ns: data_context[ns] for ns in section["namespaces"]}
+
+    return sections
+
+
+async def stitch_in_order(
+    streams: List[AsyncIterator[str]], buffer_size: int = 64
+) -> AsyncGenerator[str, None]:
+    """
+    Run every section stream concurrently and yield their text in list order.
+
+    The current section streams live; later sections buffer until everything
+    before them has finished, then flush at once. A failed section is logged
+    and skipped so one bad panel doesn't sink the screen.
+    """
+    buffers = [ChunkBuffer(buffer_size, "coalesce") for _ in streams]
+
+    async def pump(stream: AsyncIterator[str], buffer: ChunkBuffer):
+        try:
+            async for text in stream:
+                if text:
+                    buffer.put_nowait(text)
+        except Exception as e:
+            buffer.close(e)
+            return
+        buffer.close()
+
+    tasks = [asyncio.create_task(pump(s, b)) for s, b in zip(streams, buffers)]
+    try:
+        for index, buffer in enumerate(buffers):
+            try:
+                while (text := await buffer.get()) is not None:
+                    yield text
+            except Exception as e:
+                logger.error(f"Section {index} failed: {e}")
+                metrics.incr("ui.sections_failed")
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
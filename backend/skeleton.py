@@ -0,0 +1,106 @@
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+from data import COMPONENT_SCHEMAS, MOCK_DATA
+
+TREND_HINTS = ("trend", "history", "weekly", "monthly", "by_year", "over_time")
+
+
+def _label(key: str) -> str:
+    return key.replace("_", " ").title()
+
+
+def _fields(sample: Dict[str, Any]) -> Tuple[List[str], List[str]]:
+    text = [k for k, v in sample.items() if isinstance(v, str) and k != "id"]
+    numeric = [
+        k for k, v in sample.items()
+        if isinstance(v, (int, float)) and not isinstance(v, bool) and k != "id"
+    ]
+    return text, numeric
+
+
+def pick_component(key: str, value: Any) -> Optional[Tuple[str, Dict[str, Any]]]:
+    """
+    Choose a component type and config for one data source from its shape.
+    Returns None for primitives, which render as data-value tiles instead.
+    """
+    if isinstance(value, list):
+        if not value or not isinstance(value[0], dict):
+            return "List", {}
+
+        text, numeric = _fields(value[0])
+
+        if text and numeric and any(hint in key for hint in TREND_HINTS):
+            template = {"x": text[0], "y": numeric[0], "primary": _label(key)}
+            return "Chart", {"layout": "line", "template": template}
+
+        if len(value[0]) >= 5:
+            columns = [{"key": k, "label": _label(k)} for k in list(value[0].keys())[:5] if k != "id"]
+            return "Table", {"columns": columns}
+
+        template = {}
+        if text:
+            template["primary"] = text[0]
+        if len(text) > 1:
+            template["secondary"] = text[1]
+        if numeric:
+            template["meta"] = numeric[0]
+        return "List", {"template": template}
+
+    if isinstance(value, dict):
+        text, numeric = _fields(value)
+        template = {}
+        if text:
+            template["primary"] = text[0]
+        if numeric:
+            template["value"] = numeric[0]
+        return "Card", {"template": template}
+
+    return None
+
+
+def _slot(component: str, source: str, config: Dict[str, Any]) -> str:
+    if component not in COMPONENT_SCHEMAS:
+        raise ValueError(f"Unknown component type: {component}")
+    config_attr = f" config='{json.dumps(config)}'" if config else ""
+    return f'<component-slot type="{component}" data-source="{source}"{config_attr}></component-slot>'
+
+
+def build_skeleton(plan: Dict[str, Any], shapes: Dict[str, Any] = MOCK_DATA) -> str:
+    """
+    Build a deterministic placeholder screen from the plan's sources.
+
+    Sent as the first frame so the layout appears before the model has produced
+    anything; the streamed UI replaces it. `shapes` supplies example values per
+    namespace::key so each source gets a component that fits its shape.
+    """
+    tiles = []
+    blocks = []
+
+    for source in plan.get("sources", []):
+        if "::" not in source:
+            continue
+
+        namespace, key = source.split("::", 1)
+        if namespace not in shapes or key not in shapes[namespace]:
+            blocks.append('<div class="h-32 bg-card rounded animate-pulse"></div>')
+            continue
+
+        picked = pick_component(key, shapes[namespace][key])
+        if picked is None:
+            tiles.append(
+                f'<div class="bg-card rounded p-4">'
+                f'<p class="text-sm text-muted-foreground">{_label(key)}</p>'
+                f'<p class="text-3xl font-bold text-foreground"><data-value data-source="{source}"></data-value></p>'
+                f"</div>"
+            )
+        else:
+            component, config = picked
+            blocks.append(_slot(component, source, config))
+
+    parts = ['<div class="h-8 w-2/3 bg-card rounded animate-pulse"></div>']
+    if tiles:
+        parts.append(f'<div class="grid grid-cols-2 gap-4">{"".join(tiles)}</div>')
+    parts.extend(blocks)
+
+    return f'<div class="p-4 space-y-4 text-foreground" data-skeleton="true">{"".join(parts)}</div>'
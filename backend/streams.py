@@ -0,0 +1,140 @@
+import asyncio
+import json
+import logging
+import time
+import uuid
+from collections import deque
+from typing import AsyncGenerator, AsyncIterator, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class StreamSession:
+    """
+    One SSE run with a bounded replay buffer.
+
+    Frames published here get an `id: <stream_id>:<seq>` line so a client that
+    drops the connection can reconnect with Last-Event-ID and pick up where it
+    left off. Only the last `max_events` frames are kept.
+    """
+
+    def __init__(self, stream_id: str, max_events: int = 512):
+        self.stream_id = stream_id
+        self.events: deque[Tuple[int, str]] = deque(maxlen=max_events)
+        self.next_seq = 0
+        self.done = False
+        self.finished_at: Optional[float] = None
+        self.task: Optional[asyncio.Task] = None
+        self._wakeup = asyncio.Event()
+
+    def _notify(self):
+        self._wakeup.set()
+        self._wakeup = asyncio.Event()
+
+    def publish(self, frame: str) -> int:
+        seq = self.next_seq
+        self.next_seq += 1
+        self.events.append((seq, f"id: {self.stream_id}:{seq}\n{frame}"))
+        self._notify()
+        return seq
+
+    def close(self):
+        self.done = True
+        self.finished_at = time.monotonic()
+        self._notify()
+
+    async def subscribe(
+        self, after_seq: int = -1, keepalive_interval: Optional[float] = None
+    ) -> AsyncGenerator[str, None]:
+        """
+        Yield every frame after `after_seq`, then follow the live stream until it closes.
+        An SSE comment is sent after `keepalive_interval` seconds without a frame.
+        """
+        cursor = after_seq + 1
+
+        while True:
+            waiter = self._wakeup
+
+            if self.events:
+                first_seq = self.events[0][0]
+                if cursor < first_seq:
+                    # Client fell further behind than the buffer holds, can't resume cleanly
+                    message = {"message": "Stream resume window exceeded", "code": "replay_gap"}
+                    yield f"event: error\ndata: {json.dumps(message)}\n\n"
+                    return
+
+                while cursor < self.next_seq:
+                    seq, frame = self.events[cursor - first_seq]
+                    cursor = seq + 1
+                    yield frame
+                    if self.events[0][0] != first_seq:
+                        break
+
+            if self.done and cursor >= self.next_seq:
+                return
+
+            if cursor >= self.next_seq:
+                try:
+                    await asyncio.wait_for(waiter.wait(), keepalive_interval)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+
+
+class StreamRegistry:
+    """Keeps live and recently finished sessions so they can be resumed."""
+
+    def __init__(self, max_events: int = 512, ttl_seconds: float = 300):
+        self.max_events = max_events
+        self.ttl_seconds = ttl_seconds
+        self._sessions: Dict[str, StreamSession] = {}
+
+    def start(self, producer: AsyncIterator[str]) -> StreamSession:
+        """Run `producer` in the background, independent of any client connection."""
+        self._evict_expired()
+
+        session = StreamSession(uuid.uuid4().hex, self.max_events)
+        self._sessions[session.stream_id] = session
+        session.task = asyncio.create_task(self._pump(session, producer))
+        return session
+
+    def get(self, stream_id: str) -> Optional[StreamSession]:
+        self._evict_expired()
+        return self._sessions.get(stream_id)
+
+    def resume(self, last_event_id: Optional[str]) -> Optional[Tuple[StreamSession, int]]:
+        """Map a Last-Event-ID header back to its session and sequence number."""
+        if not last_event_id or ":" not in last_event_id:
+            return None
+
+        stream_id, _, seq = last_event_id.strip().rpartition(":")
+        try:
+            after_seq = int(seq)
+        except ValueError:
+            return None
+
+        session = self.get(stream_id)
+        if not session:
+            return None
+        return session, after_seq
+
+    async def _pump(self, session: StreamSession, producer: AsyncIterator[str]):
+        try:
+            async for frame in producer:
+                # comments are only there to hold the connection open, not worth replaying
+                if not frame.startswith(":"):
+                    session.publish(frame)
+        except Exception as e:
+            logger.error(f"Stream {session.stream_id} failed: {e}")
+            session.publish(f"event: error\ndata: {json.dumps({'message': str(e)})}\n\n")
+        finally:
+            session.close()
+
+    def _evict_expired(self):
+        now = time.monotonic()
+        expired = [
+            stream_id
+            for stream_id, session in self._sessions.items()
+            if session.done and now - session.finished_at > self.ttl_seconds
+        ]
+        for stream_id in expired:
+            del self._sessions[stream_id]
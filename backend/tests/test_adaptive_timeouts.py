@@ -0,0 +1,53 @@
+import unittest
+
+from adaptive_timeouts import AdaptiveTimeouts, endpoint_key
+from metrics import Metrics
+
+
+class TestEndpointKey(unittest.TestCase):
+    def test_groups_ids_and_tags(self):
+        base = "https://site.api.espn.com/apis/site/v2/sports/basketball/nba/teams"
+        self.assertEqual(endpoint_key(f"{base}/lal/schedule"), "site.api.espn.com/schedule")
+        self.assertEqual(endpoint_key(f"{base}/lal"), endpoint_key(f"{base}/bos"))
+        self.assertEqual(endpoint_key("https://api.clashroyale.com/v1/players/%23JYJQC88"), "api.clashroyale.com/*")
+        self.assertEqual(endpoint_key("https://www.strava.com/api/v3/athletes/123/stats"), "www.strava.com/stats")
+
+
+class TestAdaptiveTimeouts(unittest.TestCase):
+    URL = "https://site.api.espn.com/apis/site/v2/sports/basketball/nba/teams/lal/schedule"
+
+    def setUp(self):
+        self.metrics = Metrics()
+        self.timeouts = AdaptiveTimeouts(
+            default=(3.0, 10.0), minimum=(0.5, 1.0), maximum=(5.0, 30.0), min_samples=5, metrics=self.metrics
+        )
+
+    def observe(self, name, values):
+        for value in values:
+            self.metrics.observe(name, value)
+
+    def test_default_until_enough_samples(self):
+        self.observe("http.latency.site.api.espn.com/schedule", [0.15] * 4)
+        self.assertEqual(self.timeouts.timeout_for(self.URL), (3.0, 10.0))
+
+    def test_derived_from_percentile(self):
+        self.observe("http.latency.site.api.espn.com/schedule", [0.15] * 20 + [0.6])
+        self.observe("http.handshake.site.api.espn.com", [0.05] * 10 + [0.3])
+        # p99 * multiplier (3), connect from the host, read from the endpoint
+        self.assertEqual(self.timeouts.timeout_for(self.URL), (0.9, 1.8))
+
+    def test_clamped_to_maximum(self):
+        self.observe("http.latency.query2.finance.yahoo.com/chart", [15.0] * 10)
+        self.assertEqual(self.timeouts.timeout_for("https://query2.finance.yahoo.com/v8/finance/chart")[1], 30.0)
+
+    def test_snapshot_lists_endpoints_in_use(self):
+        self.observe("http.latency.site.api.espn.com/schedule", [0.2] * 10)
+        self.timeouts.timeout_for(self.URL)
+        snapshot = self.timeouts.snapshot()
+        self.assertEqual(list(snapshot), ["site.api.espn.com/schedule"])
+        self.assertEqual(snapshot["site.api.espn.com/schedule"]["samples"], 10)
+        self.assertEqual(snapshot["site.api.espn.com/schedule"]["connect"], 3.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
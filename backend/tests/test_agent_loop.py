@@ -0,0 +1,115 @@
+import asyncio
+import json
+import unittest
+
+from agent_loop import agent_rounds, compact_value, summarize_result
+from tool_executor import run_tools
+
+
+def scripted_model(rounds):
+    """Fake stream_calls: returns the next round's calls and records the messages it saw."""
+    seen = []
+
+    async def stream_calls(messages):
+        seen.append([dict(m) for m in messages])
+        for call in rounds[len(seen) - 1] if len(seen) <= len(rounds) else []:
+            yield call
+
+    return stream_calls, seen
+
+
+FUNCTIONS = {
+    "sports_search_team": lambda team: {"id": "13", "name": team.title()},
+    "sports_get_team_stats": lambda team_id: {"team_id": team_id, "games": list(range(20))},
+    "stocks_fetch_stock_info": lambda symbol: {"symbol": symbol},
+}
+
+
+def run_calls(calls):
+    return run_tools(calls, FUNCTIONS, report_starts=True)
+
+
+def collect(loop):
+    async def run():
+        return [event async for event in loop]
+
+    return asyncio.run(run())
+
+
+class TestCompaction(unittest.TestCase):
+    def test_compact_value(self):
+        value = {"games": list(range(10)), "name": "x" * 200, "nested": {"a": {"b": {"c": [1]}}}}
+        compacted = compact_value(value)
+        self.assertEqual(compacted["games"], [0, 1, 2, "... 7 more"])
+        self.assertTrue(compacted["name"].endswith("...") and len(compacted["name"]) == 83)
+        self.assertEqual(compacted["nested"]["a"]["b"], "{1 fields}")
+
+    def test_summarize_result(self):
+        self.assertEqual(json.loads(summarize_result({"error": "boom"})), {"error": "boom"})
+        invalid = [{"param": "player_tag", "error": "player_tag is required"}]
+        self.assertEqual(json.loads(summarize_result({"error": "Invalid arguments", "invalid": invalid}))["invalid"], invalid)
+        summary = summarize_result({"result": {"items": ["y" * 70] * 3}}, max_chars=50)
+        self.assertTrue(summary.endswith("...(truncated)"))
+
+
+class TestAgentRounds(unittest.TestCase):
+    def test_second_round_uses_first_round_results(self):
+        stream_calls, seen = scripted_model([
+            [{"function": "sports_search_team", "args": {"team": "lakers"}}],
+            [{"function": "sports_get_team_stats", "args": {"team_id": "13"}}],
+            [],
+        ])
+        events = collect(agent_rounds([{"role": "user", "content": "lakers"}], stream_calls, run_calls))
+
+        self.assertIn({"round": 2}, events)
+        self.assertIn({"round": 3}, events)
+        results = [e for e in events if "result" in e]
+        self.assertEqual([e["function"] for e in results], ["sports_search_team", "sports_get_team_stats"])
+        self.assertEqual(sorted(e["index"] for e in results), [0, 1])
+
+        second = seen[1]
+        self.assertEqual(second[1]["role"], "assistant")
+        self.assertEqual(second[1]["tool_calls"][0]["function"]["name"], "sports_search_team")
+        self.assertEqual(second[2]["role"], "tool")
+        self.assertEqual(second[2]["tool_call_id"], second[1]["tool_calls"][0]["id"])
+        self.assertIn("Lakers", second[2]["content"])
+        # the stats result is compacted before it goes back to the model
+        self.assertIn("more", seen[2][-1]["content"])
+
+    def test_round_limit(self):
+        stream_calls, seen = scripted_model([
+            [{"function": "stocks_fetch_stock_info", "args": {"symbol": s}}] for s in ["A", "B", "C", "D"]
+        ])
+        events = collect(agent_rounds([], stream_calls, run_calls, max_rounds=2))
+        self.assertEqual(len(seen), 2)
+        self.assertEqual(len([e for e in events if "result" in e]), 2)
+
+    def test_time_budget(self):
+        now = [0.0]
+
+        async def slow_model(messages):
+            now[0] += 10
+            yield {"function": "stocks_fetch_stock_info", "args": {"symbol": str(now[0])}}
+
+        events = collect(agent_rounds([], slow_model, run_calls, time_budget=5, clock=lambda: now[0]))
+        self.assertNotIn({"round": 2}, events)
+
+    def test_repeated_calls_are_not_rerun(self):
+        call = {"function": "stocks_fetch_stock_info", "args": {"symbol": "AAPL"}}
+        stream_calls, seen = scripted_model([[call], [call], []])
+        events = collect(agent_rounds([], stream_calls, run_calls))
+        self.assertEqual(len([e for e in events if "result" in e]), 1)
+        self.assertIn("Already fetched", seen[2][-1]["content"])
+
+    def test_initial_calls_run_first_without_the_model_seeing_them(self):
+        initial = [{"function": "stocks_fetch_stock_info", "args": {"symbol": "AAPL"}}]
+        stream_calls, seen = scripted_model([[dict(initial[0])], []])
+        events = collect(agent_rounds([], stream_calls, run_calls, initial_calls=initial))
+        self.assertEqual(len([e for e in events if "result" in e]), 1)
+        # the model asked for the same call again and was pointed at the earlier result
+        self.assertEqual(len(seen), 2)
+        self.assertIn("Already fetched", seen[1][-1]["content"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,73 @@
+import unittest
+
+from circuit_breaker import BreakerRegistry, CircuitBreaker
+from metrics import metrics
+from tests.helpers import FakeClock
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    def setUp(self):
+        metrics.reset()
+        self.clock = FakeClock()
+        self.breaker = CircuitBreaker("host:espn", failure_threshold=3, reset_timeout=30, clock=self.clock)
+
+    def trip(self):
+        for _ in range(3):
+            self.breaker.record_failure()
+
+    def test_opens_after_consecutive_failures(self):
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+        self.breaker.record_success()
+        self.breaker.record_failure()
+        self.assertTrue(self.breaker.allow())
+
+        self.trip()
+        self.assertFalse(self.breaker.allow())
+        self.assertEqual(metrics.counters["breaker.opened"], 1)
+        self.assertEqual(metrics.counters["breaker.short_circuited"], 1)
+
+    def test_half_open_allows_one_probe(self):
+        self.trip()
+        self.clock.now = 30
+        self.assertTrue(self.breaker.allow())
+        self.assertFalse(self.breaker.allow())
+        self.assertEqual(self.breaker.snapshot()["state"], "half_open")
+
+        self.breaker.record_success()
+        self.assertEqual(self.breaker.snapshot(), {"state": "closed", "failures": 0, "retry_in": 0.0})
+
+    def test_failed_probe_reopens(self):
+        self.trip()
+        self.clock.now = 30
+        self.assertTrue(self.breaker.allow())
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.snapshot()["state"], "open")
+        self.assertEqual(self.breaker.snapshot()["retry_in"], 30)
+
+    def test_lost_probe_is_replaced(self):
+        self.trip()
+        self.clock.now = 30
+        self.assertTrue(self.breaker.allow())
+        self.clock.now = 60
+        self.assertTrue(self.breaker.allow())
+
+    def test_released_probe_is_replaced_at_once(self):
+        self.trip()
+        self.clock.now = 30
+        self.assertTrue(self.breaker.allow())
+        self.breaker.release()
+        self.assertTrue(self.breaker.allow())
+        self.assertEqual(self.breaker.snapshot()["state"], "half_open")
+
+    def test_registry(self):
+        registry = BreakerRegistry(failure_threshold=1, clock=self.clock)
+        self.assertIs(registry.get("tool:sports"), registry.get("tool:sports"))
+        registry.get("host:api.clashroyale.com").record_failure()
+        snapshot = registry.snapshot()
+        self.assertEqual(list(snapshot), ["host:api.clashroyale.com", "tool:sports"])
+        self.assertEqual(snapshot["host:api.clashroyale.com"]["state"], "open")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,11 +1,13 @@
 #!/usr/bin/env python3
+import asyncio
+
 from integrations import ClashRoyaleDataFetcher
 from config import get_settings
 
 PLAYER_TAG = "#JP9R8V8G8"
 
 
-def main():
+async def main():
     print("Clash Royale Integration Test\n")
 
     settings = get_settings()
@@ -29,7 +31,7 @@ def main():
 
     print(f"\nFetching data for {PLAYER_TAG}...")
 
-    player = fetcher.get_player(PLAYER_TAG)
+    player = await fetcher.get_player(PLAYER_TAG)
     if player:
         print("\nOK: Player data fetched successfully")
         print(f"   Name: {player['name']}")
@@ -38,7 +40,7 @@ def main():
         print(f"   Wins: {player['wins']} | Losses: {player['losses']}")
         print(f"   Clan: {player['clan'] or 'None'}")
 
-        battles = fetcher.get_player_battle_log(PLAYER_TAG, limit=3)
+        battles = await fetcher.get_player_battle_log(PLAYER_TAG, limit=3)
         if battles:
             print("\nRecent battles:")
             for i, b in enumerate(battles, 1):
@@ -46,12 +48,12 @@ def main():
                     f"   {i}. vs {b['opponent_name']} - {b['result'].upper()} ({b['team_crowns']}-{b['opponent_crowns']})"
                 )
 
-        deck = fetcher.get_current_deck(PLAYER_TAG)
+        deck = await fetcher.get_current_deck(PLAYER_TAG)
         if deck:
             print("\nCurrent deck:")
             print(f"   {', '.join([c['name'] for c in deck])}")
 
-        chests = fetcher.get_player_upcoming_chests(PLAYER_TAG)
+        chests = await fetcher.get_player_upcoming_chests(PLAYER_TAG)
         if chests:
             print("\nNext 5 chests:")
             for c in chests[:5]:
@@ -62,4 +64,4 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    asyncio.run(main())
@@ -0,0 +1,59 @@
+import asyncio
+import unittest
+
+from deadline import Deadline, DeadlineExceeded, first_within
+from tests.helpers import FakeClock
+
+
+class TestDeadline(unittest.TestCase):
+    def test_remaining_and_expiry(self):
+        clock = FakeClock()
+        deadline = Deadline(5, clock)
+        self.assertEqual(deadline.remaining(), 5)
+        clock.now = 4
+        self.assertFalse(deadline.expired)
+        clock.now = 6
+        self.assertEqual(deadline.remaining(), 0)
+        self.assertTrue(deadline.expired)
+
+    def test_clamp(self):
+        clock = FakeClock()
+        deadline = Deadline(5, clock)
+        clock.now = 3
+        self.assertEqual(deadline.clamp((3.05, 10.0)), (2.0, 2.0))
+        self.assertEqual(deadline.clamp(1.5), 1.5)
+
+
+async def frames(delays):
+    for delay, frame in delays:
+        await asyncio.sleep(delay)
+        yield frame
+
+
+class TestFirstWithin(unittest.TestCase):
+    def collect(self, items, deadline, is_first=lambda item: True, fallback=None):
+        async def run():
+            return [item async for item in first_within(items, deadline, is_first, fallback)]
+
+        return asyncio.run(run())
+
+    def test_only_the_first_item_is_timed(self):
+        items = frames([(0, "keepalive"), (0, "ui"), (0.2, "ui")])
+        self.assertEqual(self.collect(items, Deadline(0.1), lambda f: f == "ui"), ["keepalive", "ui", "ui"])
+
+    def test_late_first_item_raises_and_closes(self):
+        items = frames([(0, "keepalive"), (1, "ui")])
+        with self.assertRaises(DeadlineExceeded):
+            self.collect(items, Deadline(0.05), lambda f: f == "ui")
+        self.assertIsNone(items.ag_frame)
+
+    def test_late_first_item_hands_over_to_the_fallback(self):
+        items = frames([(0, "keepalive"), (1, "ui")])
+        backup = frames([(0.2, "backup ui"), (0, "backup ui")])
+        collected = self.collect(items, Deadline(0.05), lambda f: "ui" in f, lambda: backup)
+        self.assertEqual(collected, ["keepalive", "backup ui", "backup ui"])
+        self.assertIsNone(items.ag_frame)
+
+
+if __name__ == "__main__":
+    unittest.main()
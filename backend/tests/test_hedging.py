@@ -0,0 +1,88 @@
+import asyncio
+import unittest
+from hedging import hedged, hedge_delay
+from metrics import metrics
+
+
+def call(result, delay=0.0, error=None, log=None, name=None):
+    async def run():
+        if log is not None:
+            log.append(name)
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            if log is not None:
+                log.append(f"{name} cancelled")
+            raise
+        if error:
+            raise error
+        return result
+    return run
+
+
+class TestHedged(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        metrics.reset()
+
+    async def test_fast_primary_never_hedges(self):
+        log = []
+        result = await hedged(
+            [call("a", 0.0, log=log, name="a"), call("b", log=log, name="b")], delay=0.1, name="t"
+        )
+        self.assertEqual(result, "a")
+        self.assertEqual(log, ["a"])
+        self.assertNotIn("t.hedges_issued", metrics.counters)
+
+    async def test_slow_primary_loses_to_hedge(self):
+        log = []
+        result = await hedged(
+            [call("a", 1.0, log=log, name="a"), call("b", 0.01, log=log, name="b")], delay=0.02, name="t"
+        )
+        await asyncio.sleep(0)
+
+        self.assertEqual(result, "b")
+        self.assertIn("a cancelled", log)
+        self.assertEqual(metrics.counters["t.hedges_issued"], 1)
+        self.assertEqual(metrics.counters["t.hedges_won"], 1)
+
+    async def test_primary_can_still_win_after_hedge(self):
+        result = await hedged([call("a", 0.05), call("b", 1.0)], delay=0.02, name="t")
+        self.assertEqual(result, "a")
+        self.assertEqual(metrics.counters["t.hedges_issued"], 1)
+        self.assertNotIn("t.hedges_won", metrics.counters)
+
+    async def test_failed_primary_hedges_immediately(self):
+        result = await hedged(
+            [call(None, 0, error=ValueError("bad json")), call("b", 0)], delay=10, name="t"
+        )
+        self.assertEqual(result, "b")
+
+    async def test_invalid_result_is_skipped(self):
+        result = await hedged(
+            [call({"oops": 1}), call({"sources": []}, 0.01)],
+            delay=10,
+            validate=lambda r: "sources" in r,
+        )
+        self.assertEqual(result, {"sources": []})
+
+    async def test_all_failing_raises_last_error(self):
+        with self.assertRaises(RuntimeError):
+            await hedged([call(None, error=ValueError("x")), call(None, error=RuntimeError("y"))], delay=0)
+
+
+class TestHedgeDelay(unittest.TestCase):
+    def setUp(self):
+        metrics.reset()
+
+    def test_default_until_enough_samples(self):
+        metrics.observe("lat", 0.5)
+        self.assertEqual(hedge_delay("lat", default=2.0, min_samples=5), 2.0)
+
+    def test_uses_percentile(self):
+        for i in range(1, 101):
+            metrics.observe("lat", i / 100)
+        self.assertAlmostEqual(hedge_delay("lat", 90, min_samples=5), 0.9, places=2)
+
+
+if __name__ == "__main__":
+    unittest.main()
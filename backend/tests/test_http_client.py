@@ -0,0 +1,110 @@
+import asyncio
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from circuit_breaker import BreakerRegistry
+from deadline import Deadline, DeadlineExceeded, current_deadline
+from http_client import HTTPClient
+from metrics import metrics
+from resilience import Resilience
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        if self.path == "/sleepy":
+            time.sleep(0.3)
+        body = b'{"ok": true}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except ConnectionError:
+            # the client timed out and hung up
+            pass
+
+    def log_message(self, *args):
+        pass
+
+
+class TestHTTPClient(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.url = f"http://127.0.0.1:{cls.server.server_port}/"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+
+    def setUp(self):
+        metrics.reset()
+        self.client = HTTPClient(timeout=(1, 2))
+
+    def tearDown(self):
+        self.client.session.close()
+
+    def test_connections_are_reused(self):
+        for _ in range(5):
+            self.assertEqual(self.client.get(self.url).json(), {"ok": True})
+
+        self.assertEqual(metrics.counters["http.requests"], 5)
+        self.assertEqual(metrics.counters["http.connections_opened"], 1)
+        self.assertEqual(metrics.gauges["http.connection_reuse"], 0.8)
+        self.assertEqual(metrics.count("http.handshake"), 1)
+        self.assertEqual(metrics.count("http.latency.127.0.0.1"), 5)
+
+    def test_async_entry_point(self):
+        async def fetch():
+            try:
+                return await self.client.aget(self.url)
+            finally:
+                await self.client.aclose()
+
+        self.assertEqual(asyncio.run(fetch()).json(), {"ok": True})
+        self.assertEqual(metrics.counters["http.connections_opened"], 1)
+
+    def test_deadline_frees_half_open_probe(self):
+        breakers = BreakerRegistry(failure_threshold=1, reset_timeout=0)
+        client = HTTPClient(timeout=(1, 2), breakers=breakers)
+        breaker = breakers.get("host:127.0.0.1")
+        breaker.record_failure()
+        token = current_deadline.set(Deadline(0))
+        try:
+            with self.assertRaises(DeadlineExceeded):
+                client.get(self.url)
+        finally:
+            current_deadline.reset(token)
+        # the probe slot is free again; the next request gets to try
+        self.assertEqual(client.get(self.url).json(), {"ok": True})
+        self.assertEqual(breaker.snapshot()["state"], "closed")
+        client.session.close()
+
+    def test_timeouts_are_recorded_at_the_timeout(self):
+        client = HTTPClient(timeout=(1, 0.1), resilience=Resilience(max_attempts=1))
+        with self.assertRaises(requests.Timeout):
+            client.get(self.url + "sleepy")
+        self.assertEqual(metrics.counters["http.timeouts"], 1)
+        self.assertEqual(metrics.percentile("http.latency.127.0.0.1/sleepy", 99), 0.1)
+
+        # cut short by the deadline: not a sample of how slow the endpoint is
+        token = current_deadline.set(Deadline(0.05))
+        try:
+            with self.assertRaises(requests.Timeout):
+                client.get(self.url + "sleepy")
+        finally:
+            current_deadline.reset(token)
+        self.assertEqual(metrics.count("http.latency.127.0.0.1/sleepy"), 1)
+        client.session.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
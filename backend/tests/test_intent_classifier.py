@@ -0,0 +1,130 @@
+import io
+import json
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from intent_classifier import (
+    IntentClassifier,
+    evaluate,
+    featurize,
+    load_examples,
+    log_plan,
+    main,
+    plan_label,
+)
+
+MUSIC = {"sources": ["music::top_songs", "music::top_artists"], "intent": "Relive their listening.", "approach": "Hero song."}
+TRAVEL = {"sources": ["travel::cities", "travel::total_countries"], "intent": "Map their trips.", "approach": "Map first."}
+READING = {"sources": ["reading::top_books"], "intent": "Celebrate their books.", "approach": "Bookshelf."}
+
+EXAMPLES = [
+    ("what have I been listening to", MUSIC),
+    ("my favorite artists lately", MUSIC),
+    ("show my most played tracks", MUSIC),
+    ("what music do I like", MUSIC),
+    ("where have I traveled", TRAVEL),
+    ("countries I visited", TRAVEL),
+    ("my trips around the world", TRAVEL),
+    ("cities I have been to", TRAVEL),
+    ("books I read this year", READING),
+    ("my reading list", READING),
+    ("what novels did I finish", READING),
+    ("favorite books", READING),
+    ("a one-off question", {"sources": ["calendar::events"], "intent": "x", "approach": "y"}),
+]
+
+
+class TestFeatures(unittest.TestCase):
+    def test_deterministic_and_normalized(self):
+        a = featurize("My top songs")
+        self.assertEqual(a, featurize("my TOP songs"))
+        self.assertAlmostEqual(sum(v * v for v in a.values()), 1.0)
+
+    def test_label_ignores_source_order(self):
+        self.assertEqual(plan_label({"sources": ["b", "a"]}), plan_label({"sources": ["a", "b"]}))
+
+
+class TestIntentClassifier(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.model = IntentClassifier.train(EXAMPLES)
+
+    def test_rare_source_sets_are_left_out(self):
+        self.assertEqual(len(self.model.labels), 3)
+
+    def test_predicts_source_set_with_template(self):
+        plan, confidence = self.model.predict("which artists have I been listening to")
+        self.assertEqual(plan["sources"], MUSIC["sources"])
+        self.assertEqual(plan["intent"], MUSIC["intent"])
+        self.assertEqual(plan["route"], "classifier")
+        self.assertGreater(confidence, 0.5)
+
+        plan, _ = self.model.predict("countries and cities I visited")
+        self.assertEqual(plan["sources"], TRAVEL["sources"])
+
+    def test_templates_do_not_name_other_queries_entities(self):
+        def team(name):
+            return {"sources": ["sports::nba_teams"], "intent": f"See how the {name} are doing this season.",
+                    "approach": f"Lead with the {name} record."}
+
+        model = IntentClassifier.train(EXAMPLES + [
+            ("how are the lakers doing", team("Lakers")),
+            ("lakers scores", team("Lakers")),
+            ("celtics record", team("Celtics")),
+        ])
+        plan, _ = model.predict("how are the celtics doing")
+        self.assertEqual(plan["sources"], ["sports::nba_teams"])
+        self.assertEqual(plan["intent"], "Explore their sports data.")
+        self.assertNotIn("Lakers", plan["approach"])
+
+    def test_unrelated_query_is_not_confident(self):
+        _, confidence = self.model.predict("zzz qqq")
+        self.assertLess(confidence, 0.8)
+
+    def test_save_load_roundtrip(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "model.json")
+            self.model.save(path)
+            loaded = IntentClassifier.load(path)
+
+        query = "books I finished"
+        self.assertEqual(loaded.predict(query)[0]["sources"], self.model.predict(query)[0]["sources"])
+        self.assertAlmostEqual(loaded.predict(query)[1], self.model.predict(query)[1], places=3)
+
+    def test_training_needs_repeated_source_sets(self):
+        with self.assertRaises(ValueError):
+            IntentClassifier.train(EXAMPLES[-1:])
+
+    def test_evaluate_report(self):
+        report = evaluate(self.model, EXAMPLES[:-1], threshold=0.5)
+        self.assertEqual(report["examples"], 12)
+        self.assertGreaterEqual(report["accuracy"], 0.9)
+        self.assertIn("p99", report["latency_ms"])
+        self.assertLess(report["latency_ms"]["p50"], 5)
+
+
+class TestPlanLog(unittest.TestCase):
+    def test_log_roundtrip_and_cli(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            log = os.path.join(tmp, "plans.jsonl")
+            out = os.path.join(tmp, "model.json")
+            for query, plan in EXAMPLES:
+                log_plan(log, query, {**plan, "sections": []})
+            with open(log, "a") as f:
+                f.write("not json\n")
+
+            examples = load_examples(log)
+            self.assertEqual(len(examples), len(EXAMPLES))
+            self.assertNotIn("sections", examples[0][1])
+
+            with redirect_stdout(io.StringIO()):
+                main(["train", "--log", log, "--out", out, "--holdout", "0"])
+            buffer = io.StringIO()
+            with redirect_stdout(buffer):
+                main(["report", "--log", log, "--model", out])
+            self.assertEqual(json.loads(buffer.getvalue())["examples"], len(EXAMPLES))
+
+
+if __name__ == "__main__":
+    unittest.main()
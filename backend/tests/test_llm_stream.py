@@ -0,0 +1,244 @@
+import asyncio
+import unittest
+from types import SimpleNamespace
+from llm_stream import (
+    ChunkBuffer,
+    ToolCallAssembler,
+    buffered_content,
+    chunk_text,
+    failover_content,
+    streamed_tool_calls,
+    KEEPALIVE,
+)
+from metrics import metrics
+
+
+def make_chunk(text):
+    return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text))])
+
+
+async def fake_response(texts, error=None):
+    for text in texts:
+        yield make_chunk(text)
+    if error:
+        raise error
+
+
+class TestChunkText(unittest.TestCase):
+    def test_extracts_content(self):
+        self.assertEqual(chunk_text(make_chunk("<div>")), "<div>")
+
+    def test_missing_content(self):
+        self.assertEqual(chunk_text(make_chunk(None)), "")
+        self.assertEqual(chunk_text(SimpleNamespace(choices=[])), "")
+
+
+def tool_chunk(index, name=None, arguments=None):
+    function = SimpleNamespace(name=name, arguments=arguments)
+    delta = SimpleNamespace(content=None, tool_calls=[SimpleNamespace(index=index, function=function)])
+    return SimpleNamespace(choices=[SimpleNamespace(delta=delta)])
+
+
+class TestToolCallAssembler(unittest.TestCase):
+    def test_call_released_when_arguments_complete(self):
+        assembler = ToolCallAssembler()
+        self.assertEqual(assembler.feed(tool_chunk(0, "sports_fetch_nba_summary", '{"team_')), [])
+        self.assertEqual(assembler.feed(tool_chunk(0, None, 'names": ["lakers"')), [])
+        self.assertEqual(
+            assembler.feed(tool_chunk(0, None, "]}")),
+            [{"function": "sports_fetch_nba_summary", "args": {"team_names": ["lakers"]}}],
+        )
+        self.assertEqual(assembler.finish(), [])
+
+    def test_no_argument_call_released_by_next_call_or_end(self):
+        assembler = ToolCallAssembler()
+        self.assertEqual(assembler.feed(tool_chunk(0, "spotify_fetch_user_data", "")), [])
+        self.assertEqual(
+            assembler.feed(tool_chunk(1, "strava_fetch_user_summary")),
+            [{"function": "spotify_fetch_user_data", "args": {}}],
+        )
+        self.assertEqual(assembler.finish(), [{"function": "strava_fetch_user_summary", "args": {}}])
+
+    def test_invalid_arguments_dropped_at_end(self):
+        assembler = ToolCallAssembler()
+        assembler.feed(tool_chunk(0, "f", '{"a": '))
+        self.assertEqual(assembler.finish(), [])
+
+    def test_text_chunks_are_ignored(self):
+        self.assertEqual(ToolCallAssembler().feed(make_chunk("hello")), [])
+
+
+class TestStreamedToolCalls(unittest.IsolatedAsyncioTestCase):
+    async def test_first_call_yielded_before_stream_ends(self):
+        second_sent = asyncio.Event()
+
+        async def response():
+            yield tool_chunk(0, "a", '{"x": 1}')
+            second_sent.set()
+            yield tool_chunk(1, "b", '{"y": 2}')
+
+        calls = streamed_tool_calls(response())
+        self.assertEqual(await calls.__anext__(), {"function": "a", "args": {"x": 1}})
+        self.assertFalse(second_sent.is_set())
+        self.assertEqual([c async for c in calls], [{"function": "b", "args": {"y": 2}}])
+
+
+class TestChunkBuffer(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        metrics.reset()
+
+    async def test_coalesce_merges_when_full(self):
+        buffer = ChunkBuffer(maxsize=2, policy="coalesce")
+        for text in ["a", "b", "c", "d"]:
+            buffer.put_nowait(text)
+        buffer.close()
+
+        self.assertEqual(buffer.depth, 2)
+        self.assertEqual(await buffer.get(), "a")
+        self.assertEqual(await buffer.get(), "bcd")
+        self.assertIsNone(await buffer.get())
+        self.assertEqual(metrics.counters["llm_buffer.coalesced"], 2)
+
+    async def test_spill_keeps_order_and_boundaries(self):
+        buffer = ChunkBuffer(maxsize=2, policy="spill")
+        for text in ["a", "b", "c", "d"]:
+            buffer.put_nowait(text)
+        buffer.close()
+
+        self.assertEqual(buffer.depth, 4)
+        out = [await buffer.get() for _ in range(4)]
+        self.assertEqual(out, ["a", "b", "c", "d"])
+        self.assertIsNone(await buffer.get())
+        self.assertEqual(metrics.counters["llm_buffer.spilled"], 2)
+
+    async def test_spill_is_bounded(self):
+        buffer = ChunkBuffer(maxsize=2, policy="spill", max_spill=2)
+        for text in ["a", "b", "c", "d", "e", "f"]:
+            buffer.put_nowait(text)
+        buffer.close()
+
+        self.assertEqual(buffer.depth, 4)
+        out = [await buffer.get() for _ in range(4)]
+        self.assertEqual(out, ["a", "b", "c", "def"])
+        self.assertEqual(metrics.counters["llm_buffer.coalesced"], 2)
+        self.assertEqual(buffer.max_depth, 4)
+        self.assertNotIn("llm_buffer.depth", metrics.gauges)
+
+    async def test_error_raised_after_drain(self):
+        buffer = ChunkBuffer()
+        buffer.put_nowait("a")
+        buffer.close(RuntimeError("provider died"))
+
+        self.assertEqual(await buffer.get(), "a")
+        with self.assertRaises(RuntimeError):
+            await buffer.get()
+
+    def test_unknown_policy(self):
+        with self.assertRaises(ValueError):
+            ChunkBuffer(policy="drop")
+
+
+class TestBufferedContent(unittest.IsolatedAsyncioTestCase):
+    async def test_yields_all_text(self):
+        out = [t async for t in buffered_content(fake_response(["<div>", None, "hi", "</div>"]))]
+        self.assertEqual("".join(out), "<div>hi</div>")
+
+    async def test_reader_runs_ahead_of_slow_consumer(self):
+        stream = buffered_content(fake_response([str(i) for i in range(10)]), maxsize=3)
+        first = await stream.__anext__()
+        await asyncio.sleep(0.01)
+        rest = [t async for t in stream]
+
+        self.assertEqual(first + "".join(rest), "0123456789")
+        self.assertLess(len(rest), 9)
+
+    async def test_propagates_provider_error(self):
+        with self.assertRaises(RuntimeError):
+            async for _ in buffered_content(fake_response(["a"], RuntimeError("stalled"))):
+                pass
+
+
+async def stalling_response(texts):
+    for text in texts:
+        yield make_chunk(text)
+    await asyncio.sleep(10)
+
+
+class TestFailoverContent(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        metrics.reset()
+
+    async def test_primary_succeeds(self):
+        async def open_stream(model, partial):
+            return fake_response(["<div>", "</div>"])
+
+        out = [t async for t in failover_content(open_stream, ["a", "b"])]
+        self.assertEqual(out, ["<div>", "</div>"])
+
+    async def test_stall_fails_over_with_partial(self):
+        calls = []
+
+        async def open_stream(model, partial):
+            calls.append((model, partial))
+            if model == "primary":
+                return stalling_response(["<div>", "<p>"])
+            return fake_response(["hi</p></div>"])
+
+        out = [
+            t async for t in failover_content(
+                open_stream, ["primary", "fallback"], stall_timeout=0.05, keepalive_interval=0.02
+            )
+        ]
+        text = "".join(t for t in out if t is not KEEPALIVE)
+
+        self.assertEqual(text, "<div><p>hi</p></div>")
+        self.assertIn(KEEPALIVE, out)
+        self.assertEqual(calls, [("primary", ""), ("fallback", "<div><p>")])
+        self.assertEqual(metrics.counters["ui.failovers"], 1)
+
+    async def test_error_fails_over(self):
+        reports = []
+
+        async def open_stream(model, partial):
+            if model == "primary":
+                return fake_response(["<a>"], RuntimeError("overloaded"))
+            return fake_response(["</a>"])
+
+        out = [
+            t async for t in failover_content(
+                open_stream, ["primary", "fallback"], report=lambda m, lat, ok: reports.append((m, ok))
+            )
+        ]
+        self.assertEqual("".join(out), "<a></a>")
+        self.assertEqual(reports, [("primary", True), ("primary", False), ("fallback", True)])
+
+    async def test_last_model_error_propagates(self):
+        async def open_stream(model, partial):
+            raise RuntimeError(f"{model} down")
+
+        with self.assertRaises(RuntimeError):
+            async for _ in failover_content(open_stream, ["primary", "fallback"]):
+                pass
+
+
+class TestMetrics(unittest.TestCase):
+    def setUp(self):
+        metrics.reset()
+
+    def test_snapshot_summaries(self):
+        for i in range(1, 101):
+            metrics.observe("latency", i)
+        metrics.incr("hits")
+        metrics.set_gauge("depth", 3)
+
+        snap = metrics.snapshot()
+        self.assertEqual(snap["counters"]["hits"], 1)
+        self.assertEqual(snap["gauges"]["depth"], 3)
+        self.assertEqual(snap["summaries"]["latency"]["count"], 100)
+        self.assertEqual(snap["summaries"]["latency"]["max"], 100)
+        self.assertEqual(metrics.percentile("latency", 50), 51)
+        self.assertIsNone(metrics.percentile("missing", 50))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,97 @@
+import unittest
+from model_router import ModelRouter
+from metrics import metrics
+from tests.helpers import FakeClock
+
+
+class FakeProvider:
+    """Completes instantly but advances the fake clock by each model's latency."""
+
+    def __init__(self, clock, latencies, failing=()):
+        self.clock = clock
+        self.latencies = latencies
+        self.failing = set(failing)
+        self.calls = []
+
+    async def __call__(self, model):
+        self.calls.append(model)
+        self.clock.now += self.latencies.get(model, 0.1)
+        if model in self.failing:
+            raise RuntimeError(f"{model} unavailable")
+        return f"response from {model}"
+
+
+ROUTES = {
+    "ui": [
+        {"model": "fast", "max_data_chars": 1000},
+        {"model": "primary"},
+        {"model": "backup"},
+    ],
+    "refine": [
+        {"model": "editor", "kinds": ["refine"]},
+        {"model": "primary"},
+    ],
+}
+
+
+class TestModelRouter(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        metrics.reset()
+        self.clock = FakeClock()
+        self.router = ModelRouter(
+            ROUTES, latency_thresholds={"ui": 2.0}, probe_interval=30, clock=self.clock
+        )
+
+    def test_features_filter_candidates(self):
+        self.assertEqual(self.router.pick("ui", {"data_chars": 500}), "fast")
+        self.assertEqual(self.router.pick("ui", {"data_chars": 5000}), "primary")
+        self.assertEqual(self.router.pick("refine", {"kind": "refine"}), "editor")
+        self.assertEqual(self.router.pick("refine", {"kind": "generate"}), "primary")
+
+    def test_unknown_stage(self):
+        with self.assertRaises(KeyError):
+            self.router.pick("nope")
+
+    async def test_slow_model_is_skipped_until_probe(self):
+        provider = FakeProvider(self.clock, {"primary": 5.0, "backup": 0.5})
+        features = {"data_chars": 5000}
+
+        await self.router.call("ui", provider, features)
+        self.assertTrue(self.router.is_degraded("ui", "primary"))
+        self.assertEqual(self.router.pick("ui", features), "backup")
+
+        await self.router.call("ui", provider, features)
+        self.assertEqual(provider.calls, ["primary", "backup"])
+
+        self.clock.now += 31
+        self.assertEqual(self.router.pick("ui", features), "primary")
+
+    async def test_falls_back_on_error(self):
+        provider = FakeProvider(self.clock, {}, failing={"primary"})
+        result = await self.router.call("ui", provider, {"data_chars": 5000})
+
+        self.assertEqual(result, "response from backup")
+        self.assertEqual(provider.calls, ["primary", "backup"])
+        self.assertEqual(metrics.counters["model.ui.errors"], 1)
+
+    async def test_error_rate_degrades(self):
+        for _ in range(5):
+            self.router.record("ui", "primary", None, ok=False)
+        self.assertTrue(self.router.is_degraded("ui", "primary"))
+        self.assertEqual(self.router.candidates("ui", {"data_chars": 5000}), ["backup", "primary"])
+
+    async def test_all_failing_raises(self):
+        provider = FakeProvider(self.clock, {}, failing={"primary", "backup"})
+        with self.assertRaises(RuntimeError):
+            await self.router.call("ui", provider, {"data_chars": 5000})
+
+    def test_ewma_latency(self):
+        self.router.record("ui", "primary", 1.0, ok=True)
+        self.router.record("ui", "primary", 2.0, ok=True)
+        snap = self.router.snapshot()["ui"]["primary"]
+        self.assertAlmostEqual(snap["ewma_latency"], 1.2)
+        self.assertEqual(snap["calls"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+import unittest
+from plan_compiler import compile_plan, needs_agent, required_params
+
+TOOLS = [
+    {"function": {"name": "spotify_fetch_user_data"}},
+    {"function": {"name": "strava_fetch_user_summary"}},
+    {"function": {"name": "stocks_fetch_market_trends"}},
+    {"function": {"name": "stocks_fetch_stock_info", "parameters": {"required": ["symbols"]}}},
+    {"function": {"name": "sports_fetch_nba_summary", "parameters": {"required": ["team_names"]}}},
+    {"function": {"name": "sports_fetch_nfl_summary", "parameters": {"required": ["team_names"]}}},
+    {"function": {"name": "clash_fetch_user_summary", "parameters": {"required": ["player_tag"]}}},
+]
+REQUIRED = required_params(TOOLS)
+NO_ENTITIES = {"teams": {}, "tickers": [], "player_tags": [], "keywords": []}
+
+
+class TestCompilePlan(unittest.TestCase):
+    def test_required_params(self):
+        self.assertEqual(REQUIRED["spotify_fetch_user_data"], [])
+        self.assertEqual(REQUIRED["stocks_fetch_stock_info"], ["symbols"])
+
+    def test_sources_sharing_a_tool_compile_to_one_call(self):
+        compiled = compile_plan(["music::top_songs", "music::top_artists"], NO_ENTITIES, REQUIRED)
+        self.assertEqual(len(compiled["calls"]), 1)
+        self.assertEqual(compiled["calls"][0]["function"], "spotify_fetch_user_data")
+        self.assertEqual(compiled["calls"][0]["sources"], ["music::top_songs", "music::top_artists"])
+        self.assertFalse(needs_agent(compiled, NO_ENTITIES))
+
+    def test_arguments_come_from_entities(self):
+        entities = {**NO_ENTITIES, "teams": {"nba": ["lakers"], "nfl": ["jets"]}, "tickers": ["AAPL"]}
+        compiled = compile_plan(["sports::nba_teams", "sports::nfl_teams", "stocks::stock_data"], entities, REQUIRED)
+        self.assertEqual(
+            [(c["function"], c["args"]) for c in compiled["calls"]],
+            [
+                ("sports_fetch_nba_summary", {"team_names": ["lakers"]}),
+                ("sports_fetch_nfl_summary", {"team_names": ["jets"]}),
+                ("stocks_fetch_stock_info", {"symbols": ["AAPL"]}),
+            ],
+        )
+
+    def test_missing_required_argument_is_unresolved(self):
+        compiled = compile_plan(["gaming::top_games", "stocks::market_indices"], NO_ENTITIES, REQUIRED)
+        self.assertEqual(compiled["unresolved"], ["gaming::top_games"])
+        self.assertEqual(compiled["calls"][0]["function"], "stocks_fetch_market_trends")
+        self.assertTrue(needs_agent(compiled, NO_ENTITIES))
+
+    def test_player_tag(self):
+        entities = {**NO_ENTITIES, "player_tags": ["#2PP"]}
+        compiled = compile_plan(["gaming::top_games"], entities, REQUIRED)
+        self.assertEqual(compiled["calls"][0]["args"], {"player_tag": "#2PP"})
+
+    def test_mock_only_sources_are_static(self):
+        compiled = compile_plan(["travel::cities", "reading::top_books"], NO_ENTITIES, REQUIRED)
+        self.assertEqual(compiled["static"], ["travel::cities", "reading::top_books"])
+        self.assertFalse(needs_agent(compiled, NO_ENTITIES))
+
+    def test_agent_runs_when_integration_mentioned_but_nothing_compiled(self):
+        compiled = compile_plan(["travel::cities"], NO_ENTITIES, REQUIRED)
+        self.assertTrue(needs_agent(compiled, {**NO_ENTITIES, "keywords": ["stocks"]}))
+
+    def test_tools_missing_from_registry_are_static(self):
+        compiled = compile_plan(["sports::mlb_teams"], {**NO_ENTITIES, "teams": {"mlb": ["mets"]}}, REQUIRED)
+        self.assertEqual(compiled["static"], ["sports::mlb_teams"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,5 +1,5 @@
 import unittest
-from prompts import describe_data, get_available_sources, build_planning_prompt
+from prompts import describe_data, get_available_sources, build_planning_prompt, build_merged_planning_prompt
 
 
 class TestDescribeData(unittest.TestCase):
@@ -155,6 +155,21 @@ class TestBuildPlanningPrompt(unittest.TestCase):
         self.assertIn("sources", result)
         self.assertIn("intent", result)
         self.assertIn("approach", result)
+        self.assertNotIn("sections", result)
+
+    def test_sections_requested(self):
+        """Planning prompt asks for sections only when requested"""
+        result = build_planning_prompt("Test query", with_sections=True)
+
+        self.assertIn('"sections"', result)
+        self.assertIn('"title"', result)
+
+    def test_merged_prompt_asks_for_tool_calls(self):
+        """Merged prompt keeps the plan format and asks for function calls alongside it"""
+        result = build_merged_planning_prompt("How are the Lakers doing?")
+
+        self.assertTrue(result.startswith(build_planning_prompt("How are the Lakers doing?")))
+        self.assertIn("call the available functions", result)
 
 
 class TestDescribeDataExamples(unittest.TestCase):
@@ -0,0 +1,118 @@
+import unittest
+from data import MOCK_DATA
+from query_router import QueryRouter, NAMESPACE_SOURCES, entity_namespaces, unrouted_words
+
+LEAGUES = {
+    "nba": {"sport": "basketball", "name": "NBA", "teams": {"lakers": "13", "kings": "23", "trail blazers": "22", "jazz": "26", "heat": "14", "nets": "17"}},
+    "nfl": {"sport": "football", "name": "NFL", "teams": {"giants": "19", "jets": "20"}},
+    "mlb": {"sport": "baseball", "name": "MLB", "teams": {"giants": "26", "yankees": "10"}},
+    "nhl": {"sport": "hockey", "name": "NHL", "teams": {"kings": "8", "jets": "28"}},
+}
+
+
+class TestQueryRouter(unittest.TestCase):
+    def setUp(self):
+        self.router = QueryRouter(LEAGUES, unrouted_words(MOCK_DATA, set(NAMESPACE_SOURCES)))
+
+    def test_team_query(self):
+        plan = self.router.route("How are the Lakers doing?")
+        self.assertEqual(plan["sources"], ["sports::nba_teams"])
+        self.assertEqual(plan["route"], "fastpath")
+        self.assertIn("Lakers", plan["intent"])
+        self.assertEqual(plan["entities"]["teams"], {"nba": ["lakers"]})
+
+    def test_multi_word_team(self):
+        entities = self.router.extract_entities("trail blazers vs yankees")
+        self.assertEqual(entities["teams"], {"nba": ["trail blazers"], "mlb": ["yankees"]})
+
+    def test_ambiguous_team_uses_league_hint(self):
+        self.assertEqual(
+            self.router.extract_entities("giants score")["teams"], {"nfl": ["giants"], "mlb": ["giants"]}
+        )
+        self.assertEqual(self.router.extract_entities("giants baseball")["teams"], {"mlb": ["giants"]})
+        self.assertEqual(self.router.extract_entities("NHL kings")["teams"], {"nhl": ["kings"]})
+
+    def test_everyday_team_words_need_sports_context(self):
+        self.assertIsNone(self.router.route("show my top jazz artists"))
+        self.assertIsNone(self.router.route("my running in the heat"))
+        self.assertEqual(self.router.extract_entities("heat map of workouts")["teams"], {})
+        self.assertEqual(self.router.likely_sources("show my top jazz artists")[0], ["music::top_songs", "music::top_artists", "music::top_genres", "music::total_minutes"])
+
+        self.assertEqual(self.router.route("utah jazz")["sources"], ["sports::nba_teams"])
+        self.assertEqual(self.router.route("did the heat win their last game")["sources"], ["sports::nba_teams"])
+        self.assertEqual(self.router.route("nets and kings")["entities"]["teams"], {"nba": ["nets", "kings"], "nhl": ["kings"]})
+
+    def test_intent_names_each_team_once(self):
+        plan = self.router.route("how did the giants do this season")
+        self.assertIn("the Giants are doing", plan["intent"])
+        self.assertIn("the Nets, Kings are doing", self.router.route("nets and kings")["intent"])
+
+    def test_tickers(self):
+        entities = self.router.extract_entities("compare apple, $amd and NVDA to MY portfolio")
+        self.assertEqual(entities["tickers"], ["AAPL", "AMD", "NVDA"])
+        plan = self.router.route("how is TSLA doing")
+        self.assertEqual(plan["sources"], ["stocks::stock_data"])
+
+    def test_unknown_uppercase_words_are_not_tickers(self):
+        self.assertEqual(self.router.extract_entities("I LOVE MY WORKOUTS")["tickers"], [])
+
+    def test_spotify_is_music_unless_markets_mentioned(self):
+        self.assertEqual(self.router.extract_entities("my spotify top songs")["tickers"], [])
+        entities = self.router.extract_entities("spotify stock price")
+        self.assertEqual(entities["tickers"], ["SPOT"])
+        self.assertEqual(entities["keywords"], ["stocks"])
+
+    def test_market_without_tickers(self):
+        plan = self.router.route("what's the stock market doing today")
+        self.assertIn("stocks::market_indices", plan["sources"])
+
+    def test_integration_keywords(self):
+        plan = self.router.route("show my strava workouts and top songs")
+        self.assertEqual(plan["entities"]["keywords"], ["fitness", "music"])
+        self.assertIn("fitness::workouts", plan["sources"])
+        self.assertIn("music::top_songs", plan["sources"])
+
+    def test_player_tag(self):
+        entities = self.router.extract_entities("stats for #2PP0Q8Y")
+        self.assertEqual(entities["player_tags"], ["#2PP0Q8Y"])
+        self.assertIn("gaming", entities["keywords"])
+
+    def test_open_ended_falls_through(self):
+        self.assertIsNone(self.router.route("what should I do this weekend?"))
+        self.assertIsNone(self.router.route("summarize my year"))
+
+    def test_mock_only_domains_fall_through(self):
+        # the router can't plan travel or finance, so mixed queries go to the LLM
+        self.assertIsNone(self.router.route("my top songs from my trips"))
+        self.assertIsNone(self.router.route("lakers and my spending"))
+
+    def test_likely_sources_ignore_unrouted_words(self):
+        # too mixed to plan, but the Lakers fetch can still start early
+        sources, entities = self.router.likely_sources("lakers and my spending")
+        self.assertEqual(sources, ["sports::nba_teams"])
+        self.assertEqual(entities["teams"], {"nba": ["lakers"]})
+
+    def test_describe(self):
+        described = self.router.describe("how are the lakers doing lately, my favorite")
+        self.assertIn("Lakers", described["intent"])
+        self.assertEqual(described["entities"]["teams"], {"nba": ["lakers"]})
+        self.assertIsNone(self.router.describe("how's my favorite team"))
+
+    def test_fallback_plan(self):
+        # entities when there are any, then namespaces the query names, then an overview
+        self.assertEqual(self.router.fallback_plan("lakers and my spending", MOCK_DATA)["sources"], ["sports::nba_teams"])
+        plan = self.router.fallback_plan("how is my reading going", MOCK_DATA)
+        self.assertEqual(plan["sources"], ["reading::books_read", "reading::total_pages", "reading::avg_rating", "reading::reading_streak"])
+        self.assertEqual(plan["route"], "fallback")
+        self.assertEqual(self.router.fallback_plan("summarize my year", MOCK_DATA)["sources"][0], "music::total_minutes")
+
+    def test_entity_namespaces(self):
+        entities = self.router.extract_entities("lakers, TSLA and my strava runs")
+        self.assertEqual(entity_namespaces(entities), {"sports", "stocks", "fitness"})
+
+    def test_word_boundaries(self):
+        self.assertIsNone(self.router.route("the jetsetter lifestyle"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,178 @@
+import asyncio
+import random
+import unittest
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+from deadline import Deadline, current_deadline
+from metrics import metrics
+from resilience import RateLimitExceeded, Resilience, RetryBudget, TokenBucket, parse_retry_after
+from tests.helpers import FakeClock
+
+
+class FakeResponse:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def scripted(outcomes):
+    """send() that returns or raises each outcome in turn and counts calls."""
+    calls = []
+
+    def send():
+        outcome = outcomes[len(calls)]
+        calls.append(outcome)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    return send, calls
+
+
+class TestRetryAfter(unittest.TestCase):
+    def test_seconds_and_dates(self):
+        self.assertEqual(parse_retry_after("3"), 3.0)
+        now = datetime(2025, 1, 1, tzinfo=timezone.utc)
+        self.assertEqual(parse_retry_after(format_datetime(now + timedelta(seconds=7), usegmt=True), now), 7.0)
+        self.assertIsNone(parse_retry_after("soon"))
+        self.assertIsNone(parse_retry_after(None))
+
+
+class TestTokenBucket(unittest.TestCase):
+    def test_burst_then_rate(self):
+        clock = FakeClock()
+        bucket = TokenBucket(rate=2, burst=2, clock=clock)
+        self.assertEqual(bucket.reserve(), 0.0)
+        self.assertEqual(bucket.reserve(), 0.0)
+        self.assertEqual(bucket.reserve(), 0.5)
+        # the waiter behind it queues after, not alongside
+        self.assertEqual(bucket.reserve(), 1.0)
+        clock.now = 10
+        self.assertEqual(bucket.reserve(), 0.0)
+
+    def test_max_wait_leaves_the_token(self):
+        clock = FakeClock()
+        bucket = TokenBucket(rate=0.1, burst=1, clock=clock)
+        self.assertEqual(bucket.reserve(5), 0.0)
+        self.assertIsNone(bucket.reserve(5))
+        self.assertIsNone(bucket.reserve(5))
+        # the refused callers didn't go into debt
+        self.assertEqual(bucket.reserve(), 10.0)
+
+
+class TestRetryBudget(unittest.TestCase):
+    def test_ratio_with_floor(self):
+        clock = FakeClock()
+        budget = RetryBudget(ratio=0.1, min_retries=2, window=10, clock=clock)
+        for _ in range(30):
+            budget.record_request()
+        self.assertEqual([budget.try_retry() for _ in range(4)], [True, True, True, False])
+        clock.now = 11
+        self.assertTrue(budget.try_retry())
+
+
+class TestResilience(unittest.TestCase):
+    def setUp(self):
+        metrics.reset()
+        self.clock = FakeClock()
+        self.resilience = Resilience(max_attempts=3, clock=self.clock, rng=random.Random(0))
+
+    def send(self, method, outcomes, url="https://site.api.espn.com/x"):
+        send, calls = scripted(outcomes)
+        result = self.resilience.send(method, url, send, (ConnectionError,), sleep=self.clock.sleep)
+        return result, calls
+
+    def test_retries_transient_errors(self):
+        result, calls = self.send("GET", [FakeResponse(503), ConnectionError("reset"), FakeResponse(200)])
+        self.assertEqual(result.status_code, 200)
+        self.assertEqual(len(calls), 3)
+        self.assertTrue(calls[0].closed)
+        self.assertEqual(metrics.counters["http.retries"], 2)
+        self.assertLessEqual(self.clock.now, 0.25 + 0.5)
+
+    def test_gives_up_after_max_attempts(self):
+        result, calls = self.send("GET", [FakeResponse(502)] * 3)
+        self.assertEqual(result.status_code, 502)
+        self.assertEqual(len(calls), 3)
+        with self.assertRaises(ConnectionError):
+            self.send("GET", [ConnectionError("down")] * 3)
+
+    def test_non_idempotent_and_client_errors_not_retried(self):
+        _, calls = self.send("POST", [FakeResponse(503), FakeResponse(200)])
+        self.assertEqual(len(calls), 1)
+        _, calls = self.send("GET", [FakeResponse(404), FakeResponse(200)])
+        self.assertEqual(len(calls), 1)
+
+    def test_honors_retry_after(self):
+        result, _ = self.send("GET", [FakeResponse(429, {"Retry-After": "2"}), FakeResponse(200)])
+        self.assertEqual(result.status_code, 200)
+        self.assertEqual(self.clock.now, 2.0)
+
+        result, calls = self.send("GET", [FakeResponse(429, {"Retry-After": "60"}), FakeResponse(200)])
+        self.assertEqual(result.status_code, 429)
+        self.assertEqual(len(calls), 1)
+
+    def test_budget_stops_retry_storms(self):
+        self.resilience.budget = RetryBudget(ratio=0.1, min_retries=1, clock=self.clock)
+        self.send("GET", [FakeResponse(503), FakeResponse(200)])
+        _, calls = self.send("GET", [FakeResponse(503), FakeResponse(200)])
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(metrics.counters["http.retry_budget_exhausted"], 1)
+
+    def test_no_retry_past_deadline(self):
+        token = current_deadline.set(Deadline(1.0, self.clock))
+        try:
+            _, calls = self.send("GET", [FakeResponse(429, {"Retry-After": "2"}), FakeResponse(200)])
+        finally:
+            current_deadline.reset(token)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(metrics.counters["http.retry_past_deadline"], 1)
+
+    def test_rate_limit_per_host(self):
+        resilience = Resilience(rate_limits={"api.clashroyale.com": {"rate": 1, "burst": 1}}, clock=self.clock)
+        send, _ = scripted([FakeResponse(200)] * 3)
+        for _ in range(2):
+            resilience.send("GET", "https://api.clashroyale.com/v1/players", send, (), sleep=self.clock.sleep)
+        self.assertEqual(self.clock.now, 1.0)
+        resilience.send("GET", "https://site.api.espn.com/x", send, (), sleep=self.clock.sleep)
+        self.assertEqual(self.clock.now, 1.0)
+        self.assertEqual(metrics.counters["http.rate_limited"], 1)
+
+    def test_rate_limit_wait_bounded_by_deadline_and_max_wait(self):
+        resilience = Resilience(
+            rate_limits={"www.strava.com": {"rate": 0.1, "burst": 1}}, max_rate_limit_wait=30, clock=self.clock
+        )
+        url = "https://www.strava.com/api/v3/athlete"
+        send, calls = scripted([FakeResponse(200)] * 2)
+        resilience.send("GET", url, send, (), sleep=self.clock.sleep)
+        token = current_deadline.set(Deadline(5.0, self.clock))
+        try:
+            with self.assertRaises(RateLimitExceeded):
+                resilience.send("GET", url, send, (), sleep=self.clock.sleep)
+        finally:
+            current_deadline.reset(token)
+        self.assertEqual(self.clock.now, 0.0)
+        self.assertEqual(len(calls), 1)
+        resilience.max_rate_limit_wait = 2
+        with self.assertRaises(RateLimitExceeded):
+            resilience.send("GET", url, send, (), sleep=self.clock.sleep)
+        self.assertEqual(metrics.counters["http.rate_limit_rejected"], 2)
+
+    def test_async_send(self):
+        outcomes = [FakeResponse(500), FakeResponse(200)]
+
+        async def send():
+            return outcomes.pop(0)
+
+        resilience = Resilience(base_delay=0.001, rng=random.Random(0))
+        result = asyncio.run(resilience.asend("GET", "https://x.test/", send, ()))
+        self.assertEqual(result.status_code, 200)
+
+
+if __name__ == "__main__":
+    unittest.main()
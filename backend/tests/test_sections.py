@@ -0,0 +1,79 @@
+import asyncio
+import time
+import unittest
+from sections import split_sections, stitch_in_order
+
+
+DATA = {
+    "music": {"top_songs": [{"title": "a"}]},
+    "fitness": {"workouts": 3},
+    "gaming": {"total_hours": 10},
+}
+
+
+async def delayed(parts, delay):
+    for part in parts:
+        await asyncio.sleep(delay)
+        yield part
+
+
+async def failing():
+    yield "partial"
+    raise RuntimeError("section died")
+
+
+class TestSplitSections(unittest.TestCase):
+    def test_one_section_per_namespace_by_default(self):
+        sections = split_sections({"sources": []}, DATA)
+        self.assertEqual([s["namespaces"] for s in sections], [["music"], ["fitness"], ["gaming"]])
+        self.assertEqual(sections[0]["data"], {"music": DATA["music"]})
+
+    def test_planned_sections_keep_order_and_unclaimed_are_appended(self):
+        plan = {"sections": [
+            {"title": "Workouts", "sources": ["fitness::workouts"]},
+            {"title": "Listening", "sources": ["music::top_songs", "travel::cities"]},
+        ]}
+        sections = split_sections(plan, DATA)
+
+        self.assertEqual([s["title"] for s in sections], ["Workouts", "Listening", "Gaming"])
+        self.assertEqual(sections[1]["namespaces"], ["music"])
+
+    def test_caps_section_count(self):
+        sections = split_sections({}, DATA, max_sections=2)
+        self.assertEqual(len(sections), 2)
+        self.assertEqual(sections[1]["namespaces"], ["fitness", "gaming"])
+
+    def test_skips_clicked_item(self):
+        sections = split_sections({}, {"music": {}, "clicked_item": {"id": 1}})
+        self.assertEqual(len(sections), 1)
+
+
+class TestStitchInOrder(unittest.IsolatedAsyncioTestCase):
+    async def test_output_follows_list_order(self):
+        streams = [
+            delayed(["<a>", "</a>"], 0.03),
+            delayed(["<b>", "</b>"], 0.001),
+            delayed(["<c>", "</c>"], 0.01),
+        ]
+        out = "".join([t async for t in stitch_in_order(streams)])
+        self.assertEqual(out, "<a></a><b></b><c></c>")
+
+    async def test_sections_run_concurrently(self):
+        streams = [delayed(["x"] * 5, 0.02) for _ in range(4)]
+
+        start = time.monotonic()
+        out = [t async for t in stitch_in_order(streams)]
+        elapsed = time.monotonic() - start
+
+        self.assertEqual("".join(out), "x" * 20)
+        self.assertLess(elapsed, 0.3)
+
+    async def test_failed_section_is_skipped(self):
+        streams = [delayed(["<a/>"], 0), failing(), delayed(["<c/>"], 0)]
+        out = "".join([t async for t in stitch_in_order(streams)])
+        self.assertTrue(out.startswith("<a/>"))
+        self.assertTrue(out.endswith("<c/>"))
+
+
+if __name__ == "__main__":
+    unittest.main()
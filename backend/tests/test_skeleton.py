@@ -0,0 +1,55 @@
+import unittest
+from skeleton import build_skeleton, pick_component
+from data import MOCK_DATA
+
+
+class TestPickComponent(unittest.TestCase):
+    def test_primitive_has_no_component(self):
+        self.assertIsNone(pick_component("total_minutes", 87234))
+
+    def test_trend_array_is_chart(self):
+        component, config = pick_component("listening_history", MOCK_DATA["music"]["listening_history"])
+        self.assertEqual(component, "Chart")
+        self.assertIn("x", config["template"])
+        self.assertIn("y", config["template"])
+
+    def test_object_array_is_list(self):
+        component, config = pick_component("top_artists", MOCK_DATA["music"]["top_artists"])
+        self.assertEqual(component, "List")
+        self.assertEqual(config["template"]["primary"], "name")
+
+    def test_wide_rows_are_table(self):
+        rows = [{"date": "2024-01-15", "merchant": "Uber", "category": "Travel", "amount": 23.5, "status": "ok"}]
+        component, config = pick_component("recent_transactions", rows)
+        self.assertEqual(component, "Table")
+        self.assertEqual(config["columns"][0]["key"], "date")
+
+    def test_string_array_is_list(self):
+        self.assertEqual(pick_component("top_genres", ["Pop", "Indie"]), ("List", {}))
+
+
+class TestBuildSkeleton(unittest.TestCase):
+    def test_slots_reference_plan_sources(self):
+        plan = {"sources": ["music::top_songs", "music::total_minutes"], "intent": "x"}
+        html = build_skeleton(plan)
+
+        self.assertIn('data-source="music::top_songs"', html)
+        self.assertIn('<data-value data-source="music::total_minutes">', html)
+        self.assertIn('data-skeleton="true"', html)
+
+    def test_deterministic(self):
+        plan = {"sources": ["fitness::by_type", "fitness::workouts"]}
+        self.assertEqual(build_skeleton(plan), build_skeleton(plan))
+
+    def test_unknown_sources_get_placeholder(self):
+        html = build_skeleton({"sources": ["sports::nba_teams", "garbage"]})
+        self.assertNotIn("component-slot", html)
+        self.assertIn("animate-pulse", html)
+
+    def test_empty_plan(self):
+        html = build_skeleton({})
+        self.assertTrue(html.startswith("<div"))
+
+
+if __name__ == "__main__":
+    unittest.main()
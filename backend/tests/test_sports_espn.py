@@ -1,11 +1,14 @@
 import unittest
-from unittest.mock import Mock, patch
+from unittest.mock import Mock
 from integrations.sports import SportsDataFetcher
 
 
 class TestSportsDataFetcher(unittest.TestCase):
     def setUp(self):
-        self.fetcher = SportsDataFetcher(api_key="test_key")
+        # stands in for the shared HTTPClient, so nothing goes to ESPN
+        self.http = Mock()
+        self.http.get.return_value.json.return_value = {}
+        self.fetcher = SportsDataFetcher(api_key="test_key", http=self.http)
 
     def test_get_team_abbr_nba(self):
         """Test NBA team name to abbreviation mapping"""
@@ -48,8 +51,7 @@ class TestSportsDataFetcher(unittest.TestCase):
         self.assertEqual(self.fetcher._get_team_abbr("boston bruins", "nhl"), "bos")
         self.assertEqual(self.fetcher._get_team_abbr("new york yankees", "mlb"), "nyy")
 
-    @patch('requests.get')
-    def test_fetch_nba_summary_success(self, mock_get):
+    def test_fetch_nba_summary_success(self):
         """Test NBA summary fetching with mock data"""
         mock_response = Mock()
         mock_response.json.return_value = {
@@ -69,17 +71,16 @@ class TestSportsDataFetcher(unittest.TestCase):
             }
         }
         mock_response.raise_for_status = Mock()
-        mock_get.return_value = mock_response
+        self.http.get.return_value = mock_response
 
         result = self.fetcher.fetch_nba_summary(["lakers"])
         
         self.assertIsNotNone(result)
-        self.assertIn("teams", result)
-        self.assertEqual(len(result["teams"]), 1)
-        self.assertEqual(result["teams"][0]["name"], "Los Angeles Lakers")
+        self.assertIn("nba_teams", result)
+        self.assertEqual(len(result["nba_teams"]), 1)
+        self.assertEqual(result["nba_teams"][0]["name"], "Los Angeles Lakers")
 
-    @patch('requests.get')
-    def test_fetch_nfl_summary_success(self, mock_get):
+    def test_fetch_nfl_summary_success(self):
         """Test NFL summary fetching with mock data"""
         mock_response = Mock()
         mock_response.json.return_value = {
@@ -99,17 +100,16 @@ class TestSportsDataFetcher(unittest.TestCase):
             }
         }
         mock_response.raise_for_status = Mock()
-        mock_get.return_value = mock_response
+        self.http.get.return_value = mock_response
 
         result = self.fetcher.fetch_nfl_summary(["chiefs"])
         
         self.assertIsNotNone(result)
-        self.assertIn("teams", result)
-        self.assertEqual(len(result["teams"]), 1)
-        self.assertEqual(result["teams"][0]["name"], "Kansas City Chiefs")
+        self.assertIn("nfl_teams", result)
+        self.assertEqual(len(result["nfl_teams"]), 1)
+        self.assertEqual(result["nfl_teams"][0]["name"], "Kansas City Chiefs")
 
-    @patch('requests.get')
-    def test_fetch_mlb_summary_success(self, mock_get):
+    def test_fetch_mlb_summary_success(self):
         """Test MLB summary fetching with mock data"""
         mock_response = Mock()
         mock_response.json.return_value = {
@@ -129,17 +129,16 @@ class TestSportsDataFetcher(unittest.TestCase):
             }
         }
         mock_response.raise_for_status = Mock()
-        mock_get.return_value = mock_response
+        self.http.get.return_value = mock_response
 
         result = self.fetcher.fetch_mlb_summary(["yankees"])
         
         self.assertIsNotNone(result)
-        self.assertIn("teams", result)
-        self.assertEqual(len(result["teams"]), 1)
-        self.assertEqual(result["teams"][0]["name"], "New York Yankees")
+        self.assertIn("mlb_teams", result)
+        self.assertEqual(len(result["mlb_teams"]), 1)
+        self.assertEqual(result["mlb_teams"][0]["name"], "New York Yankees")
 
-    @patch('requests.get')
-    def test_fetch_nhl_summary_success(self, mock_get):
+    def test_fetch_nhl_summary_success(self):
         """Test NHL summary fetching with mock data"""
         mock_response = Mock()
         mock_response.json.return_value = {
@@ -159,14 +158,14 @@ class TestSportsDataFetcher(unittest.TestCase):
             }
         }
         mock_response.raise_for_status = Mock()
-        mock_get.return_value = mock_response
+        self.http.get.return_value = mock_response
 
         result = self.fetcher.fetch_nhl_summary(["bruins"])
         
         self.assertIsNotNone(result)
-        self.assertIn("teams", result)
-        self.assertEqual(len(result["teams"]), 1)
-        self.assertEqual(result["teams"][0]["name"], "Boston Bruins")
+        self.assertIn("nhl_teams", result)
+        self.assertEqual(len(result["nhl_teams"]), 1)
+        self.assertEqual(result["nhl_teams"][0]["name"], "Boston Bruins")
 
     def test_fetch_nfl_summary_returns_none_for_invalid_team(self):
         """NFL summary returns None for invalid team names"""
@@ -188,16 +187,16 @@ class TestSportsDataFetcher(unittest.TestCase):
         result = self.fetcher.fetch_nfl_summary(["chiefs", "eagles", "cowboys"])
         
         if result:
-            self.assertIn("teams", result)
-            self.assertLessEqual(len(result["teams"]), 3)
+            self.assertIn("nfl_teams", result)
+            self.assertLessEqual(len(result["nfl_teams"]), 3)
 
     def test_multiple_teams_mlb(self):
         """Test fetching multiple MLB teams"""
         result = self.fetcher.fetch_mlb_summary(["yankees", "dodgers", "red sox"])
         
         if result:
-            self.assertIn("teams", result)
-            self.assertLessEqual(len(result["teams"]), 3)
+            self.assertIn("mlb_teams", result)
+            self.assertLessEqual(len(result["mlb_teams"]), 3)
 
 
 if __name__ == "__main__":
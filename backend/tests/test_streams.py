@@ -0,0 +1,134 @@
+import asyncio
+import unittest
+from streams import StreamSession, StreamRegistry
+
+
+def frame(n: int) -> str:
+    return f"event: ui\ndata: {{\"content\": \"{n}\"}}\n\n"
+
+
+async def collect(agen) -> list[str]:
+    return [f async for f in agen]
+
+
+class TestStreamSession(unittest.IsolatedAsyncioTestCase):
+    async def test_frames_carry_ids(self):
+        session = StreamSession("abc")
+        session.publish(frame(0))
+        session.publish(frame(1))
+        session.close()
+
+        frames = await collect(session.subscribe())
+        self.assertEqual(len(frames), 2)
+        self.assertTrue(frames[0].startswith("id: abc:0\n"))
+        self.assertTrue(frames[1].startswith("id: abc:1\n"))
+
+    async def test_resume_after_seq(self):
+        session = StreamSession("abc")
+        for i in range(5):
+            session.publish(frame(i))
+        session.close()
+
+        frames = await collect(session.subscribe(after_seq=2))
+        self.assertEqual([f.split("\n")[0] for f in frames], ["id: abc:3", "id: abc:4"])
+
+    async def test_follows_live_frames(self):
+        session = StreamSession("abc")
+        task = asyncio.create_task(collect(session.subscribe()))
+
+        for i in range(3):
+            await asyncio.sleep(0)
+            session.publish(frame(i))
+        session.close()
+
+        frames = await asyncio.wait_for(task, timeout=1)
+        self.assertEqual(len(frames), 3)
+
+    async def test_gap_beyond_buffer_reports_error(self):
+        session = StreamSession("abc", max_events=3)
+        for i in range(10):
+            session.publish(frame(i))
+        session.close()
+
+        frames = await collect(session.subscribe(after_seq=1))
+        self.assertEqual(len(frames), 1)
+        self.assertIn("replay_gap", frames[0])
+
+    async def test_keepalive_while_idle(self):
+        session = StreamSession("abc")
+        subscriber = session.subscribe(keepalive_interval=0.01)
+
+        self.assertEqual(await subscriber.__anext__(), ": keepalive\n\n")
+        session.publish(frame(0))
+        self.assertTrue((await subscriber.__anext__()).startswith("id: abc:0"))
+        await subscriber.aclose()
+
+
+class TestStreamRegistry(unittest.IsolatedAsyncioTestCase):
+    async def test_resume_parses_last_event_id(self):
+        registry = StreamRegistry()
+
+        async def producer():
+            yield frame(0)
+
+        session = registry.start(producer())
+        resumed = registry.resume(f"{session.stream_id}:7")
+        self.assertIs(resumed[0], session)
+        self.assertEqual(resumed[1], 7)
+
+        self.assertIsNone(registry.resume("unknown:1"))
+        self.assertIsNone(registry.resume("garbage"))
+        self.assertIsNone(registry.resume(None))
+        await session.task
+
+    async def test_generation_continues_after_client_drops(self):
+        registry = StreamRegistry()
+        release = asyncio.Event()
+
+        async def producer():
+            yield frame(0)
+            await release.wait()
+            yield frame(1)
+            yield frame(2)
+
+        session = registry.start(producer())
+        subscriber = session.subscribe()
+        first = await subscriber.__anext__()
+        self.assertTrue(first.startswith(f"id: {session.stream_id}:0"))
+        await subscriber.aclose()
+
+        release.set()
+        await session.task
+
+        frames = await collect(session.subscribe(after_seq=0))
+        self.assertEqual(len(frames), 2)
+        self.assertTrue(session.done)
+
+    async def test_comment_frames_are_not_buffered(self):
+        registry = StreamRegistry()
+
+        async def producer():
+            yield ": keepalive\n\n"
+            yield frame(0)
+
+        session = registry.start(producer())
+        await session.task
+        self.assertEqual(session.next_seq, 1)
+
+    async def test_producer_error_becomes_error_frame(self):
+        registry = StreamRegistry()
+
+        async def producer():
+            yield frame(0)
+            raise RuntimeError("boom")
+
+        session = registry.start(producer())
+        await session.task
+
+        frames = await collect(session.subscribe())
+        self.assertIn("event: error", frames[-1])
+        self.assertIn("boom", frames[-1])
+
+
+if __name__ == "__main__":
+    unittest.main()
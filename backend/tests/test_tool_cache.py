@@ -0,0 +1,190 @@
+import asyncio
+import unittest
+from metrics import metrics
+from tool_cache import ToolCache
+from circuit_breaker import BreakerRegistry, record_upstream_failure, upstream_failures
+from deadline import Deadline
+from tool_executor import ToolLatency, prefetch_tools, run_tools
+from tool_validation import ArgumentValidator
+from tests.helpers import FakeClock
+
+
+def counting(result, delay=0.0):
+    calls = []
+
+    async def run():
+        calls.append(1)
+        await asyncio.sleep(delay)
+        return result
+    return run, calls
+
+
+class TestToolCache(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        metrics.reset()
+        self.clock = FakeClock()
+        self.cache = ToolCache({"sports_": 60, "sports_fetch_nba": 5}, clock=self.clock)
+
+    def test_longest_prefix_ttl(self):
+        self.assertEqual(self.cache.ttl_for("sports_fetch_nba_summary"), 5)
+        self.assertEqual(self.cache.ttl_for("sports_fetch_nfl_summary"), 60)
+        self.assertIsNone(self.cache.ttl_for("spotify_fetch_user_data"))
+
+    def test_key_ignores_arg_order(self):
+        self.assertEqual(ToolCache.key("f", {"a": 1, "b": 2}), ToolCache.key("f", {"b": 2, "a": 1}))
+
+    async def test_hit_until_expiry(self):
+        run, calls = counting({"ok": 1})
+        args = {"team_names": ["jets"]}
+        await self.cache.get_or_run("sports_fetch_nfl_summary", args, run)
+        self.assertEqual(await self.cache.get_or_run("sports_fetch_nfl_summary", args, run), {"ok": 1})
+        self.assertEqual(len(calls), 1)
+
+        self.clock.now = 61
+        await self.cache.get_or_run("sports_fetch_nfl_summary", args, run)
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(metrics.counters["tool_cache.hits"], 1)
+
+    async def test_stale_outlives_ttl(self):
+        run, _ = counting({"ok": 1})
+        await self.cache.get_or_run("sports_fetch_nfl_summary", {}, run)
+        self.clock.now = 1000
+        self.assertEqual(self.cache.stale("sports_fetch_nfl_summary", {}), {"ok": 1})
+        self.assertIsNone(self.cache.stale("sports_fetch_nfl_summary", {"team_names": ["jets"]}))
+
+    async def test_uncacheable_always_runs(self):
+        run, calls = counting({"ok": 1})
+        await self.cache.get_or_run("spotify_fetch_user_data", {}, run)
+        await self.cache.get_or_run("spotify_fetch_user_data", {}, run)
+        self.assertEqual(len(calls), 2)
+
+    async def test_concurrent_calls_share_one_fetch(self):
+        run, calls = counting({"ok": 1}, delay=0.02)
+        results = await asyncio.gather(
+            *(self.cache.get_or_run("sports_x", {}, run) for _ in range(3))
+        )
+        self.assertEqual(results, [{"ok": 1}] * 3)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(metrics.counters["tool_cache.joined"], 2)
+
+    async def test_upstream_failures_reach_every_caller(self):
+        async def failing():
+            await asyncio.sleep(0.02)
+            record_upstream_failure("site.api.espn.com")
+            return None
+
+        async def call():
+            failures = []
+            upstream_failures.set(failures)
+            await self.cache.get_or_run("sports_x", {}, failing)
+            return failures
+
+        seen = await asyncio.gather(call(), call())
+        self.assertEqual(seen, [["site.api.espn.com"], ["site.api.espn.com"]])
+        self.assertEqual(metrics.counters["tool_cache.joined"], 1)
+
+    async def test_failures_are_not_cached(self):
+        none_run, none_calls = counting(None)
+        await self.cache.get_or_run("sports_x", {}, none_run)
+        await self.cache.get_or_run("sports_x", {}, none_run)
+        self.assertEqual(len(none_calls), 2)
+
+        async def boom():
+            raise RuntimeError("down")
+
+        with self.assertRaises(RuntimeError):
+            await self.cache.get_or_run("sports_y", {}, boom)
+        run, calls = counting({"ok": 1})
+        self.assertEqual(await self.cache.get_or_run("sports_y", {}, run), {"ok": 1})
+
+    async def test_evicts_oldest(self):
+        cache = ToolCache({"sports_": 60}, max_entries=2, clock=self.clock)
+        for name in ("sports_a", "sports_b", "sports_c"):
+            await cache.get_or_run(name, {}, counting({"n": name})[0])
+        run, calls = counting({"n": "again"})
+        await cache.get_or_run("sports_a", {}, run)
+        self.assertEqual(len(calls), 1)
+
+    async def test_prefetch_used_and_wasted(self):
+        run, calls = counting({"ok": 1}, delay=0.01)
+        used = self.cache.prefetch("sports_a", {}, run)
+        wasted = self.cache.prefetch("sports_b", {}, counting({"ok": 2})[0])
+        self.assertIsNone(self.cache.prefetch("spotify_x", {}, run))
+        self.assertIsNone(self.cache.prefetch("sports_a", {}, run))
+
+        # joins the in-flight prefetch
+        self.assertEqual(await self.cache.get_or_run("sports_a", {}, run), {"ok": 1})
+        self.assertEqual(len(calls), 1)
+
+        self.cache.settle([used, wasted])
+        self.assertEqual(metrics.counters["prefetch.issued"], 2)
+        self.assertEqual(metrics.counters["prefetch.used"], 1)
+        self.assertEqual(metrics.counters["prefetch.wasted"], 1)
+        self.assertEqual(metrics.gauges["prefetch.hit_rate"], 0.5)
+
+    async def test_failed_prefetch_is_quiet(self):
+        async def boom():
+            raise RuntimeError("down")
+
+        key = self.cache.prefetch("sports_a", {}, boom)
+        await asyncio.sleep(0.01)
+        self.cache.settle([key])
+        self.assertEqual(metrics.counters["prefetch.wasted"], 1)
+
+
+class TestExecutorWithCache(unittest.IsolatedAsyncioTestCase):
+    async def test_run_tools_reads_prefetched_results(self):
+        metrics.reset()
+        cache = ToolCache({"sports_": 60})
+        calls = []
+
+        def nba(team_names):
+            calls.append(team_names)
+            return {"nba_teams": team_names}
+
+        functions = {"sports_fetch_nba_summary": nba}
+        call = {"function": "sports_fetch_nba_summary", "args": {"team_names": ["lakers"]}}
+        keys = prefetch_tools([call], functions, cache)
+
+        outcomes = [o async for o in run_tools([call], functions, cache=cache)]
+        self.assertEqual(outcomes[0]["result"], {"nba_teams": ["lakers"]})
+        self.assertEqual(len(calls), 1)
+        cache.settle(keys)
+        self.assertEqual(metrics.counters["prefetch.wasted"], 0)
+
+    async def test_prefetch_takes_the_guarded_path(self):
+        metrics.reset()
+        cache = ToolCache({"sports_": 60})
+        breakers = BreakerRegistry(failure_threshold=1)
+        calls = []
+
+        def nba(team_names):
+            calls.append(team_names)
+            return {"nba_teams": team_names}
+
+        functions = {"sports_fetch_nba_summary": nba, "sports_fetch_nfl_summary": nba}
+        schema = {"properties": {"team_names": {"type": "array", "items": {"type": "string"}}}, "required": ["team_names"]}
+        validators = {name: ArgumentValidator(schema) for name in functions}
+        breakers.get("tool:sports").record_failure()
+        self.assertEqual(prefetch_tools([{"function": "sports_fetch_nba_summary", "args": {"team_names": "lakers"}}],
+                                        functions, cache, validators=validators, breakers=breakers), [])
+
+        breakers.get("tool:sports").record_success()
+        latency = ToolLatency(min_samples=1)
+        uncorrected = {"function": "sports_fetch_nba_summary", "args": {"team_names": "lakers"}}
+        keys = prefetch_tools([uncorrected, {"function": "sports_fetch_nfl_summary", "args": {}}],
+                              functions, cache, validators=validators, breakers=breakers, latency=latency)
+        self.assertEqual(keys, [ToolCache.key("sports_fetch_nba_summary", {"team_names": ["lakers"]})])
+        self.assertEqual(metrics.counters["prefetch.invalid_args"], 1)
+
+        # the validated real call reads the prefetched result instead of fetching again
+        outcomes = [o async for o in run_tools([uncorrected], functions, cache=cache, validators=validators)]
+        self.assertEqual(outcomes[0]["result"], {"nba_teams": ["lakers"]})
+        self.assertEqual(len(calls), 1)
+        self.assertIsNotNone(latency.predicted("sports_fetch_nba_summary"))
+        self.assertEqual(prefetch_tools([{"function": "sports_fetch_nfl_summary", "args": {"team_names": ["jets"]}}],
+                                        functions, cache, deadline=Deadline(0)), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
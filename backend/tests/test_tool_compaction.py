@@ -0,0 +1,112 @@
+import inspect
+import unittest
+from tool_generator import (
+    compact_description,
+    compact_tools,
+    estimate_tokens,
+    generate_tools_from_fetchers,
+    limit_result,
+    tool_function,
+    tool_limits,
+)
+from tool_executor import select_tools
+
+TEAMS = "lakers, warriors, celtics, heat, bulls, nets, knicks, 76ers, bucks, red sox"
+TOOL = {
+    "type": "function",
+    "function": {
+        "name": "sports_fetch_nba_summary",
+        "description": f"Get NBA team stats. Valid teams: {TEAMS}",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "team_names": {"type": "array", "items": {"type": "string"}, "description": f"One of: {TEAMS}"},
+                "limit": {"type": "integer"},
+            },
+            "required": ["team_names"],
+        },
+    },
+}
+
+
+class TestSelectTools(unittest.TestCase):
+    TOOLS = [{"function": {"name": n}} for n in ("spotify_fetch_user_data", "sports_fetch_nba_summary", "strava_get_activities")]
+
+    def test_filters_by_namespace(self):
+        names = [t["function"]["name"] for t in select_tools(self.TOOLS, {"sports", "fitness"})]
+        self.assertEqual(names, ["sports_fetch_nba_summary", "strava_get_activities"])
+
+    def test_no_match_keeps_everything(self):
+        self.assertEqual(select_tools(self.TOOLS, {"travel"}), self.TOOLS)
+
+
+class TestCompaction(unittest.TestCase):
+    def test_long_enumeration_is_shortened(self):
+        self.assertEqual(
+            compact_description(f"Valid teams: {TEAMS}"),
+            "Valid teams: lakers, warriors, celtics, heat and 6 more",
+        )
+
+    def test_short_lists_and_examples_are_kept(self):
+        text = "List of NBA team names (e.g., ['lakers', 'warriors', 'celtics'])"
+        self.assertEqual(compact_description(text), text)
+        self.assertEqual(compact_description("Tag: #ABC, #DEF"), "Tag: #ABC, #DEF")
+
+    def test_compact_tools_copies_and_shrinks(self):
+        compacted = compact_tools([TOOL])[0]
+        self.assertIn("and 6 more", compacted["function"]["description"])
+        self.assertIn("and 6 more", compacted["function"]["parameters"]["properties"]["team_names"]["description"])
+        self.assertEqual(compacted["function"]["parameters"]["required"], ["team_names"])
+        # the original schema is untouched
+        self.assertIn("red sox", TOOL["function"]["description"])
+        self.assertLess(estimate_tokens([compacted]), estimate_tokens([TOOL]))
+
+
+class Fetcher:
+    @tool_function(description="Sync tool", params={"tag": {"type": "string", "description": "Tag"}})
+    def fetch_sync(self, tag: str):
+        return {"tag": tag}
+
+    @tool_function(description="Async tool", params={"tag": {"type": "string", "description": "Tag"}})
+    async def fetch_async(self, tag: str):
+        return {"tag": tag}
+
+    @tool_function(description="Limited tool", max_items=2, fields=["player", "chests.name", "score"], round_digits=1)
+    def fetch_limited(self):
+        return {
+            "player": {"name": "a", "trophies": 5000},
+            "chests": [{"name": "Gold", "icon": "x"}, {"name": "Magic", "icon": "y"}, {"name": "Giant", "icon": "z"}],
+            "score": 3.14159,
+            "raw": "dropped",
+        }
+
+
+class TestToolFunction(unittest.TestCase):
+    def test_async_methods_stay_coroutines(self):
+        tools, functions = generate_tools_from_fetchers({"demo": Fetcher()})
+        self.assertEqual([t["function"]["name"] for t in tools], ["demo_fetch_async", "demo_fetch_limited", "demo_fetch_sync"])
+        self.assertTrue(inspect.iscoroutinefunction(functions["demo_fetch_async"]))
+        self.assertFalse(inspect.iscoroutinefunction(functions["demo_fetch_sync"]))
+        self.assertEqual(tools[0]["function"]["parameters"]["required"], ["tag"])
+
+
+class TestResultLimits(unittest.TestCase):
+    def test_declared_limits_are_applied(self):
+        fetcher = Fetcher()
+        limited = limit_result(fetcher.fetch_limited(), tool_limits(fetcher.fetch_limited))
+        self.assertEqual(limited, {
+            "player": {"name": "a", "trophies": 5000},
+            "chests": [{"name": "Gold"}, {"name": "Magic"}],
+            "score": 3.1,
+        })
+        self.assertIsNone(tool_limits(fetcher.fetch_sync))
+        self.assertEqual(limit_result({"x": [1, 2, 3]}, None), {"x": [1, 2, 3]})
+
+    def test_whole_key_wins_over_its_paths(self):
+        tool = tool_function(description="", fields=["player.name", "player"])(lambda: None)
+        result = {"player": {"name": "a", "tag": "#P"}, "other": 1}
+        self.assertEqual(limit_result(result, tool_limits(tool)), {"player": {"name": "a", "tag": "#P"}})
+
+
+if __name__ == "__main__":
+    unittest.main()
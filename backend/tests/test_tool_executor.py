@@ -0,0 +1,309 @@
+import asyncio
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from circuit_breaker import BreakerRegistry, record_upstream_failure
+from deadline import Deadline, current_deadline
+from tool_cache import ToolCache
+from tool_generator import tool_function
+from tool_validation import ArgumentValidator
+from tool_executor import (
+    ToolLatency,
+    merge_result,
+    run_tools,
+    source_priority,
+    stale_fallback,
+    tool_namespace,
+)
+
+
+class TestMergeResult(unittest.TestCase):
+    def test_namespaces(self):
+        self.assertEqual(tool_namespace("strava_get_activities"), "fitness")
+        self.assertEqual(tool_namespace("weather_fetch"), "weather")
+
+    def test_dicts_merge_and_others_are_keyed(self):
+        data = {"fitness": {"stats": 1}}
+        merge_result(data, "strava_fetch_user_summary", {"athlete": "a"})
+        merge_result(data, "strava_get_activities", [1, 2])
+        self.assertEqual(data, {"fitness": {"stats": 1, "athlete": "a", "get_activities": [1, 2]}})
+
+
+class TestScheduling(unittest.TestCase):
+    def test_tool_latency_ewma(self):
+        latency = ToolLatency(alpha=0.5, default=2.0)
+        self.assertEqual(latency.expected("sports_fetch_nba_summary"), 2.0)
+        latency.record("sports_fetch_nba_summary", 1.0)
+        latency.record("sports_fetch_nba_summary", 3.0)
+        self.assertEqual(latency.expected("sports_fetch_nba_summary"), 2.0)
+        self.assertEqual(latency.snapshot(), {"sports_fetch_nba_summary": 2.0})
+        # deadline skipping waits for enough runs, scheduling doesn't
+        self.assertIsNone(latency.predicted("sports_fetch_nba_summary"))
+        for _ in range(3):
+            latency.record("sports_fetch_nba_summary", 2.0)
+        self.assertEqual(latency.predicted("sports_fetch_nba_summary"), 2.0)
+
+    def test_source_priority(self):
+        sources = ["sports::nba_teams", "stocks::stock_data"]
+        self.assertEqual(source_priority({"function": "x", "sources": ["sports::nba_teams"]}, sources), 0)
+        self.assertEqual(source_priority({"function": "stocks_fetch_stock_info"}, sources), 1)
+        self.assertEqual(source_priority({"function": "strava_get_activities"}, sources), 2)
+        self.assertEqual(source_priority({"function": "strava_get_activities"}, []), 0)
+
+
+class TestRunTools(unittest.IsolatedAsyncioTestCase):
+    async def collect(self, calls, functions, **kwargs):
+        return [o async for o in run_tools(calls, functions, **kwargs)]
+
+    async def test_runs_concurrently(self):
+        def slow(n):
+            time.sleep(0.1)
+            return {"n": n}
+
+        start = time.monotonic()
+        outcomes = await self.collect(
+            [{"function": "slow", "args": {"n": i}} for i in range(4)], {"slow": slow}
+        )
+        self.assertLess(time.monotonic() - start, 0.3)
+        self.assertEqual(sorted(o["result"]["n"] for o in outcomes), [0, 1, 2, 3])
+
+    async def test_concurrency_cap(self):
+        active, peak = 0, 0
+        lock = threading.Lock()
+
+        def tool():
+            nonlocal active, peak
+            with lock:
+                active += 1
+                peak = max(peak, active)
+            time.sleep(0.02)
+            with lock:
+                active -= 1
+            return {}
+
+        await self.collect([{"function": "t", "args": {}}] * 6, {"t": tool}, max_concurrency=2)
+        self.assertEqual(peak, 2)
+
+    async def test_streamed_calls_start_on_arrival(self):
+        started = []
+        release = asyncio.Event()
+
+        def tool(n):
+            started.append(n)
+            return {"n": n}
+
+        async def calls():
+            yield {"function": "t", "args": {"n": 0}}
+            await release.wait()
+            yield {"function": "t", "args": {"n": 1}}
+
+        events = run_tools(calls(), {"t": tool}, report_starts=True)
+        self.assertTrue((await events.__anext__())["started"])
+        self.assertEqual((await events.__anext__())["result"], {"n": 0})
+        self.assertEqual(started, [0])
+
+        release.set()
+        rest = [e async for e in events]
+        self.assertEqual([("started" in e, e["index"]) for e in rest], [(True, 1), (False, 1)])
+
+    async def test_stream_error_raised_after_started_calls_finish(self):
+        async def calls():
+            yield {"function": "t", "args": {}}
+            raise RuntimeError("agent failed")
+
+        seen = []
+        with self.assertRaises(RuntimeError):
+            async for event in run_tools(calls(), {"t": lambda: {"ok": 1}}):
+                seen.append(event)
+        self.assertEqual(seen[0]["result"], {"ok": 1})
+
+    async def test_errors(self):
+        def boom():
+            raise RuntimeError("down")
+
+        outcomes = await self.collect(
+            [{"function": "boom"}, {"function": "none", "args": {}}, {"function": "missing", "args": {}}],
+            {"boom": boom, "none": lambda: None},
+        )
+        errors = {o["function"]: o["error"] for o in outcomes}
+        self.assertEqual(errors["boom"], "down")
+        self.assertEqual(errors["none"], "No data returned")
+        self.assertIn("Unknown function", errors["missing"])
+        self.assertEqual(sorted(o["index"] for o in outcomes), [0, 1, 2])
+
+    async def test_open_breaker_falls_back(self):
+        breakers = BreakerRegistry(failure_threshold=2, reset_timeout=60)
+        cache = ToolCache({"sports_": 60})
+        mock = {"sports": {"nba_teams": ["sample"]}}
+        healthy = {"up": True}
+
+        def summary(team_names):
+            if healthy["up"]:
+                return {"teams": team_names}
+            # what the HTTP client reports when ESPN errors and the fetcher swallows it
+            record_upstream_failure("site.api.espn.com")
+            return None
+
+        functions = {"sports_fetch_nba_summary": summary}
+        kwargs = {"cache": cache, "breakers": breakers, "fallback": stale_fallback(cache, mock)}
+        lakers = {"function": "sports_fetch_nba_summary", "args": {"team_names": ["lakers"]}}
+        celtics = {"function": "sports_fetch_nba_summary", "args": {"team_names": ["celtics"]}}
+
+        await self.collect([lakers], functions, **kwargs)
+        cache.clock = lambda: time.monotonic() + 120  # everything expired
+        healthy["up"] = False
+        failures = await self.collect([lakers, celtics], functions, **kwargs)
+        self.assertTrue(all("error" in o for o in failures))
+        self.assertEqual(breakers.snapshot()["tool:sports"]["state"], "open")
+
+        cached, mocked = sorted(await self.collect([lakers, celtics], functions, **kwargs), key=lambda o: o["index"])
+        self.assertEqual((cached["result"], cached["stale"]), ({"teams": ["lakers"]}, "cache"))
+        self.assertEqual((mocked["result"], mocked["stale"]), (mock["sports"], "mock"))
+
+        outcome = (await self.collect([{"function": "sports_x", "args": {}}], {"sports_x": summary}, breakers=breakers))[0]
+        self.assertEqual(outcome["error"], "Temporarily unavailable")
+
+    async def test_bad_input_does_not_trip_the_breaker(self):
+        breakers = BreakerRegistry(failure_threshold=1, reset_timeout=60)
+        unknown = {"function": "clash_fetch_user_summary", "args": {"player_tag": "#NOPE"}}
+        outcomes = await self.collect([unknown] * 3, {"clash_fetch_user_summary": lambda player_tag: None}, breakers=breakers)
+        self.assertEqual([o["error"] for o in outcomes], ["No data returned"] * 3)
+        self.assertEqual(breakers.snapshot()["tool:clash"]["state"], "closed")
+
+    async def test_deadline_skips_and_abandons(self):
+        def slow():
+            time.sleep(0.3)
+            return {"slow": True}
+
+        def fast():
+            return {"budget": round(current_deadline.get().remaining())}
+
+        latency = ToolLatency(min_samples=1)
+        latency.record("predicted_slow", 30.0)
+        outcomes = await self.collect(
+            [{"function": "slow", "args": {}}, {"function": "fast", "args": {}}, {"function": "predicted_slow", "args": {}}],
+            {"slow": slow, "fast": fast, "predicted_slow": fast},
+            deadline=Deadline(0.1),
+            latency=latency,
+        )
+        by_name = {o["function"]: o for o in outcomes}
+        self.assertEqual(by_name["fast"]["result"], {"budget": 0})
+        self.assertIn("deadline", by_name["slow"]["error"])
+        self.assertTrue(by_name["predicted_slow"]["skipped"])
+
+    async def test_async_tools_run_on_the_loop(self):
+        async def fetch(n):
+            await asyncio.sleep(0.1)
+            return {"n": n, "thread": threading.current_thread().name, "budget": round(current_deadline.get().remaining())}
+
+        def legacy(n):
+            return {"n": n, "thread": threading.current_thread().name}
+
+        with ThreadPoolExecutor(2, thread_name_prefix="tool") as pool:
+            start = time.monotonic()
+            outcomes = await self.collect(
+                [{"function": "fetch", "args": {"n": i}} for i in range(4)] + [{"function": "legacy", "args": {"n": 4}}],
+                {"fetch": fetch, "legacy": legacy},
+                max_concurrency=5,
+                deadline=Deadline(5),
+                executor=pool,
+            )
+        self.assertLess(time.monotonic() - start, 0.3)
+        results = {o["result"]["n"]: o["result"] for o in outcomes}
+        self.assertEqual({results[i]["thread"] for i in range(4)}, {threading.current_thread().name})
+        self.assertTrue(results[4]["thread"].startswith("tool"))
+        self.assertEqual(results[0]["budget"], 5)
+
+    async def test_async_tool_cancelled_at_deadline(self):
+        cancelled = []
+
+        async def hang():
+            try:
+                await asyncio.sleep(5)
+            except asyncio.CancelledError:
+                cancelled.append(True)
+                raise
+
+        outcomes = await self.collect([{"function": "hang", "args": {}}], {"hang": hang}, deadline=Deadline(0.05))
+        self.assertIn("deadline", outcomes[0]["error"])
+        self.assertEqual(cancelled, [True])
+
+    async def test_invalid_arguments_never_run(self):
+        ran = []
+        validator = ArgumentValidator({"properties": {"limit": {"type": "integer"}}, "required": ["limit"]})
+        outcomes = await self.collect(
+            [{"function": "t", "args": {"limit": "3"}}, {"function": "t", "args": {"limit": "many"}}],
+            {"t": lambda limit: ran.append(limit) or {"limit": limit}},
+            validators={"t": validator},
+        )
+        by_index = {o["index"]: o for o in outcomes}
+        self.assertEqual(by_index[0]["result"], {"limit": 3})
+        self.assertEqual(by_index[0]["args"], {"limit": 3})
+        self.assertEqual(by_index[1]["error"], "Invalid arguments")
+        self.assertEqual(by_index[1]["invalid"][0]["param"], "limit")
+        self.assertEqual(ran, [3])
+
+    async def test_results_are_limited_before_they_are_yielded(self):
+        @tool_function(description="", max_items=2, round_digits=0)
+        def listing():
+            return {"items": [1.4, 2.6, 3.0]}
+
+        outcomes = await self.collect([{"function": "listing", "args": {}}], {"listing": listing})
+        self.assertEqual(outcomes[0]["result"], {"items": [1.0, 3.0]})
+
+    async def test_expired_deadline_runs_nothing(self):
+        ran = []
+        outcomes = await self.collect(
+            [{"function": "t", "args": {}}], {"t": lambda: ran.append(1)}, deadline=Deadline(0)
+        )
+        self.assertTrue(outcomes[0]["skipped"])
+        self.assertEqual(ran, [])
+
+    async def test_waiting_calls_go_by_priority_then_expected_latency(self):
+        latency = ToolLatency()
+        latency.record("slow", 5.0)
+        latency.record("fast", 0.1)
+        order = []
+
+        def tool(name):
+            order.append(name)
+            return {}
+
+        functions = {name: (lambda n=name: tool(n)) for name in ("slow", "fast", "critical")}
+        calls = [{"function": "slow", "args": {}}, {"function": "fast", "args": {}}, {"function": "critical", "args": {}}]
+        await self.collect(
+            calls, functions, max_concurrency=1, latency=latency,
+            priority=lambda call: 0 if call["function"] == "critical" else 1,
+        )
+        self.assertEqual(order, ["critical", "fast", "slow"])
+        self.assertLess(latency.expected("fast"), 0.1)
+
+    async def test_cached_calls_jump_the_queue(self):
+        latency = ToolLatency()
+        latency.record("sports_fetch_nba_summary", 5.0)
+        cache = ToolCache({"sports_": 60})
+
+        async def cached():
+            return {"team_names": ["lakers"]}
+
+        await cache.get_or_run("sports_fetch_nba_summary", {"team_names": ["lakers"]}, cached)
+
+        def summary(team_names):
+            time.sleep(0.05)
+            return {"team_names": team_names}
+
+        outcomes = await self.collect(
+            [
+                {"function": "sports_fetch_nba_summary", "args": {"team_names": ["celtics"]}},
+                {"function": "sports_fetch_nba_summary", "args": {"team_names": ["lakers"]}},
+            ],
+            {"sports_fetch_nba_summary": summary},
+            max_concurrency=1,
+            cache=cache,
+            latency=latency,
+        )
+        self.assertEqual(outcomes[0]["index"], 1)
+
+if __name__ == "__main__":
+    unittest.main()
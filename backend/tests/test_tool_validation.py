@@ -0,0 +1,56 @@
+import unittest
+
+from tool_validation import ArgumentValidator, compile_validators, domain_validators, player_tag, tickers
+
+LEAGUES = {
+    "nba": {"sport": "basketball", "name": "NBA", "teams": {"lakers": "lal", "warriors": "gs", "celtics": "bos"}},
+}
+TOOLS = [
+    {"function": {"name": name, "parameters": {"type": "object", "properties": properties, "required": list(properties)}}}
+    for name, properties in [
+        ("sports_fetch_nba_summary", {"team_names": {"type": "array", "items": {"type": "string"}}}),
+        ("clash_fetch_user_summary", {"player_tag": {"type": "string"}}),
+        ("stocks_fetch_stock_info", {"symbols": {"type": "array", "items": {"type": "string"}}}),
+    ]
+] + [{"function": {"name": "strava_get_activities", "parameters": {"type": "object", "properties": {"limit": {"type": "integer", "minimum": 1, "maximum": 50}}, "required": []}}}]
+
+
+class TestArgumentValidator(unittest.TestCase):
+    def setUp(self):
+        self.validators = compile_validators(TOOLS, domain_validators(LEAGUES))
+
+    def test_schema_coercion(self):
+        validate = self.validators["strava_get_activities"]
+        self.assertEqual(validate({"limit": "5", "verbose": True}), ({"limit": 5}, []))
+        self.assertEqual(validate({"limit": 500}), ({"limit": 50}, []))
+        args, errors = validate({"limit": "lots"})
+        self.assertEqual(errors, [{"param": "limit", "error": "limit must be an integer"}])
+        self.assertEqual(validate({}), ({}, []))
+
+    def test_required(self):
+        _, errors = self.validators["clash_fetch_user_summary"]({})
+        self.assertEqual(errors, [{"param": "player_tag", "error": "player_tag is required"}])
+        _, errors = ArgumentValidator({})("not a dict")
+        self.assertEqual(errors[0]["error"], "arguments must be an object")
+
+    def test_team_names(self):
+        validate = self.validators["sports_fetch_nba_summary"]
+        self.assertEqual(validate({"team_names": "LA Lakers"}), ({"team_names": ["lakers"]}, []))
+        self.assertEqual(validate({"team_names": ["GS", "warriors", "Celtics"]}), ({"team_names": ["warriors", "celtics"]}, []))
+        _, errors = validate({"team_names": ["lakerz"]})
+        self.assertEqual(errors, [{"param": "team_names", "error": "unknown NBA team 'lakerz'", "suggestions": ["lakers"]}])
+
+    def test_player_tag(self):
+        self.assertEqual(player_tag("jyjqc88"), "#JYJQC88")
+        self.assertEqual(player_tag("#P0O8"), "#P008")
+        _, errors = self.validators["clash_fetch_user_summary"]({"player_tag": "#HELLO"})
+        self.assertIn("not a Clash Royale player tag", errors[0]["error"])
+
+    def test_tickers(self):
+        self.assertEqual(tickers(["apple", "$tsla", "AAPL", "brk-b"]), ["AAPL", "TSLA", "BRK-B"])
+        _, errors = self.validators["stocks_fetch_stock_info"]({"symbols": ["not a ticker"]})
+        self.assertEqual(errors[0]["param"], "symbols")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,5 +1,5 @@
 import unittest
-from utils import extract_complete_element, get_data
+from utils import extract_complete_element, get_data, StreamingJSONField
 
 
 class TestExtractCompleteElement(unittest.TestCase):
@@ -141,5 +141,47 @@ class TestGetData(unittest.TestCase):
         self.assertEqual(result, expected)
 
 
+class TestStreamingJSONField(unittest.TestCase):
+    PLAN = '```json\n{"sources": ["music::top_songs", "fitness::workouts"], "intent": "Relive [it] all", "approach": "Big"}\n```'
+
+    def feed_all(self, field, text, size):
+        results = [field.feed(text[i:i + size]) for i in range(0, len(text), size)]
+        return [r for r in results if r is not None]
+
+    def test_value_surfaces_when_array_closes(self):
+        field = StreamingJSONField("sources")
+        closes_at = self.PLAN.index("]") + 1
+
+        self.assertIsNone(field.feed(self.PLAN[:closes_at - 1]))
+        self.assertEqual(field.feed(self.PLAN[closes_at - 1:closes_at]), ["music::top_songs", "fitness::workouts"])
+        self.assertTrue(field.done)
+        self.assertIsNone(field.feed(self.PLAN[closes_at:]))
+
+    def test_any_chunking(self):
+        for size in (1, 3, 7, len(self.PLAN)):
+            field = StreamingJSONField("sources")
+            self.assertEqual(self.feed_all(field, self.PLAN, size), [["music::top_songs", "fitness::workouts"]])
+
+    def test_brackets_and_quotes_inside_strings(self):
+        text = '{"intent": "a \\"sources\\": [x]", "sources": ["a]b", "c\\"d"]}'
+        field = StreamingJSONField("sources")
+        self.assertEqual(self.feed_all(field, text, 2), [["a]b", 'c"d']])
+
+    def test_nested_keys_are_ignored(self):
+        text = '{"sections": [{"title": "t", "sources": ["inner"]}], "sources": ["outer"]}'
+        field = StreamingJSONField("sources")
+        self.assertEqual(self.feed_all(field, text, 4), [["outer"]])
+
+    def test_other_fields(self):
+        field = StreamingJSONField("sections")
+        text = '{"sources": [], "sections": [{"title": "a"}]}'
+        self.assertEqual(self.feed_all(field, text, 5), [[{"title": "a"}]])
+
+    def test_missing_field(self):
+        field = StreamingJSONField("sources")
+        self.assertEqual(self.feed_all(field, '{"intent": "x", "sources": "none"}', 3), [])
+        self.assertFalse(field.done)
+
+
 if __name__ == "__main__":
     unittest.main()
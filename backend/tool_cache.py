@@ -0,0 +1,147 @@
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from circuit_breaker import record_upstream_failure, upstream_failures
+from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class ToolCache:
+    """
+    TTL cache for tool results, keyed by function name and arguments.
+    Expired results are kept until evicted for `stale()` fallbacks.
+
+    `ttls` maps a tool name prefix to seconds ({"sports_": 60, ...}); tools
+    with no matching prefix aren't cached. Concurrent calls for the same key
+    share one in-flight fetch. Errors and None results are never cached.
+    Upstream failures the fetch hit (circuit_breaker.upstream_failures) are
+    reported to every caller that awaited it, not just the one that started it.
+
+    `prefetch()` starts a fetch speculatively. Prefetched entries count as
+    `prefetch.used` when a real call reads them, and as `prefetch.wasted` when
+    `settle()` finds them unread at the end of the request.
+    """
+
+    def __init__(
+        self,
+        ttls: Dict[str, float],
+        max_entries: int = 256,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.ttls = ttls
+        self.max_entries = max_entries
+        self.clock = clock
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._speculative: set = set()
+
+    def ttl_for(self, function: str) -> Optional[float]:
+        matches = [prefix for prefix in self.ttls if function.startswith(prefix)]
+        return self.ttls[max(matches, key=len)] if matches else None
+
+    @staticmethod
+    def key(function: str, args: Optional[Dict[str, Any]]) -> str:
+        return f"{function}:{json.dumps(args or {}, sort_keys=True)}"
+
+    def _fresh(self, key: str) -> bool:
+        # expired entries stay (until evicted) as stale fallbacks
+        entry = self._entries.get(key)
+        return entry is not None and entry[0] > self.clock()
+
+    def _consume_speculation(self, key: str):
+        if key in self._speculative:
+            self._speculative.discard(key)
+            metrics.incr("prefetch.used")
+
+    def _start(self, function: str, key: str, run: Callable[[], Awaitable[Any]]) -> asyncio.Future:
+        ttl = self.ttl_for(function)
+        failures: List[str] = []
+
+        async def fetch() -> Tuple[Any, List[str]]:
+            # the task has its own context, so this list only sees this fetch
+            upstream_failures.set(failures)
+            try:
+                result = await run()
+            finally:
+                self._inflight.pop(key, None)
+            if result is not None:
+                self._entries[key] = (self.clock() + ttl, result)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    evicted, _ = self._entries.popitem(last=False)
+                    self._speculative.discard(evicted)
+            return result, failures
+
+        task = asyncio.ensure_future(fetch())
+        self._inflight[key] = task
+        return task
+
+    async def get_or_run(
+        self, function: str, args: Optional[Dict[str, Any]], run: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        if self.ttl_for(function) is None:
+            return await run()
+
+        key = self.key(function, args)
+        if self._fresh(key):
+            metrics.incr("tool_cache.hits")
+            self._consume_speculation(key)
+            return self._entries[key][1]
+
+        if key in self._inflight:
+            metrics.incr("tool_cache.joined")
+            self._consume_speculation(key)
+            pending = self._inflight[key]
+        else:
+            metrics.incr("tool_cache.misses")
+            pending = self._start(function, key, run)
+
+        # shield so one caller giving up doesn't cancel the shared fetch
+        result, failures = await asyncio.shield(pending)
+        for host in failures:
+            record_upstream_failure(host)
+        return result
+
+    def available(self, function: str, args: Optional[Dict[str, Any]]) -> bool:
+        """Whether a call would be answered without a new fetch (fresh entry or one in flight)."""
+        key = self.key(function, args)
+        return self._fresh(key) or key in self._inflight
+
+    def stale(self, function: str, args: Optional[Dict[str, Any]]) -> Any:
+        """The last result stored for this call, expired or not; None if there isn't one."""
+        entry = self._entries.get(self.key(function, args))
+        return entry[1] if entry else None
+
+    def prefetch(
+        self, function: str, args: Optional[Dict[str, Any]], run: Callable[[], Awaitable[Any]]
+    ) -> Optional[str]:
+        """Start fetching in the background; returns the key, or None if uncacheable or already there."""
+        if self.ttl_for(function) is None:
+            return None
+        key = self.key(function, args)
+        if self._fresh(key) or key in self._inflight:
+            return None
+
+        task = self._start(function, key, run)
+        # a failed speculative fetch has nobody awaiting it; don't leave the error unretrieved
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        self._speculative.add(key)
+        metrics.incr("prefetch.issued")
+        return key
+
+    def settle(self, keys: List[str]):
+        """Count prefetches from a finished request that nothing used."""
+        for key in keys:
+            if key in self._speculative:
+                self._speculative.discard(key)
+                metrics.incr("prefetch.wasted")
+
+        used = metrics.counters["prefetch.used"]
+        wasted = metrics.counters["prefetch.wasted"]
+        if used + wasted:
+            metrics.set_gauge("prefetch.hit_rate", used / (used + wasted))
@@ -0,0 +1,473 @@
+import asyncio
+import contextvars
+import functools
+import heapq
+import inspect
+import logging
+import threading
+import time
+from concurrent.futures import Executor
+from typing import Any, AsyncGenerator, AsyncIterable, Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple, Union
+
+from circuit_breaker import CLOSED, BreakerRegistry, upstream_failures
+from deadline import Deadline, current_deadline
+from metrics import metrics
+from tool_cache import ToolCache
+from tool_generator import limit_result, tool_limits
+from tool_validation import ArgumentValidator
+
+logger = logging.getLogger(__name__)
+
+TOOL_TO_NAMESPACE = {
+    "spotify": "music",
+    "stocks": "stocks",
+    "sports": "sports",
+    "strava": "fitness",
+    "clash": "gaming",
+}
+
+
+def tool_namespace(function_name: str) -> str:
+    prefix = function_name.split("_")[0]
+    return TOOL_TO_NAMESPACE.get(prefix, prefix)
+
+
+def select_tools(tools: List[Dict[str, Any]], namespaces: Set[str]) -> List[Dict[str, Any]]:
+    """Tool schemas whose results land in one of `namespaces`, or all of them when none do."""
+    subset = [tool for tool in tools if tool_namespace(tool["function"]["name"]) in namespaces]
+    return subset or tools
+
+
+def merge_result(data_context: Dict[str, Any], function_name: str, result: Any):
+    """Merge a tool result into its namespace: dicts are flattened in, anything else is keyed by method name."""
+    prefix = function_name.split("_")[0]
+    namespace = data_context.setdefault(tool_namespace(function_name), {})
+    if isinstance(result, dict):
+        namespace.update(result)
+    else:
+        namespace[function_name.replace(f"{prefix}_", "")] = result
+
+
+def call_tool(function: Callable, args: Dict[str, Any], executor: Optional[Executor] = None) -> Awaitable[Any]:
+    """
+    Awaitable result of `function(**args)`: coroutine tools run on the event
+    loop, sync ones in `executor` (asyncio's default pool when None) with the
+    caller's context, so current_deadline reaches them either way.
+    """
+    if inspect.iscoroutinefunction(function):
+        return function(**args)
+    context = contextvars.copy_context()
+    return asyncio.get_running_loop().run_in_executor(executor, functools.partial(context.run, function, **args))
+
+
+def stale_fallback(
+    cache: Optional[ToolCache], mock_data: Dict[str, Any]
+) -> Callable[[Dict[str, Any]], Optional[Tuple[Any, str]]]:
+    """
+    Fallback for calls whose breaker is open: the last cached result for the
+    call, else the tool's MOCK_DATA namespace. Returns (result, "cache"|"mock").
+    """
+
+    def fallback(call: Dict[str, Any]) -> Optional[Tuple[Any, str]]:
+        if cache:
+            result = cache.stale(call["function"], call.get("args"))
+            if result is not None:
+                return result, "cache"
+        namespace = tool_namespace(call["function"])
+        if namespace in mock_data:
+            return mock_data[namespace], "mock"
+        return None
+
+    return fallback
+
+
+class ToolLatency:
+    """
+    EWMA run time per tool name: the one estimate both scheduling (`expected`)
+    and deadline skipping (`predicted`) use. Thread-safe: recorded from
+    worker threads.
+    """
+
+    def __init__(self, alpha: float = 0.3, default: float = 1.0, min_samples: int = 5):
+        self.alpha = alpha
+        self.default = default
+        self.min_samples = min_samples
+        self._ewma: Dict[str, float] = {}
+        self._samples: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def record(self, function: str, latency: float):
+        with self._lock:
+            previous = self._ewma.get(function)
+            self._ewma[function] = latency if previous is None else self.alpha * latency + (1 - self.alpha) * previous
+            self._samples[function] = self._samples.get(function, 0) + 1
+
+    def expected(self, function: str) -> float:
+        """Estimate for ordering calls; `default` for tools not seen yet."""
+        with self._lock:
+            return self._ewma.get(function, self.default)
+
+    def predicted(self, function: str) -> Optional[float]:
+        """Estimate for skipping calls, once there are `min_samples` runs to trust."""
+        with self._lock:
+            if self._samples.get(function, 0) < self.min_samples:
+                return None
+            return self._ewma[function]
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            return {name: round(value, 3) for name, value in sorted(self._ewma.items())}
+
+
+def _timed(name: str, function: Callable, latency: Optional[ToolLatency]) -> Callable:
+    """
+    `function`, recording each run time as tool.latency.<name> and into
+    `latency`. Timed where the tool runs, so waiting for a pool thread isn't counted.
+    """
+
+    def record(started: float):
+        elapsed = time.monotonic() - started
+        metrics.observe(f"tool.latency.{name}", elapsed)
+        if latency:
+            latency.record(name, elapsed)
+
+    if inspect.iscoroutinefunction(function):
+        async def timed(**args) -> Any:
+            started = time.monotonic()
+            try:
+                return await function(**args)
+            finally:
+                record(started)
+    else:
+        def timed(**args) -> Any:
+            started = time.monotonic()
+            try:
+                return function(**args)
+            finally:
+                record(started)
+    return timed
+
+
+def _breaker_for(breakers: Optional[BreakerRegistry], function_name: str):
+    return breakers.get(f"tool:{function_name.split('_')[0]}") if breakers else None
+
+
+def _predicted_late(deadline: Optional[Deadline], latency: Optional[ToolLatency], function_name: str) -> bool:
+    """Whether `deadline` has passed or `latency` predicts the call would run past it."""
+    if deadline is None:
+        return False
+    predicted = latency.predicted(function_name) if latency else None
+    return deadline.expired or (predicted is not None and predicted > deadline.remaining())
+
+
+def source_priority(call: Dict[str, Any], sources: List[str]) -> int:
+    """
+    Priority hint from the plan (lower runs first): 0 for calls feeding the
+    plan's first source, which the screen leads with, 1 for other planned
+    sources, 2 for anything else. Calls without `sources` (agent calls) are
+    matched on namespace.
+    """
+    if not sources:
+        return 0
+    served = call.get("sources") or [s for s in sources if s.split("::", 1)[0] == tool_namespace(call["function"])]
+    if sources[0] in served:
+        return 0
+    return 1 if any(source in sources for source in served) else 2
+
+
+class _PriorityGate:
+    """
+    Concurrency cap that hands each free slot to the waiting call with the
+    lowest key rather than the first to arrive. Grants happen on the next
+    loop turn, so calls dispatched together are all ranked before any starts.
+    """
+
+    def __init__(self, limit: int):
+        self.free = limit
+        self._waiting: List[Tuple[Any, int, asyncio.Future]] = []
+        self._seq = 0
+        self._scheduled = False
+
+    def _dispatch(self):
+        self._scheduled = False
+        while self.free > 0 and self._waiting:
+            _, _, future = heapq.heappop(self._waiting)
+            if not future.done():
+                self.free -= 1
+                future.set_result(None)
+
+    def _schedule(self):
+        if not self._scheduled:
+            self._scheduled = True
+            asyncio.get_running_loop().call_soon(self._dispatch)
+
+    async def acquire(self, key: Any):
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiting, (key, self._seq, future))
+        self._seq += 1
+        self._schedule()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # granted just as we were cancelled; pass the slot on
+                self.release()
+            raise
+
+    def release(self):
+        self.free += 1
+        self._schedule()
+
+
+async def _iterate(calls: Union[Iterable, AsyncIterable]) -> AsyncGenerator[Dict[str, Any], None]:
+    if isinstance(calls, AsyncIterable):
+        async for call in calls:
+            yield call
+    else:
+        for call in calls:
+            yield call
+
+
+async def run_tools(
+    calls: Union[List[Dict[str, Any]], AsyncIterable[Dict[str, Any]]],
+    functions: Dict[str, Callable],
+    max_concurrency: int = 4,
+    cache: Optional[ToolCache] = None,
+    report_starts: bool = False,
+    breakers: Optional[BreakerRegistry] = None,
+    fallback: Optional[Callable[[Dict[str, Any]], Optional[Tuple[Any, str]]]] = None,
+    deadline: Optional[Deadline] = None,
+    latency: Optional[ToolLatency] = None,
+    priority: Optional[Callable[[Dict[str, Any]], int]] = None,
+    executor: Optional[Executor] = None,
+    validators: Optional[Dict[str, ArgumentValidator]] = None,
+) -> AsyncGenerator[Dict[str, Any], None]:
+    """
+    Run `[{"function": name, "args": {...}}, ...]` concurrently, at most
+    `max_concurrency` at a time, through `cache` when given. Async tools are
+    awaited directly; sync ones run in `executor` threads (see call_tool).
+    Yields each outcome as it finishes: the call plus `index` and either
+    `result` or `error`.
+
+    When calls have to wait for a slot, the one with the lowest
+    `priority(call)` goes first, then the one `latency` expects to finish
+    soonest, so the first results arrive as early as possible. Run times
+    are recorded into `latency`.
+
+    `calls` may be an async iterable (tool calls streaming out of the agent);
+    each one starts as soon as it arrives. With `report_starts`, the call plus
+    `index` and `started: True` is also yielded when it is dispatched. An error
+    from the call stream is raised once the calls already started have finished.
+
+    Fetchers log and return None on failure, so a None result is an error too.
+    Results are cut down to the limits the tool declares (tool_generator.limit_result).
+
+    With `validators`, arguments are checked before anything runs: calls
+    that can't be fixed fail with `invalid` (a list of {"param", "error",
+    "suggestions"?}); corrected arguments replace `args` in the outcome.
+
+    With `breakers`, each fetcher ("tool:sports", ...) has a circuit breaker.
+    It counts calls that raise or whose HTTP requests failed upstream
+    (circuit_breaker.upstream_failures), not None results. While it is
+    open, calls don't run: `fallback(call)` supplies a result,
+    and the outcome carries `stale: "cache"|"mock"`.
+
+    With a `deadline`, calls that can't finish in time (it has passed, or
+    `latency` predicts they'd take longer than what's left) are skipped
+    with `skipped: True`, and running calls are abandoned when it passes
+    (an uncached async tool is cancelled; a sync tool's thread runs on). Each call sees the deadline as deadline.current_deadline, so HTTP
+    timeouts shrink to the remaining budget. Run times are recorded as
+    tool.latency.<function>.
+    """
+    gate = _PriorityGate(max_concurrency)
+    started_at = time.monotonic()
+
+    async def run(index: int, call: Dict[str, Any]) -> Dict[str, Any]:
+        outcome = {**call, "index": index}
+        function = functions.get(call["function"])
+        if not function:
+            outcome["error"] = f"Unknown function: {call['function']}"
+            return outcome
+
+        args = call.get("args") or {}
+        validator = validators.get(call["function"]) if validators else None
+        if validator:
+            args, invalid = validator(args)
+            if invalid:
+                metrics.incr("tool.invalid_args")
+                outcome["error"] = "Invalid arguments"
+                outcome["invalid"] = invalid
+                return outcome
+            if args != (call.get("args") or {}):
+                metrics.incr("tool.args_corrected")
+                outcome["args"] = args
+
+        breaker = _breaker_for(breakers, call["function"])
+        if breaker and not breaker.allow():
+            found = fallback({**call, "args": args}) if fallback else None
+            if found is None:
+                outcome["error"] = "Temporarily unavailable"
+            else:
+                outcome["result"], outcome["stale"] = found
+                if outcome["stale"] == "cache":
+                    outcome["result"] = limit_result(outcome["result"], tool_limits(function))
+                metrics.incr(f"tool.fallback.{outcome['stale']}")
+            return outcome
+
+        def out_of_time() -> bool:
+            if _predicted_late(deadline, latency, call["function"]):
+                outcome["error"] = "Skipped: not enough time left"
+                outcome["skipped"] = True
+                metrics.incr("tool.deadline_skipped")
+                return True
+            return False
+
+        timed = _timed(call["function"], function, latency)
+
+        # settled by upstream failures or an exception, not by a None result: fetchers
+        # also return None for a bad tag or an unknown team, which says nothing about the API
+        settled = False
+        try:
+            if out_of_time():
+                return outcome
+
+            current_deadline.set(deadline)
+            failures: List[str] = []
+            upstream_failures.set(failures)
+            # a cached or already-running call costs nothing, whatever the tool usually takes
+            expected = 0.0
+            if latency and not (cache and cache.available(call["function"], args)):
+                expected = latency.expected(call["function"])
+            key = (priority(call) if priority else 0, expected)
+            await gate.acquire(key)
+            try:
+                # waiting for a slot may have used up the budget
+                if out_of_time():
+                    return outcome
+                try:
+                    if cache:
+                        pending = cache.get_or_run(call["function"], args, lambda: call_tool(timed, args, executor))
+                    else:
+                        pending = call_tool(timed, args, executor)
+                    if deadline is None:
+                        result = await pending
+                    else:
+                        result = await asyncio.wait_for(pending, deadline.remaining())
+                except asyncio.TimeoutError:
+                    metrics.incr("tool.deadline_timeouts")
+                    outcome["error"] = "Timed out at the request deadline"
+                    return outcome
+                except Exception as e:
+                    logger.error(f"Tool {call['function']} failed: {e}")
+                    if breaker:
+                        breaker.record_failure()
+                        settled = True
+                    outcome["error"] = str(e)
+                    return outcome
+            finally:
+                gate.release()
+
+            if breaker:
+                if failures:
+                    breaker.record_failure()
+                else:
+                    breaker.record_success()
+                settled = True
+        finally:
+            if breaker and not settled:
+                # skipped, timed out or cancelled: free a half-open probe
+                breaker.release()
+
+        if result is None:
+            outcome["error"] = "No data returned"
+        else:
+            outcome["result"] = limit_result(result, tool_limits(function))
+        return outcome
+
+    events: asyncio.Queue = asyncio.Queue()
+    tasks = []
+    feed_done = object()
+    feed_error: Optional[BaseException] = None
+
+    async def feed():
+        nonlocal feed_error
+        try:
+            async for call in _iterate(calls):
+                index = len(tasks)
+                if report_starts:
+                    events.put_nowait({**call, "index": index, "started": True})
+                task = asyncio.create_task(run(index, call))
+                task.add_done_callback(lambda t: t.cancelled() or events.put_nowait(t.result()))
+                tasks.append(task)
+        except Exception as e:
+            feed_error = e
+        finally:
+            events.put_nowait(feed_done)
+
+    feeder = asyncio.create_task(feed())
+    finished = 0
+    feeding = True
+    try:
+        while feeding or finished < len(tasks):
+            event = await events.get()
+            if event is feed_done:
+                feeding = False
+                continue
+            if "started" not in event:
+                if not finished:
+                    metrics.observe("tools.first_result", time.monotonic() - started_at)
+                finished += 1
+            yield event
+        if feed_error:
+            raise feed_error
+    finally:
+        feeder.cancel()
+        for task in tasks:
+            task.cancel()
+
+
+def prefetch_tools(
+    calls: List[Dict[str, Any]],
+    functions: Dict[str, Callable],
+    cache: ToolCache,
+    executor: Optional[Executor] = None,
+    validators: Optional[Dict[str, ArgumentValidator]] = None,
+    breakers: Optional[BreakerRegistry] = None,
+    deadline: Optional[Deadline] = None,
+    latency: Optional[ToolLatency] = None,
+) -> List[str]:
+    """
+    Start cacheable calls in the background so a later run_tools finds them
+    in the cache. They get run_tools' checks: arguments are validated and
+    the corrected ones are the cache key, and calls are left out while
+    their tool's breaker isn't closed (a prefetch never takes the half-open
+    probe) or when they're predicted to miss `deadline`. The fetch sees
+    the deadline as current_deadline and its run time goes into `latency`.
+    """
+    keys = []
+    for call in calls:
+        name = call["function"]
+        function = functions.get(name)
+        if not function:
+            continue
+        args = call.get("args") or {}
+        validator = validators.get(name) if validators else None
+        if validator:
+            args, invalid = validator(args)
+            if invalid:
+                metrics.incr("prefetch.invalid_args")
+                continue
+        breaker = _breaker_for(breakers, name)
+        if (breaker and breaker.state != CLOSED) or _predicted_late(deadline, latency, name):
+            metrics.incr("prefetch.skipped")
+            continue
+
+        async def run(timed: Callable = _timed(name, function, latency), args: Dict[str, Any] = args) -> Any:
+            # runs in the cache's fetch task, so this doesn't leak into the caller
+            current_deadline.set(deadline)
+            return await call_tool(timed, args, executor)
+
+        key = cache.prefetch(name, args, run)
+        if key:
+            keys.append(key)
+    return keys
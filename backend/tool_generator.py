@@ -1,9 +1,32 @@
 import inspect
-from typing import Any, Dict, List, Callable
+import json
+import re
+from typing import Any, Dict, List, Callable, Optional
 from functools import wraps
 
 
-def tool_function(description: str, params: Dict[str, Dict[str, str]] = None):
+def _field_tree(fields: List[str]) -> Dict[str, Any]:
+    """["player", "chests.name"] -> {"player": None, "chests": {"name": None}}; None keeps the whole value."""
+    tree: Dict[str, Any] = {}
+    for path in fields:
+        *parents, leaf = path.split(".")
+        node = tree
+        for part in parents:
+            if node.get(part, {}) is None:
+                break
+            node = node.setdefault(part, {})
+        else:
+            node[leaf] = None
+    return tree
+
+
+def tool_function(
+    description: str,
+    params: Dict[str, Dict[str, str]] = None,
+    max_items: Optional[int] = None,
+    fields: Optional[List[str]] = None,
+    round_digits: Optional[int] = None,
+):
     """
     Decorator to mark a method as an LLM tool with explicit metadata.
 
@@ -11,6 +34,13 @@ def tool_function(description: str, params: Dict[str, Dict[str, str]] = None):
         description: LLM-friendly description of what the function does
         params: Dict mapping param names to their schema
                 e.g., {"symbol": {"type": "string", "description": "Stock ticker (e.g., AAPL, TSLA)"}}
+        max_items: Longest any list in the result may be
+        fields: Dotted paths of the result keys to keep (lists are transparent,
+                "upcoming_chests.name" keeps each chest's name); everything else is dropped
+        round_digits: Decimal places floats in the result are rounded to
+
+    The result limits are applied by the executor (see limit_result) before
+    results are merged, whatever the upstream API returns.
 
     Example:
         @tool_function(
@@ -24,15 +54,26 @@ def tool_function(description: str, params: Dict[str, Dict[str, str]] = None):
         )
         def fetch_stock_info(self, symbol: str):
             ...
+
+    `async def` methods stay coroutine functions, so the executor can await
+    them on the event loop instead of running them in a worker thread.
     """
     def decorator(func):
         func._tool_metadata = {
             "description": description,
             "params": params or {}
         }
-        @wraps(func)
-        def wrapper(*args, **kwargs):
-            return func(*args, **kwargs)
+        limits = {"max_items": max_items, "fields": _field_tree(fields) if fields else None, "round_digits": round_digits}
+        if any(value is not None for value in limits.values()):
+            func._tool_metadata["limits"] = limits
+        if inspect.iscoroutinefunction(func):
+            @wraps(func)
+            async def wrapper(*args, **kwargs):
+                return await func(*args, **kwargs)
+        else:
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                return func(*args, **kwargs)
         wrapper._tool_metadata = func._tool_metadata
         return wrapper
     return decorator
@@ -44,6 +85,7 @@ def generate_tools_from_fetchers(
     """
     Generate LiteLLM tool schemas from fetcher instances.
     Prefers decorator metadata, falls back to inspect-based generation.
+    Sync and async methods are both picked up; see tool_executor.call_tool.
     """
     tools = []
     available_functions = {}
@@ -150,3 +192,73 @@ def generate_tools_from_fetchers(
             available_functions[tool_name] = method
 
     return tools, available_functions
+
+
+def tool_limits(function: Callable) -> Optional[Dict[str, Any]]:
+    """The result limits declared with @tool_function, if any."""
+    return getattr(function, "_tool_metadata", {}).get("limits")
+
+
+def _project(value: Any, tree: Optional[Dict[str, Any]]) -> Any:
+    if tree is None:
+        return value
+    if isinstance(value, dict):
+        return {key: _project(item, tree[key]) for key, item in value.items() if key in tree}
+    if isinstance(value, list):
+        return [_project(item, tree) for item in value]
+    return value
+
+
+def _bound(value: Any, max_items: Optional[int], round_digits: Optional[int]) -> Any:
+    if isinstance(value, dict):
+        return {key: _bound(item, max_items, round_digits) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_bound(item, max_items, round_digits) for item in value[:max_items]]
+    if isinstance(value, float) and round_digits is not None:
+        return round(value, round_digits)
+    return value
+
+
+def limit_result(result: Any, limits: Optional[Dict[str, Any]]) -> Any:
+    """A copy of `result` with the tool's fields, max_items and round_digits applied."""
+    if not limits:
+        return result
+    result = _project(result, limits["fields"])
+    if limits["max_items"] is None and limits["round_digits"] is None:
+        return result
+    return _bound(result, limits["max_items"], limits["round_digits"])
+
+
+# "Valid teams: lakers, warriors, celtics, ..." style enumerations
+ENUMERATION_PATTERN = re.compile(r"(?<=: )((?:[^,.:]+, ){7,}[^,.:]+)")
+
+
+def compact_description(description: str, keep: int = 4) -> str:
+    """Shorten long comma-separated enumerations to a few examples and a count."""
+    def shorten(match: re.Match) -> str:
+        items = match.group(1).split(", ")
+        return f"{', '.join(items[:keep])} and {len(items) - keep} more"
+
+    return ENUMERATION_PATTERN.sub(shorten, description)
+
+
+def compact_tools(tools: List[Dict[str, Any]], keep: int = 4) -> List[Dict[str, Any]]:
+    """Copies of the tool schemas with enumeration-heavy descriptions shortened."""
+    compacted = []
+    for tool in tools:
+        function = dict(tool["function"])
+        function["description"] = compact_description(function["description"], keep)
+        if "parameters" in function:
+            properties = {
+                name: {**schema, "description": compact_description(schema["description"], keep)}
+                if "description" in schema else schema
+                for name, schema in function["parameters"]["properties"].items()
+            }
+            function["parameters"] = {**function["parameters"], "properties": properties}
+        compacted.append({**tool, "function": function})
+    return compacted
+
+
+def estimate_tokens(tools: List[Dict[str, Any]]) -> int:
+    """Rough prompt tokens for a tools list (~4 characters per token)."""
+    return len(json.dumps(tools)) // 4
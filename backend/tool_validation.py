@@ -0,0 +1,184 @@
+import difflib
+import re
+from fnmatch import fnmatch
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from query_router import COMPANY_TICKERS, PLAYER_TAG_PATTERN
+
+# value -> corrected value; raises ArgumentError when it can't be fixed
+DomainValidator = Callable[[Any], Any]
+
+TICKER_PATTERN = re.compile(r"^\^?[A-Z]{1,5}(?:[.-][A-Z]{1,2})?$")
+
+
+class ArgumentError(ValueError):
+    """An argument that fails validation, with close valid values when there are any."""
+
+    def __init__(self, message: str, suggestions: Optional[List[str]] = None):
+        super().__init__(message)
+        self.suggestions = suggestions or []
+
+
+def _check_type(name: str, schema: Dict[str, Any], value: Any) -> Any:
+    """Check `value` against a JSON schema type, fixing what the model commonly gets wrong."""
+    kind = schema.get("type")
+    if kind == "array":
+        if isinstance(value, (str, int, float)):
+            # "lakers" for ["lakers"]
+            value = [value]
+        if not isinstance(value, list):
+            raise ArgumentError(f"{name} must be a list")
+        return [_check_type(f"{name}[{i}]", schema.get("items", {}), item) for i, item in enumerate(value)]
+    if kind == "string":
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            value = str(value)
+        if not isinstance(value, str) or not value.strip():
+            raise ArgumentError(f"{name} must be a non-empty string")
+        value = value.strip()
+    elif kind in ("integer", "number"):
+        expected = f"{name} must be {'an integer' if kind == 'integer' else 'a number'}"
+        if isinstance(value, str):
+            try:
+                value = float(value.strip())
+            except ValueError:
+                raise ArgumentError(expected) from None
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise ArgumentError(expected)
+        if kind == "integer":
+            if value != int(value):
+                raise ArgumentError(f"{name} must be a whole number")
+            value = int(value)
+        if "minimum" in schema:
+            value = max(schema["minimum"], value)
+        if "maximum" in schema:
+            value = min(schema["maximum"], value)
+    elif kind == "boolean":
+        if isinstance(value, str) and value.lower() in ("true", "false"):
+            value = value.lower() == "true"
+        if not isinstance(value, bool):
+            raise ArgumentError(f"{name} must be true or false")
+
+    if "enum" in schema and value not in schema["enum"]:
+        choices = [str(choice) for choice in schema["enum"]]
+        raise ArgumentError(f"{name} must be one of {choices}", difflib.get_close_matches(str(value), choices))
+    return value
+
+
+class ArgumentValidator:
+    """
+    Validator for one tool, compiled from its parameters schema plus any
+    domain validators for its parameters. Calling it with the model's
+    arguments returns (corrected args, errors): unknown parameters are
+    dropped, types coerced where unambiguous ("5" -> 5, "x" -> ["x"]), and
+    every parameter that can't be fixed gets an error dict.
+    """
+
+    def __init__(self, parameters: Dict[str, Any], domain: Optional[Dict[str, DomainValidator]] = None):
+        self.properties: Dict[str, Dict[str, Any]] = parameters.get("properties", {})
+        self.required: List[str] = parameters.get("required", [])
+        self.domain = domain or {}
+
+    def __call__(self, args: Optional[Dict[str, Any]]) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+        if not isinstance(args, dict):
+            return {}, [{"param": None, "error": "arguments must be an object"}]
+
+        corrected: Dict[str, Any] = {}
+        errors: List[Dict[str, Any]] = []
+        for name in self.required:
+            if args.get(name) is None:
+                errors.append({"param": name, "error": f"{name} is required"})
+
+        for name, value in args.items():
+            schema = self.properties.get(name)
+            if schema is None or value is None:
+                continue
+            try:
+                value = _check_type(name, schema, value)
+                if name in self.domain:
+                    value = self.domain[name](value)
+            except ArgumentError as e:
+                error = {"param": name, "error": str(e)}
+                if e.suggestions:
+                    error["suggestions"] = e.suggestions
+                errors.append(error)
+                continue
+            corrected[name] = value
+        return corrected, errors
+
+
+def team_names(league_config: Dict[str, Any], league: str) -> DomainValidator:
+    """
+    Team names for `league` as LEAGUE_CONFIG spells them. Accepts what the
+    sports fetcher resolves ("LA Lakers", "lal"); unknown names get the
+    closest teams as suggestions.
+    """
+    teams = league_config[league]["teams"]
+    by_abbr = {abbr: team for team, abbr in teams.items()}
+    label = league_config[league]["name"]
+
+    def resolve(name: str) -> str:
+        lower = name.lower()
+        if lower in teams:
+            return lower
+        if lower in by_abbr:
+            return by_abbr[lower]
+        matches = [team for team in teams if team in lower or lower in team]
+        if len(matches) == 1:
+            return matches[0]
+        raise ArgumentError(
+            f"unknown {label} team '{name}'",
+            matches or difflib.get_close_matches(lower, list(teams), n=3, cutoff=0.6),
+        )
+
+    def validate(value: List[str]) -> List[str]:
+        return list(dict.fromkeys(resolve(name) for name in value))
+
+    return validate
+
+
+def player_tag(value: str) -> str:
+    """A Clash Royale tag: uppercased, '#'-prefixed, letter O read as zero."""
+    tag = "#" + value.upper().lstrip("#").replace("O", "0")
+    if not PLAYER_TAG_PATTERN.fullmatch(tag):
+        raise ArgumentError(f"'{value}' is not a Clash Royale player tag (# then 0289PYLQGRJCUV)")
+    return tag
+
+
+def tickers(value: List[str]) -> List[str]:
+    """Ticker symbols, uppercased; well-known company names become their ticker."""
+    symbols = []
+    for symbol in value:
+        symbol = COMPANY_TICKERS.get(symbol.lower(), symbol.upper().lstrip("$"))
+        if not TICKER_PATTERN.match(symbol):
+            raise ArgumentError(f"'{symbol}' is not a ticker symbol")
+        symbols.append(symbol)
+    return list(dict.fromkeys(symbols))
+
+
+def domain_validators(league_config: Dict[str, Any]) -> List[Tuple[str, str, DomainValidator]]:
+    """(tool name pattern, parameter, validator) for the integrations' arguments."""
+    rules = [
+        (f"sports_fetch_{league}_summary", "team_names", team_names(league_config, league))
+        for league in league_config
+    ]
+    rules.append(("clash_*", "player_tag", player_tag))
+    rules.append(("stocks_*", "symbols", tickers))
+    return rules
+
+
+def compile_validators(
+    tools: List[Dict[str, Any]],
+    rules: Optional[List[Tuple[str, str, DomainValidator]]] = None,
+) -> Dict[str, ArgumentValidator]:
+    """Tool name -> ArgumentValidator, built once from the generated tool schemas."""
+    validators = {}
+    for tool in tools:
+        function = tool["function"]
+        parameters = function.get("parameters", {})
+        domain = {
+            param: validator
+            for pattern, param, validator in rules or []
+            if fnmatch(function["name"], pattern) and param in parameters.get("properties", {})
+        }
+        validators[function["name"]] = ArgumentValidator(parameters, domain)
+    return validators
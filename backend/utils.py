@@ -1,4 +1,5 @@
 from typing import Dict, Any
+import json
 import re
 
 
@@ -60,3 +61,75 @@ def get_data(sources: list[str], mock_data: Dict[str, Any]) -> Dict[str, Any]:
             result[namespace][key] = mock_data[namespace][key]
 
     return result
+
+
+class StreamingJSONField:
+    """
+    Pulls one top-level array or object field out of JSON that arrives in
+    chunks, as soon as its closing bracket does, without waiting for the rest
+    of the document. Text outside the top-level object (code fences) is ignored.
+    """
+
+    def __init__(self, key: str):
+        self.key = key
+        self.value: Any = None
+        self.done = False
+        self._buffer = ""
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._last_key = None
+        self._expect_value = False
+        self._value_start = None
+
+    def feed(self, chunk: str) -> Any:
+        """Add text; returns the field's value on the call where it completes, otherwise None."""
+        if self.done:
+            return None
+
+        start = len(self._buffer)
+        self._buffer += chunk
+
+        for i in range(start, len(self._buffer)):
+            c = self._buffer[i]
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                    if self._depth == 1 and self._value_start is None:
+                        self._last_key = self._buffer[self._string_start + 1 : i]
+                continue
+
+            if c == '"':
+                self._in_string = True
+                self._string_start = i
+            elif c == ":" and self._depth == 1:
+                self._expect_value = self._last_key == self.key
+            elif c in "[{":
+                self._depth += 1
+                if self._expect_value:
+                    self._value_start = i
+                    self._expect_value = False
+            elif c in "]}":
+                if self._value_start is not None and self._depth == 2:
+                    try:
+                        self.value = json.loads(self._buffer[self._value_start : i + 1])
+                    except ValueError:
+                        self._value_start = None
+                    else:
+                        self.done = True
+                        return self.value
+                self._depth -= 1
+            elif c == "," and self._depth == 1:
+                self._last_key = None
+                self._expect_value = False
+            elif not c.isspace():
+                # a scalar value; not the array/object we're after
+                self._expect_value = False
+
+        return None
@@ -1,5 +1,26 @@
+import { TextDecoder, TextEncoder } from 'util';
 import { useStreamStore } from '@/stores/stream';
 
+Object.assign(global, { TextDecoder, TextEncoder });
+
+// a fetch Response whose body yields `chunks`, then ends or (with `drop`) fails mid-stream
+const sseResponse = (chunks: string[], drop = false) => {
+  const encoded = chunks.map((chunk) => new TextEncoder().encode(chunk));
+  return {
+    ok: true,
+    body: {
+      getReader: () => ({
+        read: async () => {
+          const value = encoded.shift();
+          if (value) return { done: false, value };
+          if (drop) throw new TypeError('network error');
+          return { done: true, value: undefined };
+        },
+      }),
+    },
+  };
+};
+
 describe('useStreamStore', () => {
   beforeEach(() => {
     useStreamStore.setState({
@@ -39,4 +60,31 @@ describe('useStreamStore', () => {
     expect(state.rawResponse).toBe('');
     expect(state.error).toBeNull();
   });
+
+  it('should resume a dropped generate stream with Last-Event-ID', async () => {
+    jest.useFakeTimers();
+    const fetchMock = jest.fn()
+      .mockResolvedValueOnce(sseResponse([
+        'id: abc:0\nevent: ui\ndata: {"content": "<div>"}\n\n',
+        'id: abc:1\nevent: ui\ndata: {"con',
+      ], true))
+      .mockResolvedValueOnce(sseResponse([
+        'id: abc:1\nevent: ui\ndata: {"content": "hi</div>"}\n\n',
+        'id: abc:2\nevent: done\ndata: {}\n\n',
+      ]));
+    global.fetch = fetchMock;
+
+    const stream = useStreamStore.getState().startStream('my top songs');
+    await jest.runAllTimersAsync();
+    await stream;
+
+    expect(fetchMock).toHaveBeenCalledTimes(2);
+    expect(fetchMock.mock.calls[0][1].headers['Last-Event-ID']).toBeUndefined();
+    expect(fetchMock.mock.calls[1][1].headers['Last-Event-ID']).toBe('abc:0');
+    const state = useStreamStore.getState();
+    expect(state.htmlContent).toBe('<div>hi</div>');
+    expect(state.isStreaming).toBe(false);
+    expect(state.error).toBeNull();
+    jest.useRealTimers();
+  });
 });
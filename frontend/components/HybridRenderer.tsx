@@ -131,6 +131,7 @@ export function HybridRenderer({
           clickPrompt,
           slotId,
           clickedData: payload.clickedData,
+          dataSource,
         });
       };
 
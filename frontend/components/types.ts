@@ -91,6 +91,7 @@ export interface InteractionPayload {
   clickPrompt: string | null;
   slotId: string;
   clickedData: unknown;
+  dataSource?: string | null;
 }
 
 export interface ComponentProps {
@@ -28,6 +28,13 @@ interface StreamState {
 
 const API_URL = process.env.NEXT_PUBLIC_API_URL || 'http://localhost:8000';
 
+// /api/generate tags events with `id:`; a dropped stream reconnects with
+// Last-Event-ID and the backend replays what was missed
+const MAX_RESUME_ATTEMPTS = 3;
+const RESUME_DELAY_MS = 500;
+
+const wait = (ms: number) => new Promise((resolve) => setTimeout(resolve, ms));
+
 let audioPlayer: HTMLAudioElement | null = null;
 
 const initAudio = () => {
@@ -88,10 +95,18 @@ export const useStreamStore = create<StreamState>((set, get) => ({
       thinkingMessages: [],
     });
 
-    try {
+    let lastEventId: string | null = null;
+    let finished = false;
+    let attempts = 0;
+    let showingSkeleton = false;
+
+    const readStream = async () => {
+      const headers: Record<string, string> = { 'Content-Type': 'application/json' };
+      if (lastEventId) headers['Last-Event-ID'] = lastEventId;
+
       const response = await fetch(`${API_URL}/api/generate`, {
         method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
+        headers,
         body: JSON.stringify({ query }),
       });
 
@@ -105,6 +120,7 @@ export const useStreamStore = create<StreamState>((set, get) => ({
       const decoder = new TextDecoder();
       let buffer = '';
       let currentEvent = '';
+      let currentId: string | null = null;
 
       while (true) {
         const { done, value } = await reader.read();
@@ -115,6 +131,11 @@ export const useStreamStore = create<StreamState>((set, get) => ({
         buffer = lines.pop() || '';
 
         for (const line of lines) {
+          if (line.startsWith('id: ')) {
+            currentId = line.slice(4);
+            continue;
+          }
+
           if (line.startsWith('event: ')) {
             currentEvent = line.slice(7);
             continue;
@@ -128,6 +149,12 @@ export const useStreamStore = create<StreamState>((set, get) => ({
               case 'data':
                 set({ dataContext: data });
                 break;
+              case 'skeleton':
+                if (!state.rawResponse) {
+                  set({ htmlContent: data.html });
+                  showingSkeleton = true;
+                }
+                break;
               case 'thinking':
                 set({
                   thinkingMessages: [...state.thinkingMessages, {
@@ -170,24 +197,44 @@ export const useStreamStore = create<StreamState>((set, get) => ({
               case 'ui':
                 const content = sanitizeHtmlContent(data.content);
                 set({
-                  htmlContent: state.htmlContent + content,
+                  htmlContent: (showingSkeleton ? '' : state.htmlContent) + content,
                   rawResponse: state.rawResponse + content,
                 });
+                showingSkeleton = false;
                 break;
               case 'error':
+                finished = true;
                 set({ error: data.message, isStreaming: false });
                 await stopSound();
                 break;
               case 'done':
+                finished = true;
                 set({ isStreaming: false });
                 await playSound('stop.mp3');
                 break;
             }
 
+            // only a fully handled event counts as received
+            if (currentId) lastEventId = currentId;
             currentEvent = '';
+            currentId = null;
           }
         }
       }
+    };
+
+    try {
+      while (true) {
+        try {
+          await readStream();
+        } catch (err) {
+          // before any event arrived there's nothing to resume
+          if (!lastEventId || finished || attempts >= MAX_RESUME_ATTEMPTS) throw err;
+        }
+        if (finished || !lastEventId || attempts >= MAX_RESUME_ATTEMPTS) break;
+        attempts += 1;
+        await wait(RESUME_DELAY_MS * attempts);
+      }
 
       set({ isStreaming: false });
       await playSound('stop.mp3');
@@ -385,6 +432,7 @@ export const useStreamStore = create<StreamState>((set, get) => ({
           currentHtml: state.rawResponse,
           dataContext: state.dataContext,
           componentType: payload.componentType,
+          dataSource: payload.dataSource,
         }),
       });
 